@@ -0,0 +1,97 @@
+"""Add AnnotationValue table
+
+Revision ID: 3a7e1c9d2b40
+Revises: 5ae4b1b8a9c1
+Create Date: 2021-01-22 15:41:07.126384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a7e1c9d2b40'
+down_revision = '5ae4b1b8a9c1'
+branch_labels = None
+depends_on = None
+
+# `AnnotationValue.MAX_TEXT_BYTES` at the time of this migration
+MAX_TEXT_BYTES = 1024
+
+
+def upgrade():
+    op.create_table(
+        'annotationvalues',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('modified', sa.DateTime(), nullable=False),
+        sa.Column('annotation_id', sa.Integer(), nullable=False),
+        sa.Column('obj_id', sa.String(), nullable=False),
+        sa.Column('origin', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('value_type', sa.String(), nullable=False),
+        sa.Column('numeric_value', sa.Float(), nullable=True),
+        sa.Column('text_value', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ['annotation_id'], ['annotations.id'], ondelete='CASCADE'
+        ),
+        sa.ForeignKeyConstraint(['obj_id'], ['objs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        op.f('ix_annotationvalues_annotation_id'),
+        'annotationvalues',
+        ['annotation_id'],
+        unique=False,
+    )
+    op.create_index(
+        'annotationvalues_numeric_index',
+        'annotationvalues',
+        ['origin', 'key', 'numeric_value', 'obj_id'],
+        unique=False,
+    )
+    op.create_index(
+        'annotationvalues_text_index',
+        'annotationvalues',
+        ['origin', 'key', 'text_value', 'obj_id'],
+        unique=False,
+    )
+
+    # Project the existing annotations, as candidates are filtered and sorted
+    # on this table (see `AnnotationValue.refresh`).
+    # `make backfill_annotation_values` rebuilds the table in batches, e.g.
+    # after a change of `AnnotationValue.MAX_TEXT_BYTES`.
+    op.execute(
+        f"""
+        INSERT INTO annotationvalues (
+            created_at, modified, annotation_id, obj_id, origin, key,
+            value_type, numeric_value, text_value
+        )
+        SELECT
+            timezone('utc', now()),
+            timezone('utc', now()),
+            annotations.id,
+            annotations.obj_id,
+            annotations.origin,
+            data.key,
+            jsonb_typeof(data.value),
+            CASE WHEN jsonb_typeof(data.value) = 'number'
+                THEN CAST(data.value #>> '{{}}' AS double precision)
+            END,
+            CASE WHEN jsonb_typeof(data.value) IN ('string', 'number', 'boolean')
+                AND octet_length(data.value #>> '{{}}') <= {MAX_TEXT_BYTES}
+                THEN data.value #>> '{{}}'
+            END
+        FROM annotations, jsonb_each(annotations.data) AS data
+        WHERE jsonb_typeof(annotations.data) = 'object'
+        """
+    )
+
+
+def downgrade():
+    op.drop_index('annotationvalues_text_index', table_name='annotationvalues')
+    op.drop_index('annotationvalues_numeric_index', table_name='annotationvalues')
+    op.drop_index(
+        op.f('ix_annotationvalues_annotation_id'), table_name='annotationvalues'
+    )
+    op.drop_table('annotationvalues')
@@ -0,0 +1,65 @@
+"""Add PhotStat table
+
+Revision ID: 5ae4b1b8a9c1
+Revises: b74a9ff3b29d
+Create Date: 2021-01-20 11:02:13.481220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5ae4b1b8a9c1'
+down_revision = 'b74a9ff3b29d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'photstats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('modified', sa.DateTime(), nullable=False),
+        sa.Column('obj_id', sa.String(), nullable=False),
+        sa.Column('num_obs', sa.Integer(), server_default='0', nullable=False),
+        sa.Column(
+            'num_det_per_filter',
+            postgresql.JSONB(astext_type=sa.Text()),
+            server_default='{}',
+            nullable=False,
+        ),
+        sa.Column('last_detected_mjd', sa.Float(), nullable=True),
+        sa.Column('last_detected_mag', sa.Float(), nullable=True),
+        sa.Column('peak_detected_mjd', sa.Float(), nullable=True),
+        sa.Column('peak_detected_mag', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['obj_id'], ['objs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_photstats_obj_id'), 'photstats', ['obj_id'], unique=True)
+    for column in [
+        'last_detected_mjd',
+        'last_detected_mag',
+        'peak_detected_mjd',
+        'peak_detected_mag',
+    ]:
+        op.create_index(
+            op.f(f'ix_photstats_{column}'), 'photstats', [column], unique=False
+        )
+
+    # The table is populated from the existing photometry by
+    # `make backfill_phot_stats`, which can run while the app is up.
+
+
+def downgrade():
+    for column in [
+        'last_detected_mjd',
+        'last_detected_mag',
+        'peak_detected_mjd',
+        'peak_detected_mag',
+    ]:
+        op.drop_index(op.f(f'ix_photstats_{column}'), table_name='photstats')
+    op.drop_index(op.f('ix_photstats_obj_id'), table_name='photstats')
+    op.drop_table('photstats')
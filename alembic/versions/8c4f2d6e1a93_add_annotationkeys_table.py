@@ -0,0 +1,61 @@
+"""Add AnnotationKey table
+
+Revision ID: 8c4f2d6e1a93
+Revises: 3a7e1c9d2b40
+Create Date: 2021-01-25 10:12:48.503671
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4f2d6e1a93'
+down_revision = '3a7e1c9d2b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'annotationkeys',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('modified', sa.DateTime(), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('origin', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('value_type', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'annotationkeys_main_index',
+        'annotationkeys',
+        ['group_id', 'origin', 'key', 'value_type'],
+        unique=True,
+    )
+
+    # Catalog the existing annotation values (see `AnnotationKey.rebuild`,
+    # which `make rebuild_annotation_keys` runs)
+    op.execute(
+        """
+        INSERT INTO annotationkeys (
+            created_at, modified, group_id, origin, key, value_type
+        )
+        SELECT DISTINCT
+            timezone('utc', now()),
+            timezone('utc', now()),
+            ga.group_id,
+            av.origin,
+            av.key,
+            av.value_type
+        FROM annotationvalues AS av
+        JOIN group_annotations AS ga ON ga.annotation_id = av.annotation_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_index('annotationkeys_main_index', table_name='annotationkeys')
+    op.drop_table('annotationkeys')
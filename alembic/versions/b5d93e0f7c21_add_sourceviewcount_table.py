@@ -0,0 +1,62 @@
+"""Add SourceViewCount table
+
+Revision ID: b5d93e0f7c21
+Revises: 8c4f2d6e1a93
+Create Date: 2021-01-27 14:36:05.218904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d93e0f7c21'
+down_revision = '8c4f2d6e1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'sourceviewcounts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('modified', sa.DateTime(), nullable=False),
+        sa.Column('obj_id', sa.String(), nullable=False),
+        sa.Column('granularity', sa.String(), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('views', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['obj_id'], ['objs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'sourceviewcounts_main_index',
+        'sourceviewcounts',
+        ['granularity', 'bucket', 'obj_id'],
+        unique=True,
+    )
+
+    # Count the existing source views (see `SourceViewCount.rebuild`, which
+    # `make rebuild_source_view_counts` runs)
+    op.execute(
+        """
+        INSERT INTO sourceviewcounts (
+            created_at, modified, obj_id, granularity, bucket, views
+        )
+        SELECT
+            timezone('utc', now()),
+            timezone('utc', now()),
+            sv.obj_id,
+            granularity,
+            date_trunc(granularity, sv.created_at),
+            count(*)
+        FROM sourceviews AS sv
+        CROSS JOIN unnest(ARRAY['hour', 'day']) AS granularity
+        GROUP BY 3, 4, 5
+        """
+    )
+
+
+def downgrade():
+    op.drop_index('sourceviewcounts_main_index', table_name='sourceviewcounts')
+    op.drop_table('sourceviewcounts')
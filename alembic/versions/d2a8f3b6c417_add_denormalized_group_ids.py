@@ -0,0 +1,114 @@
+"""Add denormalized group_ids columns
+
+Revision ID: d2a8f3b6c417
+Revises: b5d93e0f7c21
+Create Date: 2021-01-29 11:02:37.640185
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a8f3b6c417'
+down_revision = 'b5d93e0f7c21'
+branch_labels = None
+depends_on = None
+
+
+# (table, join table, foreign key column of the join table)
+TABLES = [
+    ('comments', 'group_comments', 'comment_id'),
+    ('annotations', 'group_annotations', 'annotation_id'),
+    ('classifications', 'group_classifications', 'classification_id'),
+    ('photometry', 'group_photometry', 'photometr_id'),
+    ('spectra', 'group_spectra', 'spectr_id'),
+]
+
+# The transition tables of the triggers of each operation; an UPDATE may
+# move join table rows from a row of the table to another, so both the old
+# and the new rows are resynced
+TRANSITIONS = {
+    'INSERT': 'NEW TABLE AS new_rows',
+    'UPDATE': 'NEW TABLE AS new_rows OLD TABLE AS old_rows',
+    'DELETE': 'OLD TABLE AS old_rows',
+}
+
+
+def upgrade():
+    for table, join_table, foreign_key in TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                'group_ids',
+                postgresql.ARRAY(sa.Integer()),
+                server_default='{}',
+                nullable=False,
+            ),
+        )
+        op.execute(
+            f"""
+            UPDATE {table} SET group_ids = j.group_ids
+            FROM (
+                SELECT {foreign_key}, array_agg(group_id ORDER BY group_id) AS group_ids
+                FROM {join_table}
+                GROUP BY {foreign_key}
+            ) AS j
+            WHERE {table}.id = j.{foreign_key}
+            """
+        )
+        op.create_index(
+            f'{table}_group_ids_index',
+            table,
+            ['group_ids'],
+            postgresql_using='gin',
+        )
+
+        def sync(changed_ids):
+            return f"""
+            UPDATE {table} SET group_ids = ARRAY(
+                SELECT j.group_id FROM {join_table} AS j
+                WHERE j.{foreign_key} = {table}.id
+                ORDER BY j.group_id
+            )
+            WHERE {table}.id IN ({changed_ids});
+            """
+
+        new_ids = f'SELECT new_rows.{foreign_key} FROM new_rows'
+        old_ids = f'SELECT old_rows.{foreign_key} FROM old_rows'
+        op.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION {join_table}_sync_group_ids()
+            RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN {sync(new_ids)}
+                ELSIF TG_OP = 'DELETE' THEN {sync(old_ids)}
+                ELSE {sync(f'{new_ids} UNION {old_ids}')}
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """
+        )
+        for operation, transition in TRANSITIONS.items():
+            op.execute(
+                f"""
+                CREATE TRIGGER {join_table}_{operation.lower()}_group_ids
+                AFTER {operation} ON {join_table}
+                REFERENCING {transition}
+                FOR EACH STATEMENT EXECUTE PROCEDURE {join_table}_sync_group_ids();
+                """
+            )
+
+
+def downgrade():
+    for table, join_table, _ in TABLES:
+        for operation in TRANSITIONS:
+            op.execute(
+                f"DROP TRIGGER {join_table}_{operation.lower()}_group_ids "
+                f"ON {join_table}"
+            )
+        op.execute(f"DROP FUNCTION {join_table}_sync_group_ids()")
+        op.drop_index(f'{table}_group_ids_index', table_name=table)
+        op.drop_column(table, 'group_ids')
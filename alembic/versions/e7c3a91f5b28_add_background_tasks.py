@@ -0,0 +1,51 @@
+"""Add BackgroundTask table
+
+Revision ID: e7c3a91f5b28
+Revises: d2a8f3b6c417
+Create Date: 2021-02-01 10:12:44.503187
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c3a91f5b28'
+down_revision = 'd2a8f3b6c417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'backgroundtasks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('modified', sa.DateTime(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('kwargs', postgresql.JSONB(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'backgroundtasks_queue_index',
+        'backgroundtasks',
+        ['run_at'],
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+    op.create_index(
+        'backgroundtasks_status_index',
+        'backgroundtasks',
+        ['status', 'name'],
+    )
+
+
+def downgrade():
+    op.drop_index('backgroundtasks_status_index', table_name='backgroundtasks')
+    op.drop_index('backgroundtasks_queue_index', table_name='backgroundtasks')
+    op.drop_table('backgroundtasks')
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+
+import datetime
+from skyportal.models import init_db, BackgroundTask, DBSession
+from baselayer.app.env import load_env
+
+
+env, cfg = load_env()
+init_db(**cfg["database"])
+
+cutoffs = {}
+for status in ["succeeded", "failed"]:
+    key = f"days_to_keep_{status}_tasks"
+    try:
+        n_days = int(cfg[f"task_queue.{key}"])
+    except ValueError:
+        raise ValueError(
+            f"Invalid (non-integer) value provided for {key} in config file."
+        )
+
+    if n_days < 1:
+        raise ValueError(f"{key} must be a positive integer")
+
+    cutoffs[status] = datetime.datetime.utcnow() - datetime.timedelta(days=n_days)
+
+n_deleted = BackgroundTask.prune(cutoffs["succeeded"], cutoffs["failed"])
+
+DBSession.commit()
+
+print(f"Deleted {n_deleted} background tasks.")
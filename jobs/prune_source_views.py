@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+
+import datetime
+from skyportal.models import init_db, SourceViewCount, DBSession
+from baselayer.app.env import load_env
+
+
+env, cfg = load_env()
+init_db(**cfg["database"])
+
+try:
+    n_days = int(cfg["misc.days_to_keep_source_views"])
+except ValueError:
+    raise ValueError(
+        "Invalid (non-integer) value provided for "
+        "days_to_keep_source_views in config file."
+    )
+
+if n_days < 1:
+    raise ValueError("days_to_keep_source_views must be a positive integer")
+
+cutoff_datetime = datetime.datetime.utcnow() - datetime.timedelta(days=n_days)
+
+n_deleted = SourceViewCount.prune(cutoff_datetime)
+
+DBSession.commit()
+
+print(f"Deleted {n_deleted} source views.")
@@ -0,0 +1,48 @@
+"""Run the background tasks queued by API writes (see
+`skyportal.models.BackgroundTask`).
+
+Several instances of this service may run against the same database: each
+task is claimed by a single worker.
+"""
+
+import time
+
+from baselayer.app.env import load_env
+from baselayer.log import make_log
+
+from skyportal.models import init_db, BackgroundTask, DBSession
+
+
+env, cfg = load_env()
+log = make_log('task_queue')
+
+init_db(**cfg['database'])
+
+poll_interval = cfg['task_queue.poll_interval']
+run_params = {
+    'max_attempts': cfg['task_queue.max_attempts'],
+    'retry_backoff': cfg['task_queue.retry_backoff'],
+    'timeout': cfg['task_queue.task_timeout'],
+}
+
+log('Waiting for background tasks')
+while True:
+    try:
+        task = BackgroundTask.run_next(**run_params)
+    except Exception as e:
+        # e.g., the database is unavailable
+        DBSession.rollback()
+        log(f'Could not run background tasks: {e}')
+        time.sleep(poll_interval)
+        continue
+
+    if task is None:
+        time.sleep(poll_interval)
+    elif task.status == 'succeeded':
+        log(f'Ran {task.name} (task {task.id})')
+    else:
+        error = task.error.strip().splitlines()[-1]
+        log(
+            f'{task.name} (task {task.id}) failed on attempt {task.attempts}'
+            f'{", retrying later" if task.status == "pending" else ""}: {error}'
+        )
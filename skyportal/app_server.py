@@ -1,4 +1,5 @@
 import tornado.web
+from tornado.ioloop import IOLoop
 
 from baselayer.app.app_server import MainPageHandler
 from baselayer.app import model_util as baselayer_model_util
@@ -10,6 +11,7 @@ from skyportal.handlers.api import (
     UserACLHandler,
     AllocationHandler,
     AssignmentHandler,
+    BackgroundTaskHandler,
     CandidateHandler,
     ClassificationHandler,
     CommentHandler,
@@ -60,6 +62,7 @@ from skyportal.handlers.api import (
 )
 from skyportal.handlers.api.internal import (
     PlotPhotometryHandler,
+    PlotCacheHandler,
     PlotSpectroscopyHandler,
     SourceViewsHandler,
     SourceCountHandler,
@@ -77,6 +80,7 @@ from skyportal.handlers.api.internal import (
 )
 
 from . import models, model_util, openapi
+from .utils.http_client import http_client
 
 
 log = make_log('app_server')
@@ -86,6 +90,7 @@ skyportal_handlers = [
     (r'/api/acls', ACLHandler),
     (r'/api/allocation(/.*)?', AllocationHandler),
     (r'/api/assignment(/.*)?', AssignmentHandler),
+    (r'/api/background_tasks', BackgroundTaskHandler),
     (r'/api/candidates(/.*)?', CandidateHandler),
     (r'/api/classification(/[0-9]+)?', ClassificationHandler),
     (r'/api/comment(/[0-9]+)?', CommentHandler),
@@ -143,6 +148,7 @@ skyportal_handlers = [
     (r'/api/internal/source_views(/.*)?', SourceViewsHandler),
     (r'/api/internal/source_counts(/.*)?', SourceCountHandler),
     (r'/api/internal/plot/photometry/(.*)', PlotPhotometryHandler),
+    (r'/api/internal/plot/cache', PlotCacheHandler),
     (r'/api/internal/plot/spectroscopy/(.*)', PlotSpectroscopyHandler),
     (r'/api/internal/instrument_forms', RoboticInstrumentsHandler),
     (r'/api/internal/standards', StandardsHandler),
@@ -253,4 +259,8 @@ def make_app(cfg, baselayer_handlers, baselayer_settings, process=None, env=None
 
     app.openapi_spec = openapi.spec_from_handlers(handlers)
 
+    # Requests to external services sent from executor threads (e.g., while
+    # generating finding charts) are run on the server's IOLoop
+    http_client.io_loop = IOLoop.current()
+
     return app
@@ -24,7 +24,15 @@ class Listener(_ListenerBase):
 
 
 class FollowUpAPI(_Base):
-    """An interface that User-contributed remote facility APIs must provide."""
+    """An interface that User-contributed remote facility APIs must provide.
+
+    The methods talking to the remote facility (`submit`, `update`, `get` and
+    `delete`) may be coroutine functions, so as not to block the server while
+    waiting for the facility (see `skyportal.utils.http_client`). Other
+    requests share `DBSession`, and may commit or close it in the meantime:
+    coroutines are called with the session committed, and should load the
+    request again once they have heard from the facility, rather than modify
+    the one they were called with."""
 
     # subclasses *must* implement the method below
     @staticmethod
@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 
 from lxml import etree
 from suds import Client
+from tornado.ioloop import IOLoop
 
 from astropy.coordinates import SkyCoord
 from astropy import units as u
@@ -20,6 +21,36 @@ LT_SCHEMA_LOCATION = (
 )
 
 
+async def send_rtml(url, headers, payload):
+    """Send an RTML document to the LT node agent.
+
+    The SOAP client is synchronous, so the exchange runs in an executor
+    thread rather than on the IOLoop.
+
+    Parameters
+    ----------
+    url: str
+        URL of the node agent WSDL.
+    headers: dict
+        Credentials of the allocation.
+    payload: str
+        The RTML document.
+
+    Returns
+    ----------
+    response: str
+        The RTML response, without its encoding tag, which causes issues
+        with lxml parsing.
+    """
+
+    def send():
+        client = Client(url=url, headers=headers)
+        return client.service.handle_rtml(payload)
+
+    response = await IOLoop.current().run_in_executor(None, send)
+    return response.replace('encoding="ISO-8859-1"', '')
+
+
 class LTRequest:
 
     """An XML structure for LT requests."""
@@ -340,7 +371,7 @@ class LTAPI(FollowUpAPI):
     """An interface to LT operations."""
 
     @staticmethod
-    def delete(request):
+    async def delete(request):
 
         """Delete a follow-up request from LT queue (all instruments).
 
@@ -352,10 +383,11 @@ class LTAPI(FollowUpAPI):
 
         from ..models import DBSession, FollowupRequest, FacilityTransaction
 
+        request_id = request.id
         req = (
             DBSession()
             .query(FollowupRequest)
-            .filter(FollowupRequest.id == request.id)
+            .filter(FollowupRequest.id == request_id)
             .one()
         )
 
@@ -394,11 +426,9 @@ class LTAPI(FollowUpAPI):
         etree.SubElement(contact, 'Communication')
         cancel = etree.tostring(cancel_payload, encoding='unicode', pretty_print=True)
 
-        client = Client(url=url, headers=headers)
-        # Send cancel_payload, and receive response string, removing the encoding tag which causes issue with lxml parsing
-        response = client.service.handle_rtml(cancel).replace(
-            'encoding="ISO-8859-1"', ''
-        )
+        # Send cancel_payload, and receive response string
+        response = await send_rtml(url, headers, cancel)
+        request = FollowupRequest.query.get(request_id)
         response_rtml = etree.fromstring(response)
         mode = response_rtml.get('mode')
         uid = response_rtml.get('uid')
@@ -420,7 +450,7 @@ class IOOAPI(LTAPI):
     """An interface to LT IOO operations."""
 
     @staticmethod
-    def submit(request):
+    async def submit(request):
 
         """Submit a follow-up request to LT's IOO.
 
@@ -430,8 +460,9 @@ class IOOAPI(LTAPI):
             The request to add to the queue and the SkyPortal database.
         """
 
-        from ..models import DBSession, FacilityTransaction
+        from ..models import DBSession, FacilityTransaction, FollowupRequest
 
+        request_id = request.id
         altdata = request.allocation.altdata
         if not altdata:
             raise ValueError('Missing allocation information.')
@@ -443,14 +474,12 @@ class IOOAPI(LTAPI):
             'Password': altdata["password"],
         }
         url = f"http://{cfg['app.lt_host']}:{cfg['app.lt_port']}/node_agent2/node_agent?wsdl"
-        client = Client(url=url, headers=headers)
         full_payload = etree.tostring(
             observation_payload, encoding="unicode", pretty_print=True
         )
-        # Send payload, and receive response string, removing the encoding tag which causes issue with lxml parsing
-        response = client.service.handle_rtml(full_payload).replace(
-            'encoding="ISO-8859-1"', ''
-        )
+        # Send payload, and receive response string
+        response = await send_rtml(url, headers, full_payload)
+        request = FollowupRequest.query.get(request_id)
         response_rtml = etree.fromstring(response)
         mode = response_rtml.get('mode')
 
@@ -555,7 +584,7 @@ class IOIAPI(LTAPI):
     """An interface to LT IOI operations."""
 
     @staticmethod
-    def submit(request):
+    async def submit(request):
 
         """Submit a follow-up request to LT's IOI.
 
@@ -565,8 +594,9 @@ class IOIAPI(LTAPI):
             The request to add to the queue and the SkyPortal database.
         """
 
-        from ..models import DBSession, FacilityTransaction
+        from ..models import DBSession, FacilityTransaction, FollowupRequest
 
+        request_id = request.id
         altdata = request.allocation.altdata
         if not altdata:
             raise ValueError('Missing allocation information.')
@@ -578,14 +608,12 @@ class IOIAPI(LTAPI):
             'Password': altdata["password"],
         }
         url = f"http://{cfg['app.lt_host']}:{cfg['app.lt_port']}/node_agent2/node_agent?wsdl"
-        client = Client(url=url, headers=headers)
         full_payload = etree.tostring(
             observation_payload, encoding="unicode", pretty_print=True
         )
-        # Send payload, and receive response string, removing the encoding tag which causes issue with lxml parsing
-        response = client.service.handle_rtml(full_payload).replace(
-            'encoding="ISO-8859-1"', ''
-        )
+        # Send payload, and receive response string
+        response = await send_rtml(url, headers, full_payload)
+        request = FollowupRequest.query.get(request_id)
         response_rtml = etree.fromstring(response)
         mode = response_rtml.get('mode')
 
@@ -690,7 +718,7 @@ class SPRATAPI(LTAPI):
     """An interface to LT SPRAT operations."""
 
     @staticmethod
-    def submit(request):
+    async def submit(request):
 
         """Submit a follow-up request to LT's SPRAT.
 
@@ -700,8 +728,9 @@ class SPRATAPI(LTAPI):
             The request to add to the queue and the SkyPortal database.
         """
 
-        from ..models import DBSession, FacilityTransaction
+        from ..models import DBSession, FacilityTransaction, FollowupRequest
 
+        request_id = request.id
         altdata = request.allocation.altdata
         if not altdata:
             raise ValueError('Missing allocation information.')
@@ -714,14 +743,12 @@ class SPRATAPI(LTAPI):
             'Password': altdata["password"],
         }
         url = f"http://{cfg['app.lt_host']}:{cfg['app.lt_port']}/node_agent2/node_agent?wsdl"
-        client = Client(url=url, headers=headers)
         full_payload = etree.tostring(
             observation_payload, encoding="unicode", pretty_print=True
         )
-        # Send payload, and receive response string, removing the encoding tag which causes issue with lxml parsing
-        response = client.service.handle_rtml(full_payload).replace(
-            'encoding="ISO-8859-1"', ''
-        )
+        # Send payload, and receive response string
+        response = await send_rtml(url, headers, full_payload)
+        request = FollowupRequest.query.get(request_id)
         response_rtml = etree.fromstring(response)
         mode = response_rtml.get('mode')
 
@@ -2,9 +2,10 @@ from . import FollowUpAPI, Listener
 from baselayer.app.env import load_env
 from datetime import datetime, timedelta
 import json
-import requests
+from requests_toolbelt import MultipartEncoder
 
 from ..utils import http
+from ..utils.http_client import http_client
 
 env, cfg = load_env()
 
@@ -137,11 +138,39 @@ def convert_request_to_sedm(request, method_value='new'):
     return payload
 
 
+async def post_to_sedm(request, method_value):
+    """POST a FollowupRequest to the SEDM queue, as a JSON file.
+
+    Parameters
+    ----------
+    request: skyportal.models.FollowupRequest
+        The request to send to SEDM.
+
+    method_value: 'new', 'edit', 'delete'
+        The desired SEDM queue action.
+
+    Returns
+    -------
+    response: tornado.httpclient.HTTPResponse
+        The response of the SEDM queue.
+    """
+
+    payload = convert_request_to_sedm(request, method_value=method_value)
+    content = json.dumps(payload)
+    body = MultipartEncoder(fields={'jsonfile': ('jsonfile', content)})
+    return await http_client.fetch(
+        cfg['app.sedm_endpoint'],
+        method='POST',
+        headers={'Content-Type': body.content_type},
+        body=body.to_string(),
+    )
+
+
 class SEDMAPI(FollowUpAPI):
     """SkyPortal interface to the Spectral Energy Distribution machine (SEDM)."""
 
     @staticmethod
-    def submit(request):
+    async def submit(request):
         """Submit a follow-up request to SEDM.
 
         Parameters
@@ -150,22 +179,20 @@ class SEDMAPI(FollowUpAPI):
             The request to submit.
         """
 
-        from ..models import FacilityTransaction, DBSession
+        from ..models import FacilityTransaction, FollowupRequest, DBSession
 
-        payload = convert_request_to_sedm(request, method_value='new')
-        content = json.dumps(payload)
-        r = requests.post(
-            cfg['app.sedm_endpoint'], files={'jsonfile': ('jsonfile', content)},
-        )
+        request_id = request.id
+        r = await post_to_sedm(request, method_value='new')
+        request = FollowupRequest.query.get(request_id)
 
-        if r.status_code == 200:
+        if r.code == 200:
             request.status = 'submitted'
         else:
-            request.status = f'rejected: {r.content}'
+            request.status = f'rejected: {r.body}'
 
         transaction = FacilityTransaction(
-            request=http.serialize_requests_request(r.request),
-            response=http.serialize_requests_response(r),
+            request=http.serialize_tornado_http_request(r.request),
+            response=http.serialize_tornado_http_response(r),
             followup_request=request,
             initiator_id=request.last_modified_by_id,
         )
@@ -173,7 +200,7 @@ class SEDMAPI(FollowUpAPI):
         DBSession().add(transaction)
 
     @staticmethod
-    def delete(request):
+    async def delete(request):
         """Delete a follow-up request from SEDM queue.
 
         Parameters
@@ -182,20 +209,18 @@ class SEDMAPI(FollowUpAPI):
             The request to delete from the queue and the SkyPortal database.
         """
 
-        from ..models import FacilityTransaction, DBSession
+        from ..models import FacilityTransaction, FollowupRequest, DBSession
 
-        payload = convert_request_to_sedm(request, method_value='delete')
-        content = json.dumps(payload)
-        r = requests.post(
-            cfg['app.sedm_endpoint'], files={'jsonfile': ('jsonfile', content)},
-        )
+        request_id = request.id
+        r = await post_to_sedm(request, method_value='delete')
+        request = FollowupRequest.query.get(request_id)
 
-        r.raise_for_status()
+        r.rethrow()
         request.status = "deleted"
 
         transaction = FacilityTransaction(
-            request=http.serialize_requests_request(r.request),
-            response=http.serialize_requests_response(r),
+            request=http.serialize_tornado_http_request(r.request),
+            response=http.serialize_tornado_http_response(r),
             followup_request=request,
             initiator_id=request.last_modified_by_id,
         )
@@ -203,7 +228,7 @@ class SEDMAPI(FollowUpAPI):
         DBSession().add(transaction)
 
     @staticmethod
-    def update(request):
+    async def update(request):
         """Update a request in the SEDM queue.
 
         Parameters
@@ -212,22 +237,20 @@ class SEDMAPI(FollowUpAPI):
             The updated request.
         """
 
-        from ..models import FacilityTransaction, DBSession
+        from ..models import FacilityTransaction, FollowupRequest, DBSession
 
-        payload = convert_request_to_sedm(request, method_value='edit')
-        content = json.dumps(payload)
-        r = requests.post(
-            cfg['app.sedm_endpoint'], files={'jsonfile': ('jsonfile', content)},
-        )
+        request_id = request.id
+        r = await post_to_sedm(request, method_value='edit')
+        request = FollowupRequest.query.get(request_id)
 
-        if r.status_code == 200:
+        if r.code == 200:
             request.status = 'submitted'
         else:
-            request.status = f'rejected: {r.content}'
+            request.status = f'rejected: {r.body}'
 
         transaction = FacilityTransaction(
-            request=http.serialize_requests_request(r.request),
-            response=http.serialize_requests_response(r),
+            request=http.serialize_tornado_http_request(r.request),
+            response=http.serialize_tornado_http_response(r),
             followup_request=request,
             initiator_id=request.last_modified_by_id,
         )
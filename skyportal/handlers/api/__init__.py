@@ -1,5 +1,6 @@
 from .acls import ACLHandler, UserACLHandler
 from .allocation import AllocationHandler
+from .background_task import BackgroundTaskHandler
 from .candidate import CandidateHandler
 from .classification import ClassificationHandler, ObjClassificationHandler
 from .comment import CommentHandler, CommentAttachmentHandler
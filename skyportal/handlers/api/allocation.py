@@ -54,11 +54,7 @@ class AllocationHandler(BaseHandler):
         allocations = (
             DBSession()
             .query(Allocation)
-            .filter(
-                Allocation.group_id.in_(
-                    [g.id for g in self.current_user.accessible_groups]
-                )
-            )
+            .filter(Allocation.group_id.in_(self.current_user.accessible_group_ids))
         )
 
         if allocation_id is not None:
@@ -2,7 +2,16 @@ import re
 from marshmallow.exceptions import ValidationError
 from baselayer.app.access import permissions, auth_or_token
 from ..base import BaseHandler
-from ...models import DBSession, Source, Annotation, Group, Candidate, Filter
+from ...models import (
+    DBSession,
+    Source,
+    Annotation,
+    AnnotationKey,
+    AnnotationValue,
+    Group,
+    Candidate,
+    Filter,
+)
 
 
 class AnnotationHandler(BaseHandler):
@@ -111,13 +120,8 @@ class AnnotationHandler(BaseHandler):
         annotation_data = data.get("data")
 
         # Ensure user/token has access to parent source
-        user_accessible_group_ids = [g.id for g in self.current_user.accessible_groups]
-        user_accessible_filter_ids = [
-            filtr.id
-            for g in self.current_user.accessible_groups
-            for filtr in g.filters
-            if g.filters is not None
-        ]
+        user_accessible_group_ids = self.current_user.accessible_group_ids
+        user_accessible_filter_ids = self.current_user.accessible_filter_ids
 
         if not group_ids:
             group_ids = user_accessible_group_ids
@@ -164,6 +168,9 @@ class AnnotationHandler(BaseHandler):
         )
 
         DBSession().add(annotation)
+        DBSession().flush()
+        AnnotationValue.refresh([annotation.id])
+        AnnotationKey.add([annotation.id])
         DBSession().commit()
 
         self.push_all(
@@ -213,6 +220,7 @@ class AnnotationHandler(BaseHandler):
         a = Annotation.get_if_readable_by(annotation_id, self.current_user)
         if a is None:
             return self.error('Invalid annotation ID.')
+        previous_origin = a.origin
 
         data = self.get_json()
         group_ids = data.pop("group_ids", None)
@@ -232,12 +240,16 @@ class AnnotationHandler(BaseHandler):
                     "Invalid group_ids field. Specify at least one valid group ID."
                 )
             if not all(
-                [group in self.current_user.accessible_groups for group in groups]
+                [group.id in self.current_user.accessible_group_ids for group in groups]
             ):
                 return self.error(
                     "Cannot associate an annotation with groups you are not a member of."
                 )
             a.groups = groups
+        DBSession().flush()
+        AnnotationValue.refresh([a.id])
+        AnnotationKey.add([a.id])
+        AnnotationKey.prune({previous_origin, a.origin})
         DBSession().commit()
         self.push_all(
             action='skyportal/REFRESH_SOURCE', payload={'obj_key': a.obj.internal_key}
@@ -268,10 +280,12 @@ class AnnotationHandler(BaseHandler):
         if a is None:
             return self.error("Invalid annotation ID")
         obj_key = a.obj.internal_key
+        origin = a.origin
         if (user.is_system_admin or "Manage groups" in user.permissions) or (
             a.author == user
         ):
             Annotation.query.filter_by(id=annotation_id).delete()
+            AnnotationKey.prune([origin])
             DBSession().commit()
         else:
             return self.error('Insufficient user permissions.')
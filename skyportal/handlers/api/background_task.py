@@ -0,0 +1,102 @@
+from sqlalchemy import func
+
+from baselayer.app.access import permissions
+from ..base import BaseHandler
+from ...models import DBSession, BackgroundTask
+
+
+class BackgroundTaskHandler(BaseHandler):
+    @permissions(['System admin'])
+    def get(self):
+        """
+        ---
+        description: Retrieve the state of the background task queue
+        tags:
+          - system_info
+        parameters:
+          - in: query
+            name: status
+            nullable: true
+            schema:
+              type: string
+              enum: [pending, running, succeeded, failed]
+            description: |
+              Status of the tasks to return. Defaults to `failed`.
+          - in: query
+            name: numPerPage
+            nullable: true
+            schema:
+              type: integer
+            description: |
+              Number of tasks to return, most recently modified first.
+              Defaults to 100.
+        responses:
+          200:
+            content:
+              application/json:
+                schema:
+                  allOf:
+                    - $ref: '#/components/schemas/Success'
+                    - type: object
+                      properties:
+                        data:
+                          type: object
+                          properties:
+                            counts:
+                              type: object
+                              description: |
+                                Number of tasks by task name and status,
+                                e.g. {"send_source_notification": {"pending": 2}}
+                            oldestPendingRunAt:
+                              type: string
+                              description: |
+                                UTC time since which the oldest pending task
+                                has been due, if any
+                            tasks:
+                              type: array
+                              items:
+                                $ref: '#/components/schemas/BackgroundTask'
+          400:
+            content:
+              application/json:
+                schema: Error
+        """
+        status = self.get_query_argument('status', 'failed')
+        if status not in BackgroundTask.STATUSES:
+            return self.error(
+                f'Invalid status: should be one of {", ".join(BackgroundTask.STATUSES)}'
+            )
+        try:
+            num_per_page = int(self.get_query_argument('numPerPage', 100))
+        except ValueError:
+            return self.error('Invalid numPerPage value.')
+
+        counts = {}
+        for name, task_status, count in (
+            DBSession()
+            .query(BackgroundTask.name, BackgroundTask.status, func.count())
+            .group_by(BackgroundTask.name, BackgroundTask.status)
+        ):
+            counts.setdefault(name, {})[task_status] = count
+
+        oldest_pending_run_at = (
+            DBSession()
+            .query(func.min(BackgroundTask.run_at))
+            .filter(BackgroundTask.status == 'pending')
+            .scalar()
+        )
+
+        tasks = (
+            BackgroundTask.query.filter(BackgroundTask.status == status)
+            .order_by(BackgroundTask.modified.desc())
+            .limit(num_per_page)
+            .all()
+        )
+
+        return self.success(
+            data={
+                'counts': counts,
+                'oldestPendingRunAt': oldest_pending_run_at,
+                'tasks': tasks,
+            }
+        )
@@ -1,3 +1,4 @@
+import base64
 import datetime
 from copy import copy
 import re
@@ -6,9 +7,8 @@ import ast
 
 import arrow
 
-from sqlalchemy.orm import joinedload
-from sqlalchemy.sql.expression import case, func
-from sqlalchemy.types import Float, Boolean
+from sqlalchemy.orm import aliased, joinedload, selectinload
+from sqlalchemy.sql.expression import and_, func, or_
 from marshmallow.exceptions import ValidationError
 
 from baselayer.app.access import auth_or_token, permissions
@@ -22,8 +22,13 @@ from ...models import (
     Source,
     Filter,
     Annotation,
+    AnnotationValue,
     Group,
     Classification,
+    Comment,
+    get_obj_data_readable_by,
+    get_detection_stats,
+    get_derived_astro_fields,
 )
 
 
@@ -43,6 +48,114 @@ def update_redshift_history_if_relevant(request_data, obj, user):
         obj.redshift_history = redshift_history
 
 
+def get_candidate_list_info(objs, user_or_token, user_accessible_filter_ids):
+    """Build the response dicts for a page of candidates.
+
+    The saved groups, classifications, passing filters, comments and
+    annotations of all of the Objs are loaded with one query each, keyed on
+    the page's obj_ids, and their galactic coordinates and distances are
+    computed all at once with `get_derived_astro_fields`, so that the number
+    of queries does not depend on the number of candidates on the page.
+
+    Parameters
+    ----------
+    objs : list of `skyportal.models.Obj`
+       The Objs on the page, in the order in which they should be returned.
+    user_or_token : `baselayer.app.models.User` or `baselayer.app.models.Token`
+       The requesting `User` or `Token` object.
+    user_accessible_filter_ids : collection of int
+       The IDs of the Filters of the requester's accessible groups.
+
+    Returns
+    -------
+    candidate_list : list of dict
+       The serialized candidates.
+    """
+    obj_ids = [obj.id for obj in objs]
+    if len(obj_ids) == 0:
+        return []
+    user_accessible_group_ids = user_or_token.accessible_group_ids
+
+    matching_source_ids = {
+        obj_id
+        for obj_id, in DBSession()
+        .query(Source.obj_id)
+        .filter(Source.group_id.in_(user_accessible_group_ids))
+        .filter(Source.obj_id.in_(obj_ids))
+    }
+    saved_groups = {obj_id: [] for obj_id in matching_source_ids}
+    for group, obj_id in (
+        DBSession()
+        .query(Group, Source.obj_id)
+        .join(Source)
+        .filter(Source.obj_id.in_(list(matching_source_ids)))
+        .filter(Source.active.is_(True))
+        .filter(Group.id.in_(user_accessible_group_ids))
+    ):
+        saved_groups[obj_id].append(group)
+    classifications = get_obj_data_readable_by(
+        Classification, list(matching_source_ids), user_or_token
+    )
+
+    passing_group_ids = {obj_id: [] for obj_id in obj_ids}
+    for obj_id, _, group_id in (
+        DBSession()
+        .query(Candidate.obj_id, Filter.id, Filter.group_id)
+        .join(Filter, Filter.id == Candidate.filter_id)
+        .filter(Candidate.obj_id.in_(obj_ids))
+        .filter(Filter.id.in_(user_accessible_filter_ids))
+        .distinct()
+        .order_by(Candidate.obj_id, Filter.id)
+    ):
+        passing_group_ids[obj_id].append(group_id)
+
+    comments = get_obj_data_readable_by(
+        Comment, obj_ids, user_or_token, options=[joinedload(Comment.author)]
+    )
+    annotations = get_obj_data_readable_by(
+        Annotation, obj_ids, user_or_token, options=[joinedload(Annotation.author)]
+    )
+    detection_stats = get_detection_stats(obj_ids)
+    astro_fields = get_derived_astro_fields(objs)
+
+    candidate_list = []
+    for obj in objs:
+        candidate_info = obj.to_dict()
+        candidate_info["is_source"] = obj.id in matching_source_ids
+        if candidate_info["is_source"]:
+            candidate_info["saved_groups"] = saved_groups[obj.id]
+            candidate_info["classifications"] = classifications[obj.id]
+        candidate_info["passing_group_ids"] = passing_group_ids[obj.id]
+        for comment in comments[obj.id]:
+            comment.author_info = comment.construct_author_info_dict()
+        candidate_info["comments"] = sorted(
+            [cmt.to_dict() for cmt in comments[obj.id]],
+            key=lambda x: x["created_at"],
+            reverse=True,
+        )
+        for annotation in annotations[obj.id]:
+            annotation.author_info = annotation.construct_author_info_dict()
+        candidate_info["annotations"] = sorted(
+            annotations[obj.id], key=lambda x: x.origin,
+        )
+        candidate_info["last_detected_at"] = detection_stats[obj.id]["last_detected_at"]
+        candidate_info.update(astro_fields[obj.id])
+        candidate_list.append(candidate_info)
+
+    return candidate_list
+
+
+def annotation_value_filter(origin, key, *criteria):
+    """Return a filter selecting the Objs with an Annotation from `origin`
+    whose value for `key` satisfies `criteria` (expressions on the columns of
+    `AnnotationValue`), which resolves to an index range scan."""
+    return Obj.id.in_(
+        DBSession()
+        .query(AnnotationValue.obj_id)
+        .filter(AnnotationValue.origin == origin, AnnotationValue.key == key, *criteria)
+    )
+
+
 class CandidateHandler(BaseHandler):
     @auth_or_token
     def head(self, obj_id=None):
@@ -68,7 +181,7 @@ class CandidateHandler(BaseHandler):
                 application/json:
                   schema: Error
         """
-        user_group_ids = [g.id for g in self.associated_user_object.accessible_groups]
+        user_group_ids = self.associated_user_object.accessible_group_ids
         num_c = (
             DBSession()
             .query(Candidate)
@@ -131,6 +244,27 @@ class CandidateHandler(BaseHandler):
             description: |
               Used only in the case of paginating query results - if provided, this
               allows for avoiding a potentially expensive query.count() call.
+          - in: query
+            name: cursor
+            nullable: true
+            schema:
+              type: string
+            description: |
+              Use cursor pagination instead of page numbers: return the page
+              following this cursor, taken from the `nextCursor` of the previous
+              page, or the first page if empty. Later pages cost the same as the
+              first. Not supported when sorting by annotation.
+          - in: query
+            name: countMode
+            nullable: true
+            schema:
+              type: string
+              enum: [exact, estimate, none]
+            description: |
+              How to compute totalMatches when it is not provided: count the
+              matches ("exact", the default), use the database's (fast but rough)
+              estimate ("estimate"), or skip it ("none"), e.g. to render the first
+              page without waiting for the count.
           - in: query
             name: unsavedOnly
             nullable: true
@@ -289,16 +423,25 @@ class CandidateHandler(BaseHandler):
                                           type: boolean
                               totalMatches:
                                 type: integer
+                                nullable: true
+                              totalMatchesIsEstimate:
+                                type: boolean
                               pageNumber:
                                 type: integer
                               numPerPage:
                                 type: integer
+                              nextCursor:
+                                type: string
+                                nullable: true
+                                description: |
+                                  Cursor of the next page, if using cursor
+                                  pagination. Null on the last page.
             400:
               content:
                 application/json:
                   schema: Error
         """
-        user_accessible_group_ids = [g.id for g in self.current_user.accessible_groups]
+        user_accessible_group_ids = self.current_user.accessible_group_ids
         include_photometry = self.get_query_argument("includePhotometry", False)
         include_spectra = self.get_query_argument("includeSpectra", False)
 
@@ -327,9 +470,7 @@ class CandidateHandler(BaseHandler):
                 .join(Filter)
                 .filter(
                     Candidate.obj_id == obj_id,
-                    Filter.group_id.in_(
-                        [g.id for g in self.current_user.accessible_groups]
-                    ),
+                    Filter.group_id.in_(self.current_user.accessible_group_ids),
                 )
                 .all()
             )
@@ -374,11 +515,7 @@ class CandidateHandler(BaseHandler):
                     self.current_user
                 )
             candidate_info["last_detected_at"] = c.last_detected_at
-            candidate_info["gal_lon"] = c.gal_lon_deg
-            candidate_info["gal_lat"] = c.gal_lat_deg
-            candidate_info["luminosity_distance"] = c.luminosity_distance
-            candidate_info["dm"] = c.dm
-            candidate_info["angular_diameter_distance"] = c.angular_diameter_distance
+            candidate_info.update(get_derived_astro_fields([c])[c.id])
 
             return self.success(data=candidate_info)
 
@@ -386,6 +523,8 @@ class CandidateHandler(BaseHandler):
         n_per_page = self.get_query_argument("numPerPage", None) or 25
         unsaved_only = self.get_query_argument("unsavedOnly", False)
         total_matches = self.get_query_argument("totalMatches", None)
+        cursor = self.get_query_argument("cursor", None)
+        count_mode = self.get_query_argument("countMode", "exact")
         start_date = self.get_query_argument("startDate", None)
         end_date = self.get_query_argument("endDate", None)
         group_ids = self.get_query_argument("groupIDs", None)
@@ -400,13 +539,8 @@ class CandidateHandler(BaseHandler):
         annotation_filter_list = self.get_query_argument("annotationFilterList", None)
         classifications = self.get_query_argument("classifications", None)
         redshift_range_str = self.get_query_argument("redshiftRange", None)
-        user_accessible_group_ids = [g.id for g in self.current_user.accessible_groups]
-        user_accessible_filter_ids = [
-            filtr.id
-            for g in self.current_user.accessible_groups
-            for filtr in g.filters
-            if g.filters is not None
-        ]
+        user_accessible_group_ids = self.current_user.accessible_group_ids
+        user_accessible_filter_ids = self.current_user.accessible_filter_ids
         if group_ids is not None:
             if isinstance(group_ids, str) and "," in group_ids:
                 group_ids = [int(g_id) for g_id in group_ids.split(",")]
@@ -462,8 +596,7 @@ class CandidateHandler(BaseHandler):
                     .filter(Candidate.filter_id.in_(filter_ids))
                 )
             )
-            .outerjoin(Annotation)
-        )  # Join in annotations info for sort/filter
+        )
         if classifications is not None:
             if isinstance(classifications, str) and "," in classifications:
                 classifications = [c.strip() for c in classifications.split(",")]
@@ -477,10 +610,12 @@ class CandidateHandler(BaseHandler):
                 Classification.classification.in_(classifications)
             )
         if sort_by_origin is None:
-            # Don't apply the order by just yet. Save it so we can pass it to
-            # the LIMT/OFFSET helper function down the line once other query
-            # params are set.
-            order_by = [Obj.last_detected_at.desc().nullslast(), Obj.id]
+            # Don't apply the sort just yet. Save it so we can pass it to
+            # the pagination helper function down the line once other query
+            # params are set. All the rows of a candidate sort the same way,
+            # which allows for cursor pagination.
+            order_by = None
+            sort_keys = [(Obj.last_detected_at, "desc")]
         if unsaved_only == "true":
             q = q.filter(
                 Obj.id.notin_(
@@ -565,9 +700,11 @@ class CandidateHandler(BaseHandler):
                     value = new_filter["value"]
                     if isinstance(value, bool):
                         q = q.filter(
-                            Annotation.origin == new_filter["origin"],
-                            Annotation.data[new_filter["key"]].astext.cast(Boolean)
-                            == value,
+                            annotation_value_filter(
+                                new_filter["origin"],
+                                new_filter["key"],
+                                AnnotationValue.text_value == json.dumps(value),
+                            )
                         )
                     else:
                         # Test if the value is a nested object
@@ -580,23 +717,47 @@ class CandidateHandler(BaseHandler):
                             # have value = { "key": "value" } (with the extra
                             # spaces around the braces) and cause the filter to
                             # fail.
+                            is_nested = isinstance(value, (dict, list))
                             value = json.dumps(value)
                         except json.decoder.JSONDecodeError:
                             # If not, this is just a string field and we don't
                             # need the string formatting above
-                            pass
-                        q = q.filter(
-                            Annotation.origin == new_filter["origin"],
-                            Annotation.data[new_filter["key"]].astext == value,
-                        )
+                            is_nested = False
+                        if (
+                            is_nested
+                            or len(value.encode()) > AnnotationValue.MAX_TEXT_BYTES
+                        ):
+                            # These values are not projected into AnnotationValue
+                            q = q.filter(
+                                Obj.id.in_(
+                                    DBSession()
+                                    .query(Annotation.obj_id)
+                                    .filter(
+                                        Annotation.origin == new_filter["origin"],
+                                        Annotation.data[new_filter["key"]].astext
+                                        == value,
+                                    )
+                                )
+                            )
+                        else:
+                            q = q.filter(
+                                annotation_value_filter(
+                                    new_filter["origin"],
+                                    new_filter["key"],
+                                    AnnotationValue.text_value == value,
+                                )
+                            )
                 elif "min" in new_filter and "max" in new_filter:
                     try:
                         min_value = float(new_filter["min"])
                         max_value = float(new_filter["max"])
                         q = q.filter(
-                            Annotation.origin == new_filter["origin"],
-                            Annotation.data[new_filter["key"]].cast(Float) >= min_value,
-                            Annotation.data[new_filter["key"]].cast(Float) <= max_value,
+                            annotation_value_filter(
+                                new_filter["origin"],
+                                new_filter["key"],
+                                AnnotationValue.numeric_value >= min_value,
+                                AnnotationValue.numeric_value <= max_value,
+                            )
                         )
                     except ValueError:
                         return self.error(
@@ -610,24 +771,36 @@ class CandidateHandler(BaseHandler):
         if sort_by_origin is not None:
             sort_by_key = self.get_query_argument("sortByAnnotationKey", None)
             sort_by_order = self.get_query_argument("sortByAnnotationOrder", None)
-            # Define a custom sort order to have annotations from the correct
-            # origin first, all others afterwards
-            origin_sort_order = case(
-                value=Annotation.origin, whens={sort_by_origin: 1}, else_=None,
-            )
-            annotation_sort_criterion = (
-                Annotation.data[sort_by_key].desc().nullslast()
-                if sort_by_order == "desc"
-                else Annotation.data[sort_by_key].nullslast()
+            # Join in the value to sort on, if any: there is at most one per
+            # Obj for a given origin and key, so this does not duplicate rows
+            sort_value = aliased(AnnotationValue)
+            q = q.outerjoin(
+                sort_value,
+                and_(
+                    sort_value.obj_id == Obj.id,
+                    sort_value.origin == sort_by_origin,
+                    sort_value.key == sort_by_key,
+                ),
             )
+            # Numbers sort numerically, and other values on their text
+            # representation. Objs without a value come last.
+            if sort_by_order == "desc":
+                annotation_sort_criteria = [
+                    sort_value.numeric_value.desc().nullslast(),
+                    sort_value.text_value.desc().nullslast(),
+                ]
+            else:
+                annotation_sort_criteria = [
+                    sort_value.numeric_value.nullslast(),
+                    sort_value.text_value.nullslast(),
+                ]
             # Don't apply the order by just yet. Save it so we can pass it to
             # the LIMT/OFFSET helper function.
-            order_by = [
-                origin_sort_order.nullslast(),
-                annotation_sort_criterion,
+            order_by = annotation_sort_criteria + [
                 Obj.last_detected_at.desc().nullslast(),
                 Obj.id,
             ]
+            sort_keys = None
         try:
             query_results = grab_query_results(
                 q,
@@ -638,74 +811,15 @@ class CandidateHandler(BaseHandler):
                 order_by=order_by,
                 include_photometry=include_photometry,
                 include_spectra=include_spectra,
+                sort_keys=sort_keys,
+                cursor=cursor,
+                count=count_mode,
             )
-        except ValueError as e:
-            if "Page number out of range" in str(e):
-                return self.error("Page number out of range.")
-            raise
-        matching_source_ids = (
-            DBSession()
-            .query(Source.obj_id)
-            .filter(Source.group_id.in_(user_accessible_group_ids))
-            .filter(Source.obj_id.in_([obj.id for obj in query_results["candidates"]]))
-            .all()
+        except InvalidPaginationError as e:
+            return self.error(str(e))
+        query_results["candidates"] = get_candidate_list_info(
+            query_results["candidates"], self.current_user, user_accessible_filter_ids
         )
-        candidate_list = []
-        for obj in query_results["candidates"]:
-            with DBSession().no_autoflush:
-                obj.is_source = (obj.id,) in matching_source_ids
-                if obj.is_source:
-                    obj.saved_groups = (
-                        DBSession()
-                        .query(Group)
-                        .join(Source)
-                        .filter(Source.obj_id == obj.id)
-                        .filter(Source.active.is_(True))
-                        .filter(Group.id.in_(user_accessible_group_ids))
-                        .all()
-                    )
-                    obj.classifications = obj.get_classifications_readable_by(
-                        self.current_user
-                    )
-                obj.passing_group_ids = [
-                    f.group_id
-                    for f in (
-                        DBSession()
-                        .query(Filter)
-                        .filter(Filter.id.in_(user_accessible_filter_ids))
-                        .filter(
-                            Filter.id.in_(
-                                DBSession()
-                                .query(Candidate.filter_id)
-                                .filter(Candidate.obj_id == obj.id)
-                            )
-                        )
-                        .all()
-                    )
-                ]
-                candidate_list.append(obj.to_dict())
-                candidate_list[-1]["comments"] = sorted(
-                    [
-                        cmt.to_dict()
-                        for cmt in obj.get_comments_readable_by(self.current_user)
-                    ],
-                    key=lambda x: x["created_at"],
-                    reverse=True,
-                )
-                candidate_list[-1]["annotations"] = sorted(
-                    obj.get_annotations_readable_by(self.current_user),
-                    key=lambda x: x.origin,
-                )
-                candidate_list[-1]["last_detected_at"] = obj.last_detected_at
-                candidate_list[-1]["gal_lat"] = obj.gal_lat_deg
-                candidate_list[-1]["gal_lon"] = obj.gal_lon_deg
-                candidate_list[-1]["luminosity_distance"] = obj.luminosity_distance
-                candidate_list[-1]["dm"] = obj.dm
-                candidate_list[-1][
-                    "angular_diameter_distance"
-                ] = obj.angular_diameter_distance
-
-        query_results["candidates"] = candidate_list
         return self.success(data=query_results)
 
     @permissions(["Upload data"])
@@ -779,12 +893,7 @@ class CandidateHandler(BaseHandler):
             filter_ids = data.pop("filter_ids")
         except KeyError:
             return self.error("Missing required filter_ids parameter.")
-        user_accessible_filter_ids = [
-            filtr.id
-            for g in self.current_user.accessible_groups
-            for filtr in g.filters
-            if g.filters is not None
-        ]
+        user_accessible_filter_ids = self.current_user.accessible_filter_ids
         if not all([fid in user_accessible_filter_ids for fid in filter_ids]):
             return self.error(
                 "Insufficient permissions - you must only specify "
@@ -815,9 +924,9 @@ class CandidateHandler(BaseHandler):
             for filter in filters
         ]
         DBSession().add_all(candidates)
-        DBSession().commit()
         if not obj_already_exists:
             obj.add_linked_thumbnails()
+        DBSession().commit()
 
         return self.success(data={"ids": [c.id for c in candidates]})
 
@@ -852,37 +961,25 @@ class CandidateHandler(BaseHandler):
         return self.success()
 
 
-def grab_query_results(
-    q,
-    total_matches,
-    page,
-    n_items_per_page,
-    items_name,
-    order_by=None,
-    include_photometry=False,
-    include_spectra=False,
-):
-    # The query will return multiple rows per candidate object if it has multiple
-    # annotations associated with it, with rows appearing at the end of the query
-    # for any annotations with origins not equal to the one being sorted on (if applicable).
-    # We want to essentially grab only the candidate objects as they first appear
-    # in the query results, and ignore these other irrelevant annotation entries.
+def get_ids_ordered_by_row_number(q, order_by):
+    """Order the IDs of the Objs of `q` by the first row in which they appear.
+    See `grab_query_results`."""
+    # The query may return multiple rows per candidate object, e.g. one per
+    # Candidate (filter) that it passed. We want to essentially grab only the
+    # candidate objects as they first appear in the query results, and ignore
+    # the other rows.
 
     # Add a "row_num" column to the desire query that explicitly encodes the ordering
-    # of the query results - remember that these query rows are essentially
-    # (Obj, Annotation) tuples, so the earliest row numbers for a given Obj is
-    # the one we want to adhere to (and the later ones are annotation records for
-    # the candidate that are not being sorted/filtered on right now)
+    # of the query results, so that the earliest row number for a given Obj is
+    # the one we want to adhere to.
     #
     # The row number must be preserved like this in order to remember the desired
     # ordering info even while using the passed in query as a subquery to select
     # from. This is because subqueries provide a set of results to query from,
     # losing any order_by information.
     row = func.row_number().over(order_by=order_by).label("row_num")
-    full_query = q.add_column(row)
+    full_query = q.add_column(row).subquery()
 
-    info = {}
-    full_query = full_query.subquery()
     # Using the PostgreSQL DISTINCT ON keyword, we grab the candidate Obj ids
     # in the order that they first appear in the query (per the row_num values)
     # NOTE: It is probably possible to grab the full Obj records here instead of
@@ -901,18 +998,223 @@ def grab_query_results(
     # Grouping and getting the first distinct obj_id above messed up the order
     # in the query set, so re-order by the row_num we used to remember the
     # original ordering
-    ordered_ids = (
+    return (
         DBSession().query(ids_with_row_nums.c.id).order_by(ids_with_row_nums.c.row_num)
     )
 
+
+COUNT_MODES = ["exact", "estimate", "none"]
+
+
+class InvalidPaginationError(ValueError):
+    """Raised by `grab_query_results` when the requested page, cursor or
+    count mode is invalid."""
+
+
+def get_keyset_order_by(sort_keys):
+    """Order by some columns of Obj (nulls last), then by Obj ID.
+
+    Parameters
+    ----------
+    sort_keys : list of (sqlalchemy column expression, str)
+        Expressions on the columns of Obj to sort on, and their sort order
+        ("asc" or "desc").
+
+    Returns
+    -------
+    list
+        The ORDER BY clauses.
+    """
+    return [
+        expression.desc().nullslast() if order == "desc" else expression.nullslast()
+        for expression, order in [*sort_keys, (Obj.id, "asc")]
+    ]
+
+
+def get_keyset_filter(sort_keys, values):
+    """Select the Objs sorting after a given row.
+    See `get_keyset_order_by`.
+
+    Parameters
+    ----------
+    sort_keys : list of (sqlalchemy column expression, str)
+        Expressions to sort on, and their sort order.
+    values : list
+        The values of the sort keys, followed by the Obj ID, of the row to
+        start after.
+
+    Returns
+    -------
+    sqlalchemy.sql.expression.BooleanClauseList
+        The WHERE clause.
+    """
+    keys = [expression for expression, _ in sort_keys] + [Obj.id]
+    orders = [order for _, order in sort_keys] + ["asc"]
+
+    clauses = []
+    for i, (expression, order, value) in enumerate(zip(keys, orders, values)):
+        if value is None:
+            # nulls sort last, so only other nulls (compared on the next
+            # keys) sort after a null
+            continue
+        after = expression < value if order == "desc" else expression > value
+        ties = [
+            k.is_(None) if v is None else k == v for k, v in zip(keys[:i], values[:i])
+        ]
+        clauses.append(and_(*ties, or_(after, expression.is_(None))))
+    return or_(*clauses)
+
+
+def encode_cursor(values):
+    """Encode the sort key values and ID of an Obj as an opaque cursor."""
+    values = [v.isoformat() if isinstance(v, datetime.datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, n_values):
+    """Decode a cursor made by `encode_cursor`.
+
+    Raises
+    ------
+    InvalidPaginationError
+        If the cursor is invalid or was made for a different sort.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise InvalidPaginationError("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != n_values:
+        raise InvalidPaginationError("Invalid cursor.")
+    return values
+
+
+def estimate_count(query):
+    """Return the query planner's estimate of the number of rows of a query.
+
+    The estimate is based on the table statistics, so it is only a rough
+    indication of the number of matches, but it costs no more than planning
+    the query.
+    """
+    connection = DBSession().connection()
+    compiled = query.statement.compile(dialect=connection.dialect)
+    plan = connection.execute(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def grab_query_results(
+    q,
+    total_matches,
+    page,
+    n_items_per_page,
+    items_name,
+    order_by=None,
+    include_photometry=False,
+    include_spectra=False,
+    sort_keys=None,
+    cursor=None,
+    count="exact",
+):
+    """Return the page of Objs matched by a query, in order.
+
+    Parameters
+    ----------
+    q : sqlalchemy.orm.Query
+        Query on Obj, possibly joined to other tables (e.g. Candidate), so
+        that it may return several rows per Obj.
+    total_matches : int or None
+        The number of matching Objs, if known from a previous request.
+    page : int or None
+        The page number (starting from 1), or None to return all the Objs.
+        Ignored if `cursor` is given.
+    n_items_per_page : int
+        The number of Objs per page.
+    items_name : str
+        The key under which the Objs are returned.
+    order_by : list, optional
+        The ordering of the Objs, by the first row in which they appear in
+        `q`. Ignored if `sort_keys` is given.
+    include_photometry, include_spectra : bool, optional
+        Whether to load the photometry/spectra of the Objs.
+    sort_keys : list of (sqlalchemy column expression, str), optional
+        Expressions on the columns of Obj, and their sort order ("asc" or
+        "desc"), to sort the Objs on instead of `order_by`, nulls last and
+        then by ID. As all the rows of an Obj sort the same way, this skips
+        the `row_number()` window and `DISTINCT ON` subqueries, and allows
+        for cursor pagination.
+    cursor : str, optional
+        Return the `n_items_per_page` Objs following this cursor, taken
+        from the `nextCursor` of a previous page, or the first page if
+        empty. Requires `sort_keys`. Later pages cost the same as the first.
+    count : str, optional
+        How to compute `totalMatches` when not given: "exact" (the default)
+        counts the matches, "estimate" uses the query planner's estimate
+        (and sets `totalMatchesIsEstimate`), and "none" skips it.
+
+    Returns
+    -------
+    dict
+        The Objs, under `items_name`, and the total number of matches
+        (`totalMatches`) and number of items per page (`numPerPage`). Also
+        contains the page number (`pageNumber`), or with a cursor the
+        cursor of the next page (`nextCursor`, null on the last page).
+
+    Raises
+    ------
+    InvalidPaginationError
+        If the page number, cursor or count mode is invalid.
+    """
+    if count not in COUNT_MODES:
+        raise InvalidPaginationError(
+            f"Invalid count mode, must be one of {COUNT_MODES}."
+        )
+    if cursor is not None and sort_keys is None:
+        raise InvalidPaginationError(
+            "Cursor pagination is not supported for this sort order."
+        )
+
+    info = {}
+    if sort_keys is None:
+        ordered_ids = get_ids_ordered_by_row_number(q, order_by)
+    else:
+        # Each Obj is selected once, so no deduplication is needed. The sort
+        # keys are selected as well, to build the cursors.
+        ordered_ids = (
+            DBSession()
+            .query(Obj.id, *[expression for expression, _ in sort_keys])
+            .filter(Obj.id.in_(q.with_entities(Obj.id).subquery()))
+            .order_by(*get_keyset_order_by(sort_keys))
+        )
+
     if total_matches:
         info["totalMatches"] = int(total_matches)
+    elif count == "exact":
+        info["totalMatches"] = ordered_ids.order_by(None).count()
+    elif count == "estimate":
+        info["totalMatches"] = estimate_count(ordered_ids.order_by(None))
+        info["totalMatchesIsEstimate"] = True
     else:
-        info["totalMatches"] = ordered_ids.count()
+        info["totalMatches"] = None
 
-    if page:
-        if (
-            (
+    if cursor is not None:
+        if cursor:
+            values = decode_cursor(cursor, len(sort_keys) + 1)
+            ordered_ids = ordered_ids.filter(get_keyset_filter(sort_keys, values))
+
+        # fetch one more row to know whether there is a next page
+        rows = ordered_ids.limit(n_items_per_page + 1).all()
+        page_ids = rows[:n_items_per_page]
+        info["nextCursor"] = (
+            encode_cursor([*page_ids[-1][1:], page_ids[-1][0]])
+            if len(rows) > n_items_per_page
+            else None
+        )
+        info["numPerPage"] = n_items_per_page
+    elif page:
+        # the page number can only be checked against an exact count
+        if info["totalMatches"] is not None and not info.get("totalMatchesIsEstimate"):
+            if (
                 (
                     info["totalMatches"] < (page - 1) * n_items_per_page
                     and info["totalMatches"] % n_items_per_page != 0
@@ -922,11 +1224,10 @@ def grab_query_results(
                     and info["totalMatches"] % n_items_per_page == 0
                 )
                 and info["totalMatches"] != 0
-            )
-            or page <= 0
-            or (info["totalMatches"] == 0 and page != 1)
-        ):
-            raise ValueError("Page number out of range.")
+            ) or (info["totalMatches"] == 0 and page != 1):
+                raise InvalidPaginationError("Page number out of range.")
+        if page <= 0:
+            raise InvalidPaginationError("Page number out of range.")
 
         # Now bring in the full Obj info for the candidates
         page_ids = (
@@ -939,15 +1240,19 @@ def grab_query_results(
     else:
         page_ids = ordered_ids.all()
 
-    items = []
-    query_options = [joinedload(Obj.thumbnails)]
+    # Load the whole page at once, loading each relationship with one more
+    # IN query (rather than joining them all in), then restore the order
+    page_ids = [row[0] for row in page_ids]
+    query_options = [selectinload(Obj.thumbnails)]
     if include_photometry:
         query_options.append(
-            joinedload(Obj.photometry).joinedload(Photometry.instrument)
+            selectinload(Obj.photometry).joinedload(Photometry.instrument)
         )
     if include_spectra:
-        query_options.append(joinedload(Obj.spectra).joinedload(Spectrum.instrument))
-    for item_id in page_ids:
-        items.append(Obj.query.options(query_options).get(item_id))
-    info[items_name] = items
+        query_options.append(selectinload(Obj.spectra).joinedload(Spectrum.instrument))
+    objs = {
+        obj.id: obj
+        for obj in Obj.query.options(query_options).filter(Obj.id.in_(page_ids))
+    }
+    info[items_name] = [objs[item_id] for item_id in page_ids]
     return info
@@ -100,7 +100,7 @@ class ClassificationHandler(BaseHandler):
         if source is None:
             return self.error("Invalid source.")
         user_group_ids = [g.id for g in self.current_user.groups]
-        user_accessible_group_ids = [g.id for g in self.current_user.accessible_groups]
+        user_accessible_group_ids = self.current_user.accessible_group_ids
         group_ids = data.pop("group_ids", user_group_ids)
         group_ids = [gid for gid in group_ids if gid in user_accessible_group_ids]
         if not group_ids:
@@ -232,7 +232,7 @@ class ClassificationHandler(BaseHandler):
                     "Invalid group_ids field. " "Specify at least one valid group ID."
                 )
             if not all(
-                [group in self.current_user.accessible_groups for group in groups]
+                [group.id in self.current_user.accessible_group_ids for group in groups]
             ):
                 return self.error(
                     "Cannot associate classification with groups you are "
@@ -54,9 +54,7 @@ class FilterHandler(BaseHandler):
                     .query(Filter)
                     .filter(
                         Filter.id == filter_id,
-                        Filter.group_id.in_(
-                            [g.id for g in self.current_user.accessible_groups]
-                        ),
+                        Filter.group_id.in_(self.current_user.accessible_group_ids),
                     )
                     .first()
                 )
@@ -71,9 +69,7 @@ class FilterHandler(BaseHandler):
         filters = (
             DBSession()
             .query(Filter)
-            .filter(
-                Filter.group_id.in_([g.id for g in self.current_user.accessible_groups])
-            )
+            .filter(Filter.group_id.in_(self.current_user.accessible_group_ids))
             .all()
         )
         return self.success(data=filters)
@@ -180,9 +176,7 @@ class FilterHandler(BaseHandler):
                 .query(Filter)
                 .filter(
                     Filter.id == filter_id,
-                    Filter.group_id.in_(
-                        [g.id for g in self.current_user.accessible_groups]
-                    ),
+                    Filter.group_id.in_(self.current_user.accessible_group_ids),
                 )
                 .first()
             )
@@ -235,9 +229,7 @@ class FilterHandler(BaseHandler):
                 .query(Filter)
                 .filter(
                     Filter.id == filter_id,
-                    Filter.group_id.in_(
-                        [g.id for g in self.current_user.accessible_groups]
-                    ),
+                    Filter.group_id.in_(self.current_user.accessible_group_ids),
                 )
                 .first()
             )
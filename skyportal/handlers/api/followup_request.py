@@ -1,3 +1,5 @@
+import inspect
+
 import jsonschema
 from marshmallow.exceptions import ValidationError
 
@@ -19,6 +21,24 @@ from sqlalchemy.orm import joinedload
 from ...schema import AssignmentSchema, FollowupRequestPost
 
 
+async def call_facility_api(method, request):
+    """Call a method of a facility API, which may be a coroutine function
+    (so as not to block the IOLoop while waiting for the facility).
+
+    Other requests share `DBSession`, and may commit, roll back or close it
+    while a coroutine waits for the facility, so the changes made to the
+    session are committed before one is awaited. The request objects held
+    by the caller should not be used afterwards: load them again instead,
+    e.g. to revert the committed changes and record the failure if the call
+    raises.
+    """
+    if not inspect.iscoroutinefunction(method):
+        method(request)
+        return
+    DBSession().commit()
+    await method(request)
+
+
 class AssignmentHandler(BaseHandler):
     @auth_or_token
     def get(self, assignment_id=None):
@@ -64,7 +84,7 @@ class AssignmentHandler(BaseHandler):
             assignments.join(Obj)
             .join(Source)
             .join(Group)
-            .filter(Group.id.in_([g.id for g in self.current_user.accessible_groups]))
+            .filter(Group.id.in_(self.current_user.accessible_group_ids))
         )
 
         if assignment_id is not None:
@@ -304,7 +324,7 @@ class FollowupRequestHandler(BaseHandler):
             followup_requests.join(Obj)
             .join(Source)
             .join(Group)
-            .filter(Group.id.in_([g.id for g in self.current_user.accessible_groups]))
+            .filter(Group.id.in_(self.current_user.accessible_group_ids))
         )
 
         if followup_request_id is not None:
@@ -330,7 +350,7 @@ class FollowupRequestHandler(BaseHandler):
         return self.success(data=followup_requests)
 
     @auth_or_token
-    def post(self):
+    async def post(self):
         """
         ---
         description: Submit follow-up request.
@@ -373,9 +393,7 @@ class FollowupRequestHandler(BaseHandler):
         allocation = Allocation.query.get(data['allocation_id'])
         if allocation is None:
             return self.error('No such allocation.')
-        if allocation.group_id not in [
-            g.id for g in self.current_user.accessible_groups
-        ]:
+        if allocation.group_id not in self.current_user.accessible_group_ids:
             return self.error('User does not have access to this allocation.')
 
         instrument = allocation.instrument
@@ -399,28 +417,29 @@ class FollowupRequestHandler(BaseHandler):
         followup_request.target_groups = target_groups
         DBSession().add(followup_request)
         DBSession().commit()
+        followup_request_id = followup_request.id
+        obj_key = followup_request.obj.internal_key
 
         self.push_all(
-            action="skyportal/REFRESH_SOURCE",
-            payload={"obj_key": followup_request.obj.internal_key},
+            action="skyportal/REFRESH_SOURCE", payload={"obj_key": obj_key},
         )
 
         try:
-            instrument.api_class.submit(followup_request)
+            await call_facility_api(instrument.api_class.submit, followup_request)
         except Exception:
+            followup_request = FollowupRequest.query.get(followup_request_id)
             followup_request.status = 'failed to submit'
             raise
         finally:
             DBSession().commit()
             self.push_all(
-                action="skyportal/REFRESH_SOURCE",
-                payload={"obj_key": followup_request.obj.internal_key},
+                action="skyportal/REFRESH_SOURCE", payload={"obj_key": obj_key},
             )
 
-        return self.success(data={"id": followup_request.id})
+        return self.success(data={"id": followup_request_id})
 
     @auth_or_token
-    def put(self, request_id):
+    async def put(self, request_id):
         """
         ---
         description: Update a follow-up request
@@ -486,20 +505,36 @@ class FollowupRequestHandler(BaseHandler):
                 f'Error parsing followup request update: "{e.normalized_messages()}"'
             )
 
+        # the edits are committed before the facility is contacted (see
+        # `call_facility_api`), so they are reverted if it cannot be updated
+        previous_values = {
+            k: getattr(followup_request, k)
+            for k in data
+            if k not in ['id', 'last_modified_by_id']
+        }
         for k in data:
             setattr(followup_request, k, data[k])
 
-        followup_request.instrument.api_class.update(followup_request)
-        DBSession().commit()
+        followup_request_id = followup_request.id
+        obj_key = followup_request.obj.internal_key
+        try:
+            await call_facility_api(api.update, followup_request)
+        except Exception:
+            followup_request = FollowupRequest.query.get(followup_request_id)
+            for k, v in previous_values.items():
+                setattr(followup_request, k, v)
+            followup_request.status = 'failed to update'
+            raise
+        finally:
+            DBSession().commit()
 
         self.push_all(
-            action="skyportal/REFRESH_SOURCE",
-            payload={"obj_key": followup_request.obj.internal_key},
+            action="skyportal/REFRESH_SOURCE", payload={"obj_key": obj_key},
         )
         return self.success()
 
     @auth_or_token
-    def delete(self, request_id):
+    async def delete(self, request_id):
         """
         ---
         description: Delete follow-up request.
@@ -533,11 +568,18 @@ class FollowupRequestHandler(BaseHandler):
             return self.error('Cannot delete requests on this instrument.')
 
         followup_request.last_modified_by_id = self.associated_user_object.id
-        api.delete(followup_request)
-        DBSession().commit()
+        followup_request_id = followup_request.id
+        obj_key = followup_request.obj.internal_key
+        try:
+            await call_facility_api(api.delete, followup_request)
+        except Exception:
+            followup_request = FollowupRequest.query.get(followup_request_id)
+            followup_request.status = 'failed to delete'
+            raise
+        finally:
+            DBSession().commit()
 
         self.push_all(
-            action="skyportal/REFRESH_SOURCE",
-            payload={"obj_key": followup_request.obj.internal_key},
+            action="skyportal/REFRESH_SOURCE", payload={"obj_key": obj_key},
         )
         return self.success()
@@ -3,6 +3,7 @@ from .plot import (
     PlotSpectroscopyHandler,
     PlotAssignmentAirmassHandler,
     PlotObjTelAirmassHandler,
+    PlotCacheHandler,
 )
 from .token import TokenHandler
 from .dbinfo import DBInfoHandler
@@ -0,0 +1,115 @@
+import hashlib
+import json
+
+from sqlalchemy import event
+
+from baselayer.app.env import load_env
+from baselayer.app.json_util import to_json
+from ....models import (
+    DBSession,
+    Classification,
+    Comment,
+    Photometry,
+    Source,
+    Spectrum,
+)
+from ....utils.cache import TTLCache
+
+
+_, cfg = load_env()
+
+# Responses of the home page widgets, keyed by (widget, sorted accessible
+# group IDs, hash of the widget preferences), so that users with the same
+# groups and preferences share entries. The entries of a widget are dropped
+# eagerly when this process commits rows the widget depends on (see
+# `WIDGET_DEPENDENCIES`); changes made through other server processes are
+# picked up once the entries expire, after `misc.dashboard_cache_ttl` seconds.
+dashboard_cache = TTLCache(
+    max_items=cfg['misc.max_items_in_dashboard_cache'],
+    ttl=cfg['misc.dashboard_cache_ttl'],
+)
+
+# The widgets whose responses change when rows of a model are added, modified
+# or deleted. Source views are left out on purpose: they only shift the view
+# counts of the top sources, which are refreshed when the entries expire.
+# Photometry bulk inserted with Core statements does not emit session events
+# and is likewise only picked up on expiry.
+WIDGET_DEPENDENCIES = {
+    Source: {'recent_sources', 'source_views', 'source_counts', 'news_feed'},
+    Comment: {'news_feed'},
+    Classification: {'recent_sources', 'source_views', 'news_feed'},
+    Spectrum: {'news_feed'},
+    Photometry: {'news_feed'},
+}
+
+
+def get_widget_data(widget, user_or_token, preferences, compute):
+    """Return the response of a home page widget, from the cache if possible.
+
+    Parameters
+    ----------
+    widget : str
+        Name of the widget, as used in `WIDGET_DEPENDENCIES`.
+    user_or_token : `baselayer.app.models.User` or `baselayer.app.models.Token`
+        The requesting `User` or `Token` object.
+    preferences : dict
+        The widget preferences the response depends on.
+    compute : callable
+        Called without arguments to compute the response on a cache miss.
+        It may only depend on the requester's accessible groups and on
+        `preferences`.
+
+    Returns
+    -------
+    data : object
+        The JSON-serializable response.
+    """
+    group_ids = tuple(sorted(user_or_token.accessible_group_ids))
+    preferences_hash = hashlib.md5(
+        json.dumps(preferences, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+    key = (widget, group_ids, preferences_hash)
+
+    data = dashboard_cache[key]
+    if data is None:
+        # Cache plain JSON types rather than ORM instances, which would be
+        # expired once the request's session is closed
+        data = json.loads(to_json(compute()))
+        dashboard_cache[key] = data
+    return data
+
+
+def invalidate_dashboard_cache(widgets):
+    """Drop the cached responses of some home page widgets.
+
+    Parameters
+    ----------
+    widgets : iterable of str
+        Names of the widgets.
+    """
+    widgets = set(widgets)
+    dashboard_cache.invalidate(lambda key: key[0] in widgets)
+
+
+@event.listens_for(DBSession, 'after_flush')
+def _record_changed_widgets(session, flush_context):
+    changed = session.info.setdefault('changed_dashboard_widgets', set())
+    for instance in [*session.new, *session.dirty, *session.deleted]:
+        changed |= WIDGET_DEPENDENCIES.get(type(instance), set())
+
+
+@event.listens_for(DBSession, 'after_bulk_update')
+@event.listens_for(DBSession, 'after_bulk_delete')
+def _record_bulk_changed_widgets(context):
+    changed = context.session.info.setdefault('changed_dashboard_widgets', set())
+    changed |= WIDGET_DEPENDENCIES.get(context.mapper.class_, set())
+
+
+@event.listens_for(DBSession, 'after_commit')
+def _invalidate_changed_widgets(session):
+    invalidate_dashboard_cache(session.info.pop('changed_dashboard_widgets', set()))
+
+
+@event.listens_for(DBSession, 'after_rollback')
+def _forget_changed_widgets(session):
+    session.info.pop('changed_dashboard_widgets', None)
@@ -1,40 +1,219 @@
 from baselayer.app.access import auth_or_token
+from baselayer.app.env import load_env
 from ...base import BaseHandler
 from .... import plot
-from ....models import ClassicalAssignment, Source, Telescope
+from ....models import (
+    ClassicalAssignment,
+    DBSession,
+    GroupSpectrum,
+    Obj,
+    Photometry,
+    Source,
+    Spectrum,
+    Telescope,
+)
+from ....utils.cache import TTLCache
+from ....utils.lightcurve import parse_reduction_arguments
 
 import numpy as np
 from astropy import time as ap_time
 import pandas as pd
+import sqlalchemy as sa
+
+
+_, cfg = load_env()
+
+# Rendered Bokeh plots, keyed by (plot type, obj_id, accessible group IDs,
+# width, height, spectrum ID or light curve reduction, data version). The
+# data version is read from the database on every request, so that entries
+# rendered before a change made through another server process are never
+# served. Entries are also dropped eagerly by `invalidate_plot_cache` when
+# this process changes the data of an object. As the "Days Ago" axis of the
+# photometry plots is drawn relative to the current time, entries expire
+# after `misc.plot_cache_ttl` seconds.
+plot_cache = TTLCache(
+    max_items=cfg['misc.max_items_in_plot_cache'], ttl=cfg['misc.plot_cache_ttl']
+)
+
+
+def invalidate_plot_cache(obj_ids):
+    """Drop the cached plots of the given objects.
+
+    Parameters
+    ----------
+    obj_ids : iterable of str
+        IDs of the Objs whose photometry or spectra changed.
+    """
+    obj_ids = set(obj_ids)
+    plot_cache.invalidate(lambda key: key[1] in obj_ids)
+
+
+def get_obj_modified(obj_id):
+    return sa.select([Obj.modified]).where(Obj.id == obj_id).label('obj_modified')
+
+
+def get_photometry_version(obj_id, group_ids):
+    """Summarize the photometry of an Obj visible to some groups.
+
+    Any upload, update, deletion or (un)sharing of the Obj's photometry
+    changes the returned value. Adding points increases the count. Deleting
+    them lowers it, and IDs are never reused, so the sum of IDs changes even
+    when an upload and a deletion leave the count unchanged. Updates bump
+    the modification time. The modification time of the Obj is included as
+    the absolute magnitude axis depends on its redshift.
+    """
+    return (
+        DBSession()
+        .query(
+            sa.func.count(Photometry.id),
+            sa.func.sum(Photometry.id),
+            sa.func.max(Photometry.modified),
+            get_obj_modified(obj_id),
+        )
+        .filter(Photometry.obj_id == obj_id)
+        .filter(Photometry.group_ids.overlap(group_ids))
+        .one()
+    )
+
+
+def get_spectroscopy_version(obj_id, group_ids):
+    """Summarize the spectra of an Obj visible to some groups.
+
+    See `get_photometry_version`. The modification time of the Obj is
+    included as its redshift is drawn on the plot.
+    """
+    return (
+        DBSession()
+        .query(
+            sa.func.count(Spectrum.id),
+            sa.func.sum(Spectrum.id),
+            sa.func.max(Spectrum.modified),
+            get_obj_modified(obj_id),
+        )
+        .filter(Spectrum.obj_id == obj_id)
+        .filter(
+            Spectrum.id.in_(
+                DBSession()
+                .query(GroupSpectrum.spectr_id)
+                .filter(GroupSpectrum.group_id.in_(group_ids))
+            )
+        )
+        .one()
+    )
 
 
 class PlotPhotometryHandler(BaseHandler):
     @auth_or_token
     def get(self, obj_id):
-        height = self.get_query_argument("height", 300)
-        width = self.get_query_argument("width", 600)
-        json = plot.photometry_plot(
-            obj_id, self.current_user, height=int(height), width=int(width),
+        height = int(self.get_query_argument("height", 300))
+        width = int(self.get_query_argument("width", 600))
+        try:
+            reduce, max_points, bin_size = parse_reduction_arguments(
+                self.get_query_argument("reduce", None),
+                self.get_query_argument(
+                    "maxPoints", cfg['misc.photometry_reduction_max_points']
+                ),
+                self.get_query_argument(
+                    "binSize", cfg['misc.photometry_reduction_bin_size']
+                ),
+            )
+        except ValueError as e:
+            return self.error(str(e))
+
+        group_ids = tuple(sorted(self.current_user.accessible_group_ids))
+        version = get_photometry_version(obj_id, group_ids)
+
+        # light curves are only reduced when they are too large to be sent
+        # in full; the number of points is part of the data version
+        n_points = version[0]
+        if n_points <= max_points:
+            reduce = None
+        reduction = None if reduce is None else (reduce, max_points, bin_size)
+        key = ('photometry', obj_id, group_ids, width, height, reduction, version)
+
+        json = plot_cache[key]
+        if json is None:
+            json = plot.photometry_plot(
+                obj_id,
+                self.current_user,
+                height=height,
+                width=width,
+                reduce=reduce,
+                max_points=max_points,
+                bin_size=bin_size,
+            )
+            plot_cache[key] = json
+        self.success(
+            data={
+                'bokehJSON': json,
+                'url': self.request.uri,
+                'reduced': reduce is not None,
+                'n_points': n_points,
+            }
         )
-        self.success(data={'bokehJSON': json, 'url': self.request.uri})
 
 
 class PlotSpectroscopyHandler(BaseHandler):
     @auth_or_token
     def get(self, obj_id):
-        height = self.get_query_argument("height", 300)
-        width = self.get_query_argument("width", 600)
+        height = int(self.get_query_argument("height", 300))
+        width = int(self.get_query_argument("width", 600))
         spec_id = self.get_query_argument("spectrumID", None)
-        json = plot.spectroscopy_plot(
-            obj_id,
-            self.associated_user_object,
-            spec_id,
-            height=int(height),
-            width=int(width),
-        )
+
+        user = self.associated_user_object
+        group_ids = tuple(sorted(user.accessible_group_ids))
+        version = get_spectroscopy_version(obj_id, group_ids)
+        key = ('spectroscopy', obj_id, group_ids, width, height, spec_id, version)
+
+        json = plot_cache[key]
+        if json is None:
+            json = plot.spectroscopy_plot(
+                obj_id,
+                user,
+                spec_id,
+                height=height,
+                width=width,
+            )
+            plot_cache[key] = json
         self.success(data={'bokehJSON': json, 'url': self.request.uri})
 
 
+class PlotCacheHandler(BaseHandler):
+    @auth_or_token
+    def get(self):
+        """
+        ---
+        description: Retrieve the hit and miss counts of this server
+          process's plot cache
+        responses:
+          200:
+            content:
+              application/json:
+                schema:
+                  allOf:
+                    - $ref: '#/components/schemas/Success'
+                    - type: object
+                      properties:
+                        data:
+                          type: object
+                          properties:
+                            hits:
+                              type: integer
+                            misses:
+                              type: integer
+                            size:
+                              type: integer
+                              description: Number of plots currently cached
+                            max_items:
+                              type: integer
+                              description: Maximum number of plots cached
+                            ttl:
+                              type: number
+                              description: Lifetime of the cached plots, in seconds
+        """
+        return self.success(data=plot_cache.stats())
+
+
 class AirmassHandler(BaseHandler):
     def calculate_airmass(self, obj, telescope, sunset, sunrise):
         permission_check = Source.get_obj_if_readable_by(obj.id, self.current_user)
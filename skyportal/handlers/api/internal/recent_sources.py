@@ -1,98 +1,103 @@
 from sqlalchemy import desc
 from sqlalchemy.orm import joinedload
-from collections import defaultdict
 from baselayer.app.access import auth_or_token
 from ...base import BaseHandler
-from ....models import DBSession, Obj, Source
+from ....models import (
+    DBSession,
+    Classification,
+    Obj,
+    Source,
+    get_obj_data_readable_by,
+)
+from .dashboard_cache import get_widget_data
 
 
 default_prefs = {'maxNumSources': 5}
 
 
-class RecentSourcesHandler(BaseHandler):
-    @classmethod
-    def get_recent_source_ids(self, current_user):
-        user_prefs = getattr(current_user, 'preferences', None) or {}
-        recent_sources_prefs = user_prefs.get('recentSources', {})
-        recent_sources_prefs = {**default_prefs, **recent_sources_prefs}
+def get_recent_sources(user_or_token, max_num_sources):
+    """Return the latest saves of the Sources accessible to a User or Token.
 
-        max_num_sources = int(recent_sources_prefs['maxNumSources'])
-        query_results = (
-            DBSession()
-            .query(Source)
-            .filter(
-                Source.obj_id.in_(
-                    DBSession()
-                    .query(Source.obj_id)
-                    .filter(
-                        Source.group_id.in_(
-                            [g.id for g in current_user.accessible_groups]
-                        )
-                    )
-                    .filter(Source.active.is_(True))
-                )
+    The saves, their Objs with thumbnails and the accessible classifications
+    of the Objs are fetched with a fixed number of queries.
+
+    Parameters
+    ----------
+    user_or_token : `baselayer.app.models.User` or `baselayer.app.models.Token`
+        The requesting `User` or `Token` object.
+    max_num_sources : int
+        Number of saves to return.
+
+    Returns
+    -------
+    sources : list of dict
+        One entry per save, latest first. An Obj appears once per recent
+        save, and all but its oldest save are flagged as `resaved`.
+    """
+    recent_saves = (
+        DBSession()
+        .query(Source.obj_id, Source.created_at)
+        .filter(
+            Source.obj_id.in_(
+                DBSession()
+                .query(Source.obj_id)
+                .filter(Source.group_id.in_(user_or_token.accessible_group_ids))
+                .filter(Source.active.is_(True))
             )
-            .order_by(desc('created_at'))
-            .distinct(Source.obj_id, Source.created_at)
-            .limit(max_num_sources)
-            .all()
         )
-        ids = map(lambda src: src.obj_id, query_results)
-        return ids
+        .order_by(desc(Source.created_at))
+        .distinct(Source.obj_id, Source.created_at)
+        .limit(max_num_sources)
+        .subquery()
+    )
+    query_results = (
+        DBSession()
+        .query(Obj, recent_saves.c.created_at)
+        .join(recent_saves, recent_saves.c.obj_id == Obj.id)
+        .options(joinedload(Obj.thumbnails))
+        .order_by(desc(recent_saves.c.created_at))
+        .all()
+    )
+    classifications = get_obj_data_readable_by(
+        Classification, {obj.id for obj, _ in query_results}, user_or_token
+    )
 
-    @auth_or_token
-    def get(self):
-        query_results = RecentSourcesHandler.get_recent_source_ids(self.current_user)
-        sources = []
-        sources_seen = defaultdict(lambda: 1)
-        for obj_id in query_results:
-            # The recency_index is how current a source row was saved for a given
-            # object. If recency_index = 0, this is the most recent time a source
-            # was saved; recency_index = 1 is the second-latest time the source
-            # was saved, etc.
-            recency_index = 0
-            if obj_id in sources_seen:
-                recency_index = sources_seen[obj_id]
-                sources_seen[obj_id] += 1
-
-            s = Source.get_obj_if_readable_by(  # Returns Source.obj
-                obj_id,
-                self.current_user,
-                options=[joinedload(Source.obj).joinedload(Obj.thumbnails)],
-            )
+    sources = []
+    sources_seen = set()
+    # Iterate from the oldest save, so that the later saves of an Obj are the
+    # ones marked as resaved
+    for obj, saved_at in reversed(query_results):
+        sources.insert(
+            0,
+            {
+                'obj_id': obj.id,
+                'ra': obj.ra,
+                'dec': obj.dec,
+                'created_at': saved_at,
+                'public_url': first_thumbnail_public_url(obj.thumbnails),
+                'classifications': classifications[obj.id],
+                'resaved': obj.id in sources_seen,
+            },
+        )
+        sources_seen.add(obj.id)
 
-            # Get the entry in the Source table to get the accurate saved_at time
-            source_entry = (
-                Source.query.filter(Source.obj_id == obj_id)
-                .order_by(desc('created_at'))
-                .offset(recency_index)
-                .first()
-            )
+    return sources
 
-            public_url = first_thumbnail_public_url(s.thumbnails)
-            sources.append(
-                {
-                    'obj_id': s.id,
-                    'ra': s.ra,
-                    'dec': s.dec,
-                    'created_at': source_entry.created_at,
-                    'public_url': public_url,
-                    'classifications': s.classifications,
-                    'recency_index': recency_index,
-                }
-            )
 
-        for source in sources:
-            num_times_seen = sources_seen[source["obj_id"]]
-            # If this source was saved multiple times recently, and this is not
-            # the oldest instance of an object being saved (highest recency_index)
-            if num_times_seen > 1 and source["recency_index"] != num_times_seen - 1:
-                source["resaved"] = True
-            else:
-                source["resaved"] = False
-            # Delete bookkeeping recency_index key
-            del source["recency_index"]
+class RecentSourcesHandler(BaseHandler):
+    @auth_or_token
+    def get(self):
+        user_prefs = getattr(self.current_user, 'preferences', None) or {}
+        recent_sources_prefs = user_prefs.get('recentSources', {})
+        recent_sources_prefs = {**default_prefs, **recent_sources_prefs}
 
+        max_num_sources = int(recent_sources_prefs['maxNumSources'])
+        sources = get_widget_data(
+            'recent_sources',
+            self.current_user,
+            recent_sources_prefs,
+            lambda: get_recent_sources(self.current_user, max_num_sources),
+        )
         return self.success(data=sources)
 
 
@@ -3,6 +3,7 @@ from sqlalchemy import func
 from baselayer.app.access import auth_or_token
 from ...base import BaseHandler
 from ....models import DBSession, Source
+from .dashboard_cache import get_widget_data
 
 default_prefs = {'sinceDaysAgo': 7}
 
@@ -20,13 +21,18 @@ class SourceCountHandler(BaseHandler):
             datetime.datetime.now() - datetime.timedelta(days=since_days_ago)
         ).isoformat()
 
-        q = (
-            DBSession.query(func.count(Source.obj_id).label('count'))
-            .filter(
-                Source.group_id.in_([g.id for g in self.current_user.accessible_groups])
+        def count_sources():
+            q = (
+                DBSession.query(func.count(Source.obj_id).label('count'))
+                .filter(Source.group_id.in_(self.current_user.accessible_group_ids))
+                .filter(Source.created_at >= cutoff_day)
             )
-            .filter(Source.created_at >= cutoff_day)
+            return q.first()[0]
+
+        # The cutoff moves with time, so it is not part of the cache key; the
+        # count may lag behind it by up to the cache TTL
+        result = get_widget_data(
+            'source_counts', self.current_user, source_count_prefs, count_sources
         )
-        result = q.first()[0]
         data = {"count": result, "sinceDaysAgo": since_days_ago}
         return self.success(data=data)
@@ -1,71 +1,119 @@
 import datetime
-from sqlalchemy import func, desc
+from sqlalchemy import and_, func, desc, or_
 from sqlalchemy.orm import joinedload
 import tornado.web
 from baselayer.app.access import auth_or_token
 from ...base import BaseHandler
-from ....models import DBSession, Obj, Source, SourceView
+from ....models import (
+    DBSession,
+    Classification,
+    Obj,
+    Source,
+    SourceView,
+    SourceViewCount,
+    get_obj_data_readable_by,
+)
 from .recent_sources import first_thumbnail_public_url
+from .dashboard_cache import get_widget_data
 
 
 default_prefs = {'maxNumSources': 10, 'sinceDaysAgo': 7}
 
 
-class SourceViewsHandler(BaseHandler):
-    @classmethod
-    def get_top_source_views_and_ids(self, current_user):
-        user_prefs = getattr(current_user, 'preferences', None) or {}
-        top_sources_prefs = user_prefs.get('topSources', {})
-        top_sources_prefs = {**default_prefs, **top_sources_prefs}
+def get_top_sources(user_or_token, max_num_sources, since_days_ago):
+    """Return the most viewed Sources accessible to a User or Token.
 
-        max_num_sources = int(top_sources_prefs['maxNumSources'])
-        since_days_ago = int(top_sources_prefs['sinceDaysAgo'])
-        cutoff_day = datetime.datetime.now() - datetime.timedelta(days=since_days_ago)
-        q = (
-            DBSession.query(
-                func.count(SourceView.obj_id).label('views'), SourceView.obj_id
-            )
-            .group_by(SourceView.obj_id)
-            .filter(
-                SourceView.obj_id.in_(
-                    DBSession.query(Source.obj_id).filter(
-                        Source.group_id.in_(
-                            [g.id for g in current_user.accessible_groups]
-                        )
-                    )
+    The views are summed from the hourly buckets of the first (partial) day
+    of the period and the daily buckets of the following days, so the period
+    starts at the beginning of the hour `since_days_ago` days ago. The view
+    counts, the Objs with thumbnails and the accessible classifications of
+    the Objs are fetched with a fixed number of queries.
+
+    Parameters
+    ----------
+    user_or_token : `baselayer.app.models.User` or `baselayer.app.models.Token`
+        The requesting `User` or `Token` object.
+    max_num_sources : int
+        Number of Sources to return.
+    since_days_ago : int
+        Only the views of the last `since_days_ago` days are counted.
+
+    Returns
+    -------
+    sources : list of dict
+        One entry per Source, most viewed first.
+    """
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=since_days_ago)
+    first_hour = cutoff.replace(minute=0, second=0, microsecond=0)
+    first_day = first_hour.replace(hour=0) + datetime.timedelta(days=1)
+    top_views = (
+        DBSession.query(
+            func.sum(SourceViewCount.views).label('views'), SourceViewCount.obj_id
+        )
+        .group_by(SourceViewCount.obj_id)
+        .filter(
+            SourceViewCount.obj_id.in_(
+                DBSession.query(Source.obj_id).filter(
+                    Source.group_id.in_(user_or_token.accessible_group_ids)
                 )
             )
-            .filter(SourceView.created_at >= cutoff_day)
-            .order_by(desc('views'))
-            .limit(max_num_sources)
         )
+        .filter(
+            or_(
+                and_(
+                    SourceViewCount.granularity == 'hour',
+                    SourceViewCount.bucket >= first_hour,
+                    SourceViewCount.bucket < first_day,
+                ),
+                and_(
+                    SourceViewCount.granularity == 'day',
+                    SourceViewCount.bucket >= first_day,
+                ),
+            )
+        )
+        .order_by(desc('views'))
+        .limit(max_num_sources)
+        .subquery()
+    )
+    query_results = (
+        DBSession.query(Obj, top_views.c.views)
+        .join(top_views, top_views.c.obj_id == Obj.id)
+        .options(joinedload(Obj.thumbnails))
+        .order_by(desc(top_views.c.views), Obj.id)
+        .all()
+    )
+    classifications = get_obj_data_readable_by(
+        Classification, [obj.id for obj, _ in query_results], user_or_token
+    )
+
+    return [
+        {
+            'obj_id': obj.id,
+            'views': views,
+            'ra': obj.ra,
+            'dec': obj.dec,
+            'public_url': first_thumbnail_public_url(obj.thumbnails),
+            'classifications': classifications[obj.id],
+        }
+        for obj, views in query_results
+    ]
 
-        return q.all()
 
+class SourceViewsHandler(BaseHandler):
     @auth_or_token
     def get(self):
-        query_results = SourceViewsHandler.get_top_source_views_and_ids(
-            self.current_user
-        )
-        sources = []
-        for view, obj_id in query_results:
-            s = Source.get_obj_if_readable_by(  # Returns Source.obj
-                obj_id,
-                self.current_user,
-                options=[joinedload(Source.obj).joinedload(Obj.thumbnails)],
-            )
-            public_url = first_thumbnail_public_url(s.thumbnails)
-            sources.append(
-                {
-                    'obj_id': s.id,
-                    'views': view,
-                    'ra': s.ra,
-                    'dec': s.dec,
-                    'public_url': public_url,
-                    'classifications': s.classifications,
-                }
-            )
+        user_prefs = getattr(self.current_user, 'preferences', None) or {}
+        top_sources_prefs = user_prefs.get('topSources', {})
+        top_sources_prefs = {**default_prefs, **top_sources_prefs}
 
+        max_num_sources = int(top_sources_prefs['maxNumSources'])
+        since_days_ago = int(top_sources_prefs['sinceDaysAgo'])
+        sources = get_widget_data(
+            'source_views',
+            self.current_user,
+            top_sources_prefs,
+            lambda: get_top_sources(self.current_user, max_num_sources, since_days_ago),
+        )
         return self.success(data=sources)
 
     @tornado.web.authenticated
@@ -86,4 +134,6 @@ def register_source_view(obj_id, username_or_token_id, is_token):
         obj_id=obj_id, username_or_token_id=username_or_token_id, is_token=is_token
     )
     DBSession.add(sv)
+    DBSession.flush()
+    SourceViewCount.record(sv.obj_id, sv.created_at)
     DBSession.commit()
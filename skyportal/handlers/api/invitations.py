@@ -1,5 +1,4 @@
 import uuid
-import python_http_client.exceptions
 from baselayer.app.access import permissions
 from baselayer.app.env import load_env
 from ..base import BaseHandler
@@ -140,14 +139,9 @@ class InvitationHandler(BaseHandler):
                 invited_by=self.associated_user_object,
             )
         )
-        try:
-            DBSession().commit()
-        except python_http_client.exceptions.UnauthorizedError:
-            return self.error(
-                "Twilio Sendgrid authorization error. Please ensure "
-                "valid Sendgrid API key is set in server environment as "
-                "per their setup docs."
-            )
+        # the invitation email is sent by a background task (see
+        # `skyportal.models.send_user_invite_email`)
+        DBSession().commit()
         return self.success()
 
     @permissions(["Manage users"])
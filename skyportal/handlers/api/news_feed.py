@@ -10,6 +10,7 @@ from ...models import (
     Photometry,
     basic_user_display_info,
 )
+from .internal.dashboard_cache import get_widget_data
 
 
 class NewsFeedHandler(BaseHandler):
@@ -53,16 +54,21 @@ class NewsFeedHandler(BaseHandler):
         else:
             n_items = 10
 
+        news_feed_items = get_widget_data(
+            'news_feed',
+            self.current_user,
+            preferences.get('newsFeed', {}),
+            lambda: self.get_news_feed_items(preferences, n_items),
+        )
+        return self.success(data=news_feed_items)
+
+    def get_news_feed_items(self, preferences, n_items):
         def fetch_newest(model):
             query = model.query.filter(
                 model.obj_id.in_(
                     DBSession()
                     .query(Source.obj_id)
-                    .filter(
-                        Source.group_id.in_(
-                            [g.id for g in self.current_user.accessible_groups]
-                        )
-                    )
+                    .filter(Source.group_id.in_(self.current_user.accessible_group_ids))
                 )
             )
             if model == Photometry:
@@ -178,6 +184,4 @@ class NewsFeedHandler(BaseHandler):
             )
 
         news_feed_items.sort(key=lambda x: x['time'], reverse=True)
-        news_feed_items = news_feed_items[:n_items]
-
-        return self.success(data=news_feed_items)
+        return news_feed_items[:n_items]
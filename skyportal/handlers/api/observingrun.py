@@ -1,7 +1,7 @@
 import numpy as np
 from sqlalchemy.orm import joinedload
 from marshmallow.exceptions import ValidationError
-from baselayer.app.access import permissions, auth_or_token, AccessError
+from baselayer.app.access import permissions, auth_or_token
 from ..base import BaseHandler
 from ...models import (
     DBSession,
@@ -10,6 +10,7 @@ from ...models import (
     Obj,
     Instrument,
     Source,
+    get_readable_obj_ids,
 )
 from ...schema import ObservingRunPost, ObservingRunGetWithAssignments
 
@@ -131,17 +132,13 @@ class ObservingRunHandler(BaseHandler):
 
             # filter out the assignments of objects that are not visible to
             # the user
-            assignments = []
-            for a in run.assignments:
-                try:
-                    obj = Obj.get_if_readable_by(a.obj.id, self.current_user)
-                except AccessError:
-                    continue
-                if obj is not None:
-                    assignments.append(a)
+            readable_obj_ids = get_readable_obj_ids(
+                [a.obj_id for a in run.assignments], self.current_user
+            )
+            assignments = [a for a in run.assignments if a.obj_id in readable_obj_ids]
 
             # order the assignments by ra
-            assignments = sorted(run.assignments, key=lambda a: a.obj.ra)
+            assignments = sorted(assignments, key=lambda a: a.obj.ra)
 
             data = ObservingRunGetWithAssignments.dump(run)
             data["assignments"] = [a.to_dict() for a in assignments]
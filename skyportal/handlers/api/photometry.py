@@ -1,24 +1,32 @@
 import uuid
 import math
+from distutils.util import strtobool
+import functools
+import io
+import itertools
+import json
+import zlib
 
 from astropy.time import Time
-from astropy.table import Table
 from marshmallow.exceptions import ValidationError
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import sncosmo
-from sncosmo.photdata import PhotometricData
 
 import sqlalchemy as sa
 from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.sql.expression import FromClause
 from sqlalchemy.sql import column
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, Session
 from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+import tornado.iostream
 
 from baselayer.app.access import permissions, auth_or_token
 from baselayer.app.env import load_env
 from ..base import BaseHandler
+from .internal.plot import invalidate_plot_cache
 from ...models import (
     DBSession,
     Group,
@@ -27,6 +35,7 @@ from ...models import (
     Obj,
     PHOT_ZP,
     GroupPhotometry,
+    PhotStat,
 )
 
 from ...schema import (
@@ -37,6 +46,7 @@ from ...schema import (
     PhotometryRangeQuery,
 )
 from ...enum_types import ALLOWED_MAGSYSTEMS
+from ...utils.lightcurve import parse_reduction_arguments, reduce_light_curve
 
 
 _, cfg = load_env()
@@ -54,292 +64,485 @@ def allscalar(d):
     return all(np.isscalar(v) or v is None for v in d.values())
 
 
-def serialize(phot, outsys, format):
-
-    return_value = {
-        'obj_id': phot.obj_id,
-        'ra': phot.ra,
-        'dec': phot.dec,
-        'filter': phot.filter,
-        'mjd': phot.mjd,
-        'instrument_id': phot.instrument_id,
-        'instrument_name': phot.instrument.name,
-        'ra_unc': phot.ra_unc,
-        'dec_unc': phot.dec_unc,
-        'origin': phot.origin,
-        'id': phot.id,
-        'groups': phot.groups,
-    }
-
-    filter = phot.filter
+@functools.lru_cache(maxsize=None)
+def get_magsystem_name(magsys):
+    """Return the canonical name of an sncosmo magnitude system."""
+    return sncosmo.get_magsystem(magsys).name
+
+
+@functools.lru_cache(maxsize=None)
+def get_zpbandflux(magsys, filter):
+    """Return the bandflux of a zero-magnitude source in the given magnitude
+    system and filter, memoized since computing it integrates over the
+    bandpass."""
+    return sncosmo.get_magsystem(magsys).zpbandflux(filter)
+
+
+@functools.lru_cache(maxsize=None)
+def get_relative_zeropoint(magsys, filter):
+    """Return 2.5 log10 of the bandflux of a zero-magnitude source in the
+    given magnitude system and filter.
+
+    These are not the actual zeropoints of any stored magnitudes, but the
+    difference between two of them is the correction needed to convert a
+    magnitude from one system to the other. They only depend on the
+    (magsys, filter) pair, so they are memoized.
+    """
+    return 2.5 * np.log10(get_zpbandflux(magsys, filter))
+
+
+PHOTOMETRY_PASSTHROUGH_COLUMNS = (
+    'obj_id',
+    'ra',
+    'dec',
+    'filter',
+    'mjd',
+    'instrument_id',
+    'instrument_name',
+    'ra_unc',
+    'dec_unc',
+    'origin',
+    'id',
+    'groups',
+)
 
-    magsys_db = sncosmo.get_magsystem('ab')
-    outsys = sncosmo.get_magsystem(outsys)
 
-    relzp_out = 2.5 * np.log10(outsys.zpbandflux(filter))
+def serialize_columns(columns, outsys, format):
+    """Serialize a set of photometry points stored column-wise.
+
+    Parameters
+    ----------
+    columns : mapping
+       Mapping of column name to a sequence of values, one per point (e.g.
+       a dict of lists or a pandas DataFrame). Must contain the columns in
+       `PHOTOMETRY_PASSTHROUGH_COLUMNS` as well as `flux`, `fluxerr` and
+       `original_user_data`.
+    outsys : str
+       Name of the magnitude system to express the output in.
+    format : str
+       One of 'mag' or 'flux'.
+
+    Returns
+    -------
+    list of dict
+       One serialized point per row, identical to what `serialize` returns
+       for each point individually.
+    """
+
+    if format not in ['mag', 'flux']:
+        raise ValueError(
+            'Invalid output format specified. Must be one of '
+            f"['flux', 'mag'], got '{format}'."
+        )
 
-    # note: these are not the actual zeropoints for magnitudes in the db or
-    # packet, just ones that can be used to derive corrections when
-    # compared to relzp_out
+    outsys_name = get_magsystem_name(outsys)
+    filters = list(columns['filter'])
 
-    relzp_db = 2.5 * np.log10(magsys_db.zpbandflux(filter))
-    db_correction = relzp_out - relzp_db
+    # magnitudes and fluxes in the database are in the AB system, so the
+    # correction to the output system only depends on the filter
+    corrections = {
+        f: get_relative_zeropoint(outsys, f) - get_relative_zeropoint('ab', f)
+        for f in set(filters)
+    }
+    db_correction = np.array([corrections[f] for f in filters], dtype=float)
 
     # this is the zeropoint for fluxes in the database that is tied
     # to the new magnitude system
     corrected_db_zp = PHOT_ZP + db_correction
 
-    if format == 'mag':
-        if (
-            phot.original_user_data is not None
-            and 'limiting_mag' in phot.original_user_data
-        ):
-            magsys_packet = sncosmo.get_magsystem(phot.original_user_data['magsys'])
-            relzp_packet = 2.5 * np.log10(magsys_packet.zpbandflux(filter))
-            packet_correction = relzp_out - relzp_packet
-            maglimit = phot.original_user_data['limiting_mag']
-            maglimit_out = maglimit + packet_correction
-        else:
-            # calculate the limiting mag
-            fluxerr = phot.fluxerr
-            fivesigma = 5 * fluxerr
-            maglimit_out = -2.5 * np.log10(fivesigma) + corrected_db_zp
+    flux = np.asarray(columns['flux'], dtype=float)
+    fluxerr_values = list(columns['fluxerr'])
+    fluxerr = np.asarray(fluxerr_values, dtype=float)
 
-        return_value.update(
-            {
-                'mag': phot.mag + db_correction
-                if nan_to_none(phot.mag) is not None
-                else None,
-                'magerr': phot.e_mag if nan_to_none(phot.e_mag) is not None else None,
-                'magsys': outsys.name,
-                'limiting_mag': maglimit_out,
-            }
-        )
-    elif format == 'flux':
-        return_value.update(
-            {
-                'flux': nan_to_none(phot.flux),
-                'magsys': outsys.name,
-                'zp': corrected_db_zp,
-                'fluxerr': phot.fluxerr,
-            }
+    rows = [
+        dict(zip(PHOTOMETRY_PASSTHROUGH_COLUMNS, values))
+        for values in zip(
+            *[list(columns[key]) for key in PHOTOMETRY_PASSTHROUGH_COLUMNS]
         )
+    ]
+
+    if format == 'mag':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            has_mag = flux > 0
+            has_magerr = has_mag & (fluxerr > 0)
+            mag = -2.5 * np.log10(flux) + PHOT_ZP + db_correction
+            magerr = (2.5 / np.log(10)) * (fluxerr / flux)
+            maglimit = -2.5 * np.log10(5 * fluxerr) + corrected_db_zp
+
+        mag = np.where(has_mag, mag, None).tolist()
+        magerr = np.where(has_magerr, magerr, None).tolist()
+        maglimit = maglimit.tolist()
+
+        # points uploaded with a limiting magnitude keep it, converted from
+        # the magnitude system it was uploaded in
+        for i, original_user_data in enumerate(columns['original_user_data']):
+            if original_user_data is not None and 'limiting_mag' in original_user_data:
+                relzp_out = get_relative_zeropoint(outsys, filters[i])
+                relzp_packet = get_relative_zeropoint(
+                    original_user_data['magsys'], filters[i]
+                )
+                packet_correction = relzp_out - relzp_packet
+                maglimit[i] = original_user_data['limiting_mag'] + packet_correction
+
+        for row, m, e, limit in zip(rows, mag, magerr, maglimit):
+            row.update(
+                {
+                    'mag': m,
+                    'magerr': e,
+                    'magsys': outsys_name,
+                    'limiting_mag': limit,
+                }
+            )
     else:
-        raise ValueError(
-            'Invalid output format specified. Must be one of '
-            f"['flux', 'mag'], got '{format}'."
-        )
-    return return_value
+        flux = np.where(np.isnan(flux), None, flux).tolist()
+        for row, f, zp, ferr in zip(
+            rows, flux, corrected_db_zp.tolist(), fluxerr_values
+        ):
+            row.update({'flux': f, 'magsys': outsys_name, 'zp': zp, 'fluxerr': ferr})
 
+    return rows
 
-class PhotometryHandler(BaseHandler):
-    def standardize_photometry_data(self):
 
-        data = self.get_json()
+def get_photometry_columns(photometry):
+    """Columns of a sequence of Photometry instances, as a dict of lists.
+    See `serialize_columns`."""
+    columns = {
+        key: [getattr(phot, key) for phot in photometry]
+        for key in PHOTOMETRY_PASSTHROUGH_COLUMNS
+        if key != 'instrument_name'
+    }
+    columns['instrument_name'] = [phot.instrument.name for phot in photometry]
+    for key in ['flux', 'fluxerr', 'original_user_data']:
+        columns[key] = [getattr(phot, key) for phot in photometry]
+    return columns
 
-        if not isinstance(data, dict):
-            raise ValidationError(
-                'Top level JSON must be an instance of `dict`, got ' f'{type(data)}.'
-            )
 
-        if "altdata" in data and not data["altdata"]:
-            del data["altdata"]
+def serialize_many(photometry, outsys, format):
+    """Serialize a sequence of Photometry instances. See `serialize_columns`."""
+    return serialize_columns(get_photometry_columns(list(photometry)), outsys, format)
+
+
+def serialize(phot, outsys, format):
+    return serialize_many([phot], outsys, format)[0]
+
+
+# first key of the advisory locks taken by `lock_photometry_of_objs`, so that
+# they cannot collide with advisory locks taken for other purposes
+PHOTOMETRY_ADVISORY_LOCK_CLASS = 1
+
+
+def lock_photometry_of_objs(obj_ids):
+    """Take transaction-scoped advisory locks on the photometry of some Objs.
+
+    Uploads check for duplicates of the new points before inserting them.
+    Holding these locks across the check and the insert serializes uploads
+    that touch the same Obj, while uploads for different Objs proceed in
+    parallel. The deduplication index remains the last line of defence.
+
+    The locks are keyed on a hash of the Obj ID and acquired in order of
+    the hash, so that two uploads can never deadlock on each other. A hash
+    collision merely serializes two uploads that could have run in
+    parallel. The locks are released when the transaction ends.
+
+    Parameters
+    ----------
+    obj_ids : iterable of str
+       The IDs of the Objs to lock. May contain repeats.
+    """
+    # crc32 is stable across processes (unlike hash()); shift it into the
+    # range of the signed 32-bit integers postgres expects
+    keys = sorted({zlib.crc32(obj_id.encode()) - 2 ** 31 for obj_id in obj_ids})
+    if len(keys) == 0:
+        return
+
+    # unnest returns the keys in array order, so they are locked in order
+    DBSession().execute(
+        sa.text(
+            'SELECT pg_advisory_xact_lock(:lock_class, key) '
+            'FROM unnest(CAST(:keys AS INTEGER[])) AS key'
+        ),
+        {'lock_class': PHOTOMETRY_ADVISORY_LOCK_CLASS, 'keys': keys},
+    )
+
+
+def share_photometry_with_groups(photometry_ids, group_ids):
+    """Share new photometry with some Groups, in a single statement.
+
+    The statement-level triggers maintaining `Photometry.group_ids` fire once
+    per statement, i.e. once per row when the group_photometry rows are
+    inserted with an executemany, each time rewriting the photometry row.
+    Inserting all the rows with one statement rewrites each point once,
+    whatever the number of Groups.
+
+    Parameters
+    ----------
+    photometry_ids : list of int
+       The IDs of the Photometry.
+    group_ids : list of int
+       The IDs of the Groups.
+    """
+    new_ids = sa.select(
+        [sa.func.unnest(sa.cast(photometry_ids, ARRAY(sa.Integer))).label('id')]
+    ).alias('new_ids')
+    DBSession().execute(
+        GroupPhotometry.__table__.insert().from_select(
+            ['photometr_id', 'group_id'],
+            sa.select([new_ids.c.id, Group.id]).where(Group.id.in_(group_ids)),
+        )
+    )
+
+
+def iterate_chunks(iterable, chunk_size):
+    """Yield successive lists of up to `chunk_size` items from `iterable`."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def standardize_photometry_data(data):
+    """Validate uploaded photometry and convert it to microjanskies in the
+    AB system.
+
+    Parameters
+    ----------
+    data : dict
+       The JSON body of a photometry upload, validating under either
+       `PhotMagFlexible` or `PhotFluxFlexible`.
+
+    Returns
+    -------
+    df : `pandas.DataFrame`
+       One row per point, with the converted fluxes and errors in the
+       columns 'standardized_flux' and 'standardized_fluxerr'.
+    instrument_cache : dict
+       Mapping of the instrument IDs in `df` to their
+       `skyportal.models.Instrument`.
+    """
+
+    if not isinstance(data, dict):
+        raise ValidationError(
+            'Top level JSON must be an instance of `dict`, got ' f'{type(data)}.'
+        )
+
+    if "altdata" in data and not data["altdata"]:
+        del data["altdata"]
 
-        # quick validation - just to make sure things have the right fields
+    # quick validation - just to make sure things have the right fields
+    try:
+        data = PhotMagFlexible.load(data)
+    except ValidationError as e1:
         try:
-            data = PhotMagFlexible.load(data)
-        except ValidationError as e1:
-            try:
-                data = PhotFluxFlexible.load(data)
-            except ValidationError as e2:
-                raise ValidationError(
-                    'Invalid input format: Tried to parse data '
-                    f'in mag space, got: '
-                    f'"{e1.normalized_messages()}." Tried '
-                    f'to parse data in flux space, got:'
-                    f' "{e2.normalized_messages()}."'
-                )
-            else:
-                kind = 'flux'
+            data = PhotFluxFlexible.load(data)
+        except ValidationError as e2:
+            raise ValidationError(
+                'Invalid input format: Tried to parse data '
+                f'in mag space, got: '
+                f'"{e1.normalized_messages()}." Tried '
+                f'to parse data in flux space, got:'
+                f' "{e2.normalized_messages()}."'
+            )
         else:
-            kind = 'mag'
+            kind = 'flux'
+    else:
+        kind = 'mag'
 
-        # not used here
-        _ = data.pop('group_ids', None)
+    # not used here
+    _ = data.pop('group_ids', None)
 
-        if allscalar(data):
-            data = [data]
+    if allscalar(data):
+        data = [data]
 
-        try:
-            df = pd.DataFrame(data)
-        except ValueError as e:
-            if "altdata" in data and "Mixing dicts with non-Series" in str(e):
-                try:
-                    data["altdata"] = [
-                        {key: value[i] for key, value in data["altdata"].items()}
-                        for i in range(
-                            len(data["altdata"][list(data["altdata"].keys())[-1]])
-                        )
-                    ]
-                    df = pd.DataFrame(data)
-                except ValueError:
-                    raise ValidationError(
-                        'Unable to coerce passed JSON to a series of packets. '
-                        f'Error was: "{e}"'
+    try:
+        df = pd.DataFrame(data)
+    except ValueError as e:
+        if "altdata" in data and "Mixing dicts with non-Series" in str(e):
+            try:
+                data["altdata"] = [
+                    {key: value[i] for key, value in data["altdata"].items()}
+                    for i in range(
+                        len(data["altdata"][list(data["altdata"].keys())[-1]])
                     )
-            else:
+                ]
+                df = pd.DataFrame(data)
+            except ValueError:
                 raise ValidationError(
                     'Unable to coerce passed JSON to a series of packets. '
                     f'Error was: "{e}"'
                 )
+        else:
+            raise ValidationError(
+                'Unable to coerce passed JSON to a series of packets. '
+                f'Error was: "{e}"'
+            )
+
+    # `to_numeric` coerces numbers written as strings to numeric types
+    #  (int, float)
 
-        # `to_numeric` coerces numbers written as strings to numeric types
-        #  (int, float)
+    #  errors='ignore' means if something is actually an alphanumeric
+    #  string, just leave it alone and dont error out
 
-        #  errors='ignore' means if something is actually an alphanumeric
-        #  string, just leave it alone and dont error out
+    #  only object columns can hold such strings, the others are numeric
+    #  already
+    for key in df.columns[df.dtypes == object]:
+        df[key] = pd.to_numeric(df[key], errors='ignore')
 
-        #  apply is used to apply it to each column
-        # (https://stackoverflow.com/questions/34844711/convert-entire-pandas
-        # -dataframe-to-integers-in-pandas-0-17-0/34844867
-        df = df.apply(pd.to_numeric, errors='ignore')
+    # set origin to '' where it is None.
+    df.loc[df['origin'].isna(), 'origin'] = ''
 
-        # set origin to '' where it is None.
-        df.loc[df['origin'].isna(), 'origin'] = ''
+    if kind == 'mag':
+        # ensure that neither or both mag and magerr are null
+        magnull = df['mag'].isna()
+        magerrnull = df['magerr'].isna()
+        magdet = ~magnull
 
-        if kind == 'mag':
-            # ensure that neither or both mag and magerr are null
-            magnull = df['mag'].isna()
-            magerrnull = df['magerr'].isna()
-            magdet = ~magnull
+        # https://en.wikipedia.org/wiki/Bitwise_operation#XOR
+        bad = magerrnull ^ magnull  # bitwise exclusive or -- returns true
+        #  if A and not B or B and not A
 
-            # https://en.wikipedia.org/wiki/Bitwise_operation#XOR
-            bad = magerrnull ^ magnull  # bitwise exclusive or -- returns true
-            #  if A and not B or B and not A
+        # coerce to numpy array
+        bad = bad.values
 
-            # coerce to numpy array
-            bad = bad.values
+        if any(bad):
+            # find the first offending packet
+            first_offender = np.argwhere(bad)[0, 0]
+            packet = df.iloc[first_offender].to_dict()
 
-            if any(bad):
-                # find the first offending packet
-                first_offender = np.argwhere(bad)[0, 0]
+            # coerce nans to nones
+            for key in packet:
+                if key != 'standardized_flux':
+                    packet[key] = nan_to_none(packet[key])
+
+            raise ValidationError(
+                f'Error parsing packet "{packet}": mag '
+                f'and magerr must both be null, or both be '
+                f'not null.'
+            )
+
+        for field in ['mag', 'magerr', 'limiting_mag']:
+            infinite = np.isinf(df[field].values)
+            if any(infinite):
+                first_offender = np.argwhere(infinite)[0, 0]
                 packet = df.iloc[first_offender].to_dict()
 
                 # coerce nans to nones
                 for key in packet:
-                    if key != 'standardized_flux':
-                        packet[key] = nan_to_none(packet[key])
+                    packet[key] = nan_to_none(packet[key])
 
                 raise ValidationError(
-                    f'Error parsing packet "{packet}": mag '
-                    f'and magerr must both be null, or both be '
-                    f'not null.'
+                    f'Error parsing packet "{packet}": '
+                    f'field {field} must be finite.'
                 )
 
-            for field in ['mag', 'magerr', 'limiting_mag']:
-                infinite = np.isinf(df[field].values)
-                if any(infinite):
-                    first_offender = np.argwhere(infinite)[0, 0]
-                    packet = df.iloc[first_offender].to_dict()
-
-                    # coerce nans to nones
-                    for key in packet:
-                        packet[key] = nan_to_none(packet[key])
-
-                    raise ValidationError(
-                        f'Error parsing packet "{packet}": '
-                        f'field {field} must be finite.'
-                    )
-
-            # ensure nothing is null for the required fields
-            for field in PhotMagFlexible.required_keys:
-                missing = df[field].isna()
-                if any(missing):
-                    first_offender = np.argwhere(missing)[0, 0]
-                    packet = df.iloc[first_offender].to_dict()
-
-                    # coerce nans to nones
-                    for key in packet:
-                        packet[key] = nan_to_none(packet[key])
-
-                    raise ValidationError(
-                        f'Error parsing packet "{packet}": '
-                        f'missing required field {field}.'
-                    )
+        # ensure nothing is null for the required fields
+        for field in PhotMagFlexible.required_keys:
+            missing = df[field].isna()
+            if any(missing):
+                first_offender = np.argwhere(missing)[0, 0]
+                packet = df.iloc[first_offender].to_dict()
 
-            # convert the mags to fluxes
-            # detections
-            detflux = 10 ** (-0.4 * (df[magdet]['mag'] - PHOT_ZP))
-            detfluxerr = df[magdet]['magerr'] / (2.5 / np.log(10)) * detflux
+                # coerce nans to nones
+                for key in packet:
+                    packet[key] = nan_to_none(packet[key])
 
-            # non-detections
-            limmag_flux = 10 ** (-0.4 * (df[magnull]['limiting_mag'] - PHOT_ZP))
-            ndetfluxerr = limmag_flux / df[magnull]['limiting_mag_nsigma']
+                raise ValidationError(
+                    f'Error parsing packet "{packet}": '
+                    f'missing required field {field}.'
+                )
 
-            # initialize flux to be none
-            phot_table = Table.from_pandas(df[['mjd', 'magsys', 'filter']])
+        # convert the mags to fluxes
+        # detections
+        detflux = 10 ** (-0.4 * (df[magdet]['mag'] - PHOT_ZP))
+        detfluxerr = df[magdet]['magerr'] / (2.5 / np.log(10)) * detflux
 
-            phot_table['zp'] = PHOT_ZP
-            phot_table['flux'] = np.nan
-            phot_table['fluxerr'] = np.nan
-            phot_table['flux'][magdet] = detflux
-            phot_table['fluxerr'][magdet] = detfluxerr
-            phot_table['fluxerr'][magnull] = ndetfluxerr
+        # non-detections
+        limmag_flux = 10 ** (-0.4 * (df[magnull]['limiting_mag'] - PHOT_ZP))
+        ndetfluxerr = limmag_flux / df[magnull]['limiting_mag_nsigma']
 
-        else:
-            for field in PhotFluxFlexible.required_keys:
-                missing = df[field].isna().values
-                if any(missing):
-                    first_offender = np.argwhere(missing)[0, 0]
-                    packet = df.iloc[first_offender].to_dict()
+        # initialize flux to be none
+        zp = np.full(len(df), PHOT_ZP)
+        flux = np.full(len(df), np.nan)
+        fluxerr = np.full(len(df), np.nan)
+        flux[magdet.values] = detflux.values
+        fluxerr[magdet.values] = detfluxerr.values
+        fluxerr[magnull.values] = ndetfluxerr.values
 
-                    for key in packet:
-                        packet[key] = nan_to_none(packet[key])
+    else:
+        for field in PhotFluxFlexible.required_keys:
+            missing = df[field].isna().values
+            if any(missing):
+                first_offender = np.argwhere(missing)[0, 0]
+                packet = df.iloc[first_offender].to_dict()
 
-                    raise ValidationError(
-                        f'Error parsing packet "{packet}": '
-                        f'missing required field {field}.'
-                    )
+                for key in packet:
+                    packet[key] = nan_to_none(packet[key])
 
-            for field in ['flux', 'fluxerr']:
-                infinite = np.isinf(df[field].values)
-                if any(infinite):
-                    first_offender = np.argwhere(infinite)[0, 0]
-                    packet = df.iloc[first_offender].to_dict()
+                raise ValidationError(
+                    f'Error parsing packet "{packet}": '
+                    f'missing required field {field}.'
+                )
 
-                    # coerce nans to nones
-                    for key in packet:
-                        packet[key] = nan_to_none(packet[key])
+        for field in ['flux', 'fluxerr']:
+            infinite = np.isinf(df[field].values)
+            if any(infinite):
+                first_offender = np.argwhere(infinite)[0, 0]
+                packet = df.iloc[first_offender].to_dict()
 
-                    raise ValidationError(
-                        f'Error parsing packet "{packet}": '
-                        f'field {field} must be finite.'
-                    )
+                # coerce nans to nones
+                for key in packet:
+                    packet[key] = nan_to_none(packet[key])
 
-            phot_table = Table.from_pandas(df[['mjd', 'magsys', 'filter', 'zp']])
-            phot_table['flux'] = df['flux'].fillna(np.nan)
-            phot_table['fluxerr'] = df['fluxerr'].fillna(np.nan)
+                raise ValidationError(
+                    f'Error parsing packet "{packet}": '
+                    f'field {field} must be finite.'
+                )
 
-        # convert to microjanskies, AB for DB storage as a vectorized operation
-        pdata = PhotometricData(phot_table)
-        standardized = pdata.normalized(zp=PHOT_ZP, zpsys='ab')
+        zp = df['zp'].to_numpy(dtype=float)
+        flux = df['flux'].to_numpy(dtype=float, na_value=np.nan)
+        fluxerr = df['fluxerr'].to_numpy(dtype=float, na_value=np.nan)
+
+    # convert to microjanskies, AB for DB storage as a vectorized operation.
+    # this is the same conversion as sncosmo's PhotometricData.normalized,
+    # without building the intermediate tables
+    factor = 10 ** (0.4 * (PHOT_ZP - zp))
+    not_ab = (df['magsys'] != 'ab').values
+    if any(not_ab):
+        filters = df['filter'].values[not_ab]
+        magsystems = df['magsys'].values[not_ab]
+        ratios = {
+            (f, m): get_zpbandflux(m, f) / get_zpbandflux('ab', f)
+            for f, m in set(zip(filters, magsystems))
+        }
+        factor[not_ab] *= [ratios[key] for key in zip(filters, magsystems)]
+
+    df['standardized_flux'] = factor * flux
+    df['standardized_fluxerr'] = factor * fluxerr
+
+    instrument_ids = df['instrument_id'].unique().tolist()
+    instrument_cache = {
+        instrument.id: instrument
+        for instrument in Instrument.query.filter(Instrument.id.in_(instrument_ids))
+    }
+    for iid in instrument_ids:
+        if iid not in instrument_cache:
+            raise ValidationError(f'Invalid instrument ID: {iid}')
 
-        df['standardized_flux'] = standardized.flux
-        df['standardized_fluxerr'] = standardized.fluxerr
+    obj_ids = df['obj_id'].unique().tolist()
+    existing_obj_ids = {
+        oid for oid, in DBSession().query(Obj.id).filter(Obj.id.in_(obj_ids))
+    }
+    for oid in obj_ids:
+        if oid not in existing_obj_ids:
+            raise ValidationError(f'Invalid object ID: {oid}')
 
-        instrument_cache = {}
-        for iid in df['instrument_id'].unique():
-            instrument = Instrument.query.get(int(iid))
-            if not instrument:
-                raise ValidationError(f'Invalid instrument ID: {iid}')
-            instrument_cache[iid] = instrument
+    return df, instrument_cache
 
-        for oid in df['obj_id'].unique():
-            obj = Obj.query.get(oid)
-            if not obj:
-                raise ValidationError(f'Invalid object ID: {oid}')
 
-        return df, instrument_cache
+class PhotometryHandler(BaseHandler):
+    def standardize_photometry_data(self):
+        return standardize_photometry_data(self.get_json())
 
     def get_values_table_and_condition(self, df):
         """Return a postgres VALUES representation of the indexed columns of
@@ -434,18 +637,15 @@ class PhotometryHandler(BaseHandler):
                 column("fluxerr", sa.Float),
                 column("flux", sa.Float),
             ),
-            *[
-                (
-                    idx,
-                    row["obj_id"],
-                    row["instrument_id"],
-                    row["origin"],
-                    float(row["mjd"]),
-                    float(row["standardized_fluxerr"]),
-                    float(row["standardized_flux"]),
-                )
-                for idx, row in df.iterrows()
-            ],
+            *zip(
+                df.index.tolist(),
+                df["obj_id"].tolist(),
+                df["instrument_id"].tolist(),
+                df["origin"].tolist(),
+                df["mjd"].astype(float).tolist(),
+                df["standardized_fluxerr"].astype(float).tolist(),
+                df["standardized_flux"].astype(float).tolist(),
+            ),
             alias_name="values_table",
         )
 
@@ -552,14 +752,230 @@ class PhotometryHandler(BaseHandler):
         query = Photometry.__table__.insert()
         DBSession().execute(query, params)
 
-        groupquery = GroupPhotometry.__table__.insert()
-        params = []
+        share_photometry_with_groups(ids, group_ids)
 
-        for id in ids:
-            for group_id in group_ids:
-                params.append({'photometr_id': id, 'group_id': group_id})
+        # fold the new points into the per-Obj photometry summaries
+        PhotStat.add_photometry(
+            df['obj_id'],
+            df['mjd'],
+            df['standardized_flux'],
+            df['standardized_fluxerr'],
+            df['filter'],
+        )
+        return ids, upload_id
+
+    def copy_new_photometry_data(self, df, instrument_cache, group_ids, validate=True):
+        """Insert the photometry in a dataframe returned by
+        `standardize_photometry_data`, using set-based SQL.
+
+        Equivalent to `insert_new_photometry_data`, but rather than rendering
+        each row into the SQL, the dataframe is streamed with `COPY` into a
+        temporary staging table, from which the duplicate check, the
+        Photometry insert and the group linking are each done with a single
+        statement. This is much faster for large uploads.
+
+        Parameters
+        ----------
+        df : `pandas.DataFrame`
+           The standardized photometry.
+        instrument_cache : dict
+           Mapping of instrument ID to `skyportal.models.Instrument`.
+        group_ids : list of int
+           The IDs of the groups to share the photometry with.
+        validate : bool
+           Raise a `ValidationError` if any of the photometry already exists.
+
+        Returns
+        -------
+        ids : list of int
+           The IDs of the new Photometry, in the order of the rows of `df`.
+        upload_id : str
+           The upload ID shared by the new Photometry.
+        """
+
+        for instrument_id, instrument in instrument_cache.items():
+            filters = df.loc[df['instrument_id'] == instrument_id, 'filter']
+            bad_filters = filters[~filters.isin(instrument.filters)]
+            if len(bad_filters) > 0:
+                raise ValidationError(
+                    f"Instrument {instrument.name} has no filter "
+                    f"{bad_filters.iloc[0]}."
+                )
+
+        # ids are drawn from the photometry sequence as the rows are copied
+        # into the staging table, so they follow the order of the dataframe
+        staging = sa.Table(
+            'photometry_staging',
+            sa.MetaData(),
+            sa.Column('pdidx', sa.Integer, primary_key=True),
+            sa.Column(
+                'id',
+                sa.Integer,
+                server_default=sa.text("nextval('photometry_id_seq')"),
+                nullable=False,
+            ),
+            sa.Column('obj_id', sa.String, nullable=False),
+            sa.Column('instrument_id', sa.Integer, nullable=False),
+            sa.Column('origin', sa.String, nullable=False),
+            sa.Column('mjd', sa.Float, nullable=False),
+            sa.Column('flux', sa.Float, nullable=False),
+            sa.Column('fluxerr', sa.Float, nullable=False),
+            sa.Column('filter', sa.String, nullable=False),
+            sa.Column('ra', sa.Float),
+            sa.Column('dec', sa.Float),
+            sa.Column('ra_unc', sa.Float),
+            sa.Column('dec_unc', sa.Float),
+            sa.Column('original_user_data', JSONB),
+            sa.Column('altdata', JSONB),
+            prefixes=['TEMPORARY'],
+            postgresql_on_commit='DROP',
+        )
+        connection = DBSession().connection()
+        staging.create(bind=connection)
+
+        def to_json(value):
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                return None
+            return json.dumps(value)
+
+        # reduce the DB size by ~2x
+        keys = ['limiting_mag', 'magsys', 'limiting_mag_nsigma']
+        keys = [key for key in keys if key in df]
+        if len(keys) > 0:
+            user_data = {
+                key: df[key].astype(object).where(df[key].notnull(), None)
+                for key in keys
+            }
+            original_user_data = [
+                json.dumps(dict(zip(keys, values)))
+                for values in zip(*user_data.values())
+            ]
+        else:
+            original_user_data = None
+
+        flux = df['standardized_flux'].astype(float)
+        staged = pd.DataFrame(
+            {
+                'pdidx': np.arange(len(df)),
+                'obj_id': df['obj_id'].values,
+                'instrument_id': df['instrument_id'].values,
+                'origin': df['origin'].values,
+                'mjd': df['mjd'].values,
+                # NULL marks missing values, so write NaN fluxes out explicitly
+                'flux': flux.astype(object).where(flux.notnull(), 'NaN').values,
+                'fluxerr': df['standardized_fluxerr'].values,
+                'filter': df['filter'].values,
+                'ra': df['ra'].values,
+                'dec': df['dec'].values,
+                'ra_unc': df['ra_unc'].values,
+                'dec_unc': df['dec_unc'].values,
+                'original_user_data': original_user_data,
+                'altdata': [to_json(altdata) for altdata in df['altdata']],
+            }
+        )
+        buffer = io.StringIO()
+        staged.to_csv(buffer, index=False, header=False, na_rep='\\N')
+        buffer.seek(0)
+
+        columns = ', '.join(staged.columns)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {staging.name} ({columns}) FROM STDIN "
+                "WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+
+        condition = and_(
+            Photometry.obj_id == staging.c.obj_id,
+            Photometry.instrument_id == staging.c.instrument_id,
+            Photometry.origin == staging.c.origin,
+            Photometry.mjd == staging.c.mjd,
+            Photometry.fluxerr == staging.c.fluxerr,
+            Photometry.flux == staging.c.flux,
+        )
+
+        if validate:
+            duplicated_photometry = (
+                DBSession()
+                .query(Photometry)
+                .join(staging, condition)
+                .options(joinedload(Photometry.groups))
+            )
+
+            dict_rep = [d.to_dict() for d in duplicated_photometry]
+
+            if len(dict_rep) > 0:
+                raise ValidationError(
+                    'The following photometry already exists '
+                    f'in the database: {dict_rep}.'
+                )
+
+        upload_id = str(uuid.uuid4())
+        DBSession().execute(
+            Photometry.__table__.insert().from_select(
+                [
+                    'id',
+                    'original_user_data',
+                    'upload_id',
+                    'flux',
+                    'fluxerr',
+                    'obj_id',
+                    'altdata',
+                    'instrument_id',
+                    'ra_unc',
+                    'dec_unc',
+                    'mjd',
+                    'filter',
+                    'ra',
+                    'dec',
+                    'origin',
+                    'owner_id',
+                ],
+                sa.select(
+                    [
+                        staging.c.id,
+                        staging.c.original_user_data,
+                        sa.literal(upload_id),
+                        staging.c.flux,
+                        staging.c.fluxerr,
+                        staging.c.obj_id,
+                        staging.c.altdata,
+                        staging.c.instrument_id,
+                        staging.c.ra_unc,
+                        staging.c.dec_unc,
+                        staging.c.mjd,
+                        sa.cast(staging.c.filter, Photometry.filter.type),
+                        staging.c.ra,
+                        staging.c.dec,
+                        staging.c.origin,
+                        sa.literal(self.associated_user_object.id),
+                    ]
+                ),
+            )
+        )
+
+        DBSession().execute(
+            GroupPhotometry.__table__.insert().from_select(
+                ['photometr_id', 'group_id'],
+                sa.select([staging.c.id, Group.id]).where(Group.id.in_(group_ids)),
+            )
+        )
 
-        DBSession().execute(groupquery, params)
+        ids = [
+            id
+            for id, in DBSession().execute(
+                sa.select([staging.c.id]).order_by(staging.c.pdidx)
+            )
+        ]
+
+        # fold the new points into the per-Obj photometry summaries
+        PhotStat.add_photometry(
+            df['obj_id'],
+            df['mjd'],
+            df['standardized_flux'],
+            df['standardized_fluxerr'],
+            df['filter'],
+        )
         return ids, upload_id
 
     def get_group_ids(self):
@@ -602,6 +1018,16 @@ class PhotometryHandler(BaseHandler):
         description: Upload photometry
         tags:
           - photometry
+        parameters:
+          - in: query
+            name: bulk
+            required: false
+            description: >-
+              Load the photometry with PostgreSQL COPY through a staging
+              table. Much faster for very large uploads (10^5 points or
+              more), with the same response. Defaults to false.
+            schema:
+              type: boolean
         requestBody:
           content:
             application/json:
@@ -634,6 +1060,11 @@ class PhotometryHandler(BaseHandler):
                                 points in a single request.
         """
 
+        try:
+            bulk = strtobool(self.get_query_argument('bulk', 'false').lower())
+        except ValueError:
+            return self.error('Invalid value for bulk, must be true or false.')
+
         try:
             group_ids = self.get_group_ids()
         except ValidationError as e:
@@ -644,23 +1075,21 @@ class PhotometryHandler(BaseHandler):
         except ValidationError as e:
             return self.error(e.args[0])
 
-        # This lock ensures that the Photometry table data are not modified in any way
-        # between when the query for duplicate photometry is first executed and
-        # when the insert statement with the new photometry is performed.
-        # From the psql docs: This mode protects a table against concurrent
-        # data changes, and is self-exclusive so that only one session can
-        # hold it at a time.
-        DBSession().execute(
-            f'LOCK TABLE {Photometry.__tablename__} IN SHARE ROW EXCLUSIVE MODE'
-        )
+        # This lock ensures that no photometry is added for these objects
+        # between when the query for duplicate photometry is first executed
+        # and when the insert statement with the new photometry is performed.
+        lock_photometry_of_objs(df['obj_id'])
+        if bulk:
+            insert_new_photometry_data = self.copy_new_photometry_data
+        else:
+            insert_new_photometry_data = self.insert_new_photometry_data
         try:
-            ids, upload_id = self.insert_new_photometry_data(
-                df, instrument_cache, group_ids
-            )
+            ids, upload_id = insert_new_photometry_data(df, instrument_cache, group_ids)
         except ValidationError as e:
             return self.error(e.args[0])
 
         DBSession().commit()
+        invalidate_plot_cache(df['obj_id'])
         return self.success(data={'ids': ids, 'upload_id': upload_id})
 
     @permissions(['Upload data'])
@@ -714,15 +1143,10 @@ class PhotometryHandler(BaseHandler):
 
         values_table, condition = self.get_values_table_and_condition(df)
 
-        # This lock ensures that the Photometry table data are not modified
-        # in any way between when the query for duplicate photometry is first
-        # executed and when the insert statement with the new photometry is
-        # performed. From the psql docs: This mode protects a table against
-        # concurrent data changes, and is self-exclusive so that only one
-        # session can hold it at a time.
-        DBSession().execute(
-            f'LOCK TABLE {Photometry.__tablename__} IN SHARE ROW EXCLUSIVE MODE'
-        )
+        # This lock ensures that no photometry is added for these objects
+        # between when the query for duplicate photometry is first executed
+        # and when the insert statement with the new photometry is performed.
+        lock_photometry_of_objs(df['obj_id'])
 
         new_photometry_query = (
             DBSession()
@@ -770,14 +1194,14 @@ class PhotometryHandler(BaseHandler):
             except ValidationError as e:
                 return self.error(e.args[0])
 
-            for (df_index, _), id in zip(new_photometry.iterrows(), ids):
-                id_map[df_index] = id
+            id_map.update(zip(new_photometry.index, ids))
 
         # release the lock
         DBSession().commit()
+        invalidate_plot_cache(df['obj_id'])
 
         # get ids in the correct order
-        ids = [id_map[pdidx] for pdidx, _ in df.iterrows()]
+        ids = [id_map[pdidx] for pdidx in df.index]
         return self.success(data={'ids': ids})
 
     @auth_or_token
@@ -850,6 +1274,7 @@ class PhotometryHandler(BaseHandler):
 
         phot.original_user_data = data
         phot.id = photometry_id
+        original_obj_id = photometry.obj_id
         DBSession().merge(phot)
 
         # Update groups, if relevant
@@ -860,14 +1285,16 @@ class PhotometryHandler(BaseHandler):
                     "Invalid group_ids field. " "Specify at least one valid group ID."
                 )
             if not all(
-                [group in self.current_user.accessible_groups for group in groups]
+                [group.id in self.current_user.accessible_group_ids for group in groups]
             ):
                 return self.error(
                     "Cannot upload photometry to groups you " "are not a member of."
                 )
             photometry.groups = groups
 
+        PhotStat.recompute({original_obj_id, phot.obj_id})
         DBSession().commit()
+        invalidate_plot_cache({original_obj_id, phot.obj_id})
         return self.success()
 
     @permissions(['Upload data'])
@@ -902,25 +1329,200 @@ class PhotometryHandler(BaseHandler):
         DBSession().query(Photometry).filter(
             Photometry.id == int(photometry_id)
         ).delete()
+        PhotStat.recompute([photometry.obj_id])
         DBSession().commit()
+        invalidate_plot_cache([photometry.obj_id])
 
         return self.success()
 
 
+def reduce_photometry(photometry, reduce, max_points, bin_size, outsys, format):
+    """Serialize a light curve after binning or downsampling it.
+
+    Bins are serialized like photometry points, with the instrument, filter
+    and origin of their points, and no ID, groups or coordinates. A
+    downsampled light curve consists of the selected points themselves.
+    See `skyportal.utils.lightcurve.reduce_light_curve`.
+    """
+    columns = get_photometry_columns(photometry)
+    by = ['instrument_id', 'instrument_name', 'filter', 'origin']
+    data = pd.DataFrame({key: columns[key] for key in by + ['mjd', 'flux', 'fluxerr']})
+    data['flux'] = data['flux'].astype(float)
+    reduced = reduce_light_curve(
+        data, reduce, max_points=max_points, bin_size=bin_size, by=by
+    )
+
+    if reduce == 'downsample':
+        return serialize_many([photometry[i] for i in reduced.index], outsys, format)
+
+    n_bins = len(reduced)
+    columns = {key: reduced[key].tolist() for key in by + ['mjd', 'flux', 'fluxerr']}
+    columns['obj_id'] = [photometry[0].obj_id] * n_bins
+    for key in ['ra', 'dec', 'ra_unc', 'dec_unc', 'id', 'groups', 'original_user_data']:
+        columns[key] = [None] * n_bins
+    return serialize_columns(columns, outsys, format)
+
+
 class ObjPhotometryHandler(BaseHandler):
     @auth_or_token
     def get(self, obj_id):
         obj = Obj.query.get(obj_id)
         if obj is None:
             return self.error('Invalid object id.')
-        photometry = Obj.get_photometry_readable_by_user(obj_id, self.current_user)
         format = self.get_query_argument('format', 'mag')
         outsys = self.get_query_argument('magsys', 'ab')
+        try:
+            reduce, max_points, bin_size = parse_reduction_arguments(
+                self.get_query_argument('reduce', None),
+                self.get_query_argument(
+                    'maxPoints', cfg['misc.photometry_reduction_max_points']
+                ),
+                self.get_query_argument(
+                    'binSize', cfg['misc.photometry_reduction_bin_size']
+                ),
+            )
+            min_mjd = self.get_query_argument('minMJD', None)
+            min_mjd = None if min_mjd is None else float(min_mjd)
+            max_mjd = self.get_query_argument('maxMJD', None)
+            max_mjd = None if max_mjd is None else float(max_mjd)
+        except ValueError as e:
+            return self.error(f'Invalid query argument: {e}')
+
+        if reduce is None and min_mjd is None and max_mjd is None:
+            photometry = Obj.get_photometry_readable_by_user(obj_id, self.current_user)
+            return self.success(data=serialize_many(photometry, outsys, format))
+
+        query = Photometry.query.filter(Photometry.obj_id == obj_id).filter(
+            Photometry.group_ids.overlap(self.current_user.accessible_group_ids)
+        )
+        if min_mjd is not None:
+            query = query.filter(Photometry.mjd >= min_mjd)
+        if max_mjd is not None:
+            query = query.filter(Photometry.mjd <= max_mjd)
+        photometry = query.all()
+
+        if reduce is None:
+            return self.success(data=serialize_many(photometry, outsys, format))
+
+        n_points = len(photometry)
+        if n_points > max_points:
+            data = reduce_photometry(
+                photometry, reduce, max_points, bin_size, outsys, format
+            )
+        else:
+            data = serialize_many(photometry, outsys, format)
         return self.success(
-            data=[serialize(phot, outsys, format) for phot in photometry]
+            data={
+                'photometry': data,
+                'reduced': n_points > max_points,
+                'n_points': n_points,
+            }
         )
 
 
+ObjPhotometryHandler.get.__doc__ = f"""
+        ---
+        description: Retrieve all photometry of an Obj
+        tags:
+          - photometry
+        parameters:
+          - in: path
+            name: obj_id
+            required: true
+            schema:
+              type: string
+          - in: query
+            name: format
+            required: false
+            description: >-
+              Return the photometry in flux or magnitude space?
+              If a value for this query parameter is not provided, the
+              result will be returned in magnitude space.
+            schema:
+              type: string
+              enum:
+                - mag
+                - flux
+          - in: query
+            name: magsys
+            required: false
+            description: >-
+              The magnitude or zeropoint system of the output. (Default AB)
+            schema:
+              type: string
+              enum: {list(ALLOWED_MAGSYSTEMS)}
+          - in: query
+            name: reduce
+            required: false
+            description: >-
+              If the Obj has more than `maxPoints` photometry points, bin
+              them in time (`bin`) or keep a visually representative subset
+              of them (`downsample`). The response data then is an object
+              with the photometry, whether it was reduced, and the number
+              of points before reduction. Request a range of MJDs with
+              `minMJD` and `maxMJD` to get it in full resolution.
+            schema:
+              type: string
+              enum:
+                - bin
+                - downsample
+          - in: query
+            name: maxPoints
+            required: false
+            description: >-
+              Number of points above which to reduce the photometry, and
+              to keep when downsampling. Defaults to the
+              `misc.photometry_reduction_max_points` config value.
+            schema:
+              type: integer
+          - in: query
+            name: binSize
+            required: false
+            description: >-
+              Width of the bins, in days. Defaults to the
+              `misc.photometry_reduction_bin_size` config value.
+            schema:
+              type: number
+          - in: query
+            name: minMJD
+            required: false
+            description: Only return photometry taken on or after this MJD
+            schema:
+              type: number
+          - in: query
+            name: maxMJD
+            required: false
+            description: Only return photometry taken on or before this MJD
+            schema:
+              type: number
+        responses:
+          200:
+            content:
+              application/json:
+                schema:
+                  oneOf:
+                    - $ref: "#/components/schemas/ArrayOfPhotometryFluxs"
+                    - $ref: "#/components/schemas/ArrayOfPhotometryMags"
+                    - type: object
+                      description: The reduced photometry (see `reduce`)
+                      properties:
+                        photometry:
+                          oneOf:
+                            - $ref: "#/components/schemas/ArrayOfPhotometryFluxs"
+                            - $ref: "#/components/schemas/ArrayOfPhotometryMags"
+                        reduced:
+                          type: boolean
+                          description: Whether the photometry was reduced
+                        n_points:
+                          type: integer
+                          description: Number of points before reduction
+          400:
+            content:
+              application/json:
+                schema: Error
+        """
+
+
 class BulkDeletePhotometryHandler(BaseHandler):
     @auth_or_token
     def delete(self, upload_id):
@@ -949,26 +1551,105 @@ class BulkDeletePhotometryHandler(BaseHandler):
         phot_id = Photometry.query.filter(Photometry.upload_id == upload_id).first().id
         _ = Photometry.get_if_readable_by(phot_id, self.current_user)
 
+        obj_ids = [
+            obj_id
+            for obj_id, in DBSession()
+            .query(Photometry.obj_id)
+            .filter(Photometry.upload_id == upload_id)
+            .distinct()
+        ]
         n_deleted = (
             DBSession()
             .query(Photometry)
             .filter(Photometry.upload_id == upload_id)
             .delete()
         )
+        PhotStat.recompute(obj_ids)
         DBSession().commit()
+        invalidate_plot_cache(obj_ids)
 
         return self.success(f"Deleted {n_deleted} photometry points.")
 
 
+PHOTOMETRY_EXPORT_FORMATS = ['ndjson', 'csv', 'arrow']
+
+PHOTOMETRY_EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+
+def get_photometry_export_schema(format):
+    """Arrow schema of the rows streamed by the photometry export."""
+    fields = [
+        ('obj_id', pa.string()),
+        ('ra', pa.float64()),
+        ('dec', pa.float64()),
+        ('filter', pa.string()),
+        ('mjd', pa.float64()),
+        ('instrument_id', pa.int64()),
+        ('instrument_name', pa.string()),
+        ('ra_unc', pa.float64()),
+        ('dec_unc', pa.float64()),
+        ('origin', pa.string()),
+        ('id', pa.int64()),
+    ]
+    if format == 'mag':
+        fields += [
+            ('mag', pa.float64()),
+            ('magerr', pa.float64()),
+            ('magsys', pa.string()),
+            ('limiting_mag', pa.float64()),
+        ]
+    else:
+        fields += [
+            ('flux', pa.float64()),
+            ('magsys', pa.string()),
+            ('zp', pa.float64()),
+            ('fluxerr', pa.float64()),
+        ]
+    fields.append(('group_ids', pa.list_(pa.int64())))
+    return pa.schema(fields)
+
+
+def serialize_export_chunk(rows, outsys, format):
+    """Serialize a chunk of rows from the photometry export query.
+
+    Parameters
+    ----------
+    rows : list of tuple
+       Rows of the export query, with the columns of
+       `PHOTOMETRY_PASSTHROUGH_COLUMNS` (minus `groups`), `flux`, `fluxerr`,
+       `original_user_data` and `group_ids`.
+    outsys : str
+       Name of the magnitude system to express the output in.
+    format : str
+       One of 'mag' or 'flux'.
+
+    Returns
+    -------
+    list of dict
+       The serialized points, with the IDs of the point's groups under
+       `group_ids` in place of the `groups` key of `serialize`.
+    """
+    columns = {key: [getattr(row, key) for row in rows] for key in rows[0]._fields}
+    columns['groups'] = [sorted(group_ids) for group_ids in columns.pop('group_ids')]
+    serialized = serialize_columns(columns, outsys, format)
+    for point in serialized:
+        point['group_ids'] = point.pop('groups')
+    return serialized
+
+
 class PhotometryRangeHandler(BaseHandler):
     @auth_or_token
-    def get(self):
+    async def get(self):
         """Docstring appears below as an f-string."""
 
-        json = self.get_json()
+        data = self.get_json()
 
         try:
-            standardized = PhotometryRangeQuery.load(json)
+            standardized = PhotometryRangeQuery.load(data)
         except ValidationError as e:
             return self.error(f'Invalid request body: {e.normalized_messages()}')
 
@@ -981,18 +1662,55 @@ class PhotometryRangeHandler(BaseHandler):
         if format not in ['mag', 'flux']:
             return self.error('Invalid output format.')
 
+        stream = self.get_query_argument('stream', default=None)
+        if stream is not None and stream not in PHOTOMETRY_EXPORT_FORMATS:
+            return self.error(
+                f'Invalid stream format, must be one of {PHOTOMETRY_EXPORT_FORMATS}.'
+            )
+
         instrument_ids = standardized['instrument_ids']
         min_date = standardized['min_date']
         max_date = standardized['max_date']
 
-        gids = [g.id for g in self.current_user.accessible_groups]
+        gids = self.current_user.accessible_group_ids
 
-        query = (
-            DBSession()
-            .query(Photometry)
-            .join(GroupPhotometry)
-            .filter(GroupPhotometry.group_id.in_(gids))
-        )
+        if stream is None:
+            query = (
+                DBSession()
+                .query(Photometry)
+                .join(GroupPhotometry)
+                .filter(GroupPhotometry.group_id.in_(gids))
+            )
+        else:
+            # select plain columns rather than ORM objects, so that nothing
+            # accumulates in the session's identity map while streaming
+            group_ids = (
+                sa.select([sa.func.array_agg(GroupPhotometry.group_id)])
+                .where(GroupPhotometry.photometr_id == Photometry.id)
+                .label('group_ids')
+            )
+            query = (
+                DBSession()
+                .query(
+                    Photometry.obj_id,
+                    Photometry.ra,
+                    Photometry.dec,
+                    Photometry.filter,
+                    Photometry.mjd,
+                    Photometry.instrument_id,
+                    Instrument.name.label('instrument_name'),
+                    Photometry.ra_unc,
+                    Photometry.dec_unc,
+                    Photometry.origin,
+                    Photometry.id,
+                    Photometry.flux,
+                    Photometry.fluxerr,
+                    Photometry.original_user_data,
+                    group_ids,
+                )
+                .join(Instrument, Instrument.id == Photometry.instrument_id)
+                .filter(Photometry.group_ids.overlap(gids))
+            )
 
         if instrument_ids is not None:
             query = query.filter(Photometry.instrument_id.in_(instrument_ids))
@@ -1003,8 +1721,93 @@ class PhotometryRangeHandler(BaseHandler):
             mjd = Time(max_date, format='datetime').mjd
             query = query.filter(Photometry.mjd <= mjd)
 
-        output = [serialize(p, magsys, format) for p in query]
-        return self.success(data=output)
+        if stream is None:
+            query = query.options(joinedload(Photometry.instrument))
+            output = serialize_many(query, magsys, format)
+            return self.success(data=output)
+
+        after_id = self.get_query_argument('afterId', default=None)
+        page_size = self.get_query_argument('pageSize', default=100_000)
+        chunk_size = self.get_query_argument('chunkSize', default=5_000)
+        try:
+            after_id = int(after_id) if after_id is not None else None
+            page_size = int(page_size)
+            chunk_size = int(chunk_size)
+        except ValueError:
+            return self.error('afterId, pageSize and chunkSize must be integers.')
+        if page_size < 1 or chunk_size < 1:
+            return self.error('pageSize and chunkSize must be positive.')
+
+        self.set_status(200)
+        self.set_header('Content-Type', PHOTOMETRY_EXPORT_CONTENT_TYPES[stream])
+        self.set_header(
+            'Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0'
+        )
+
+        schema = get_photometry_export_schema(format)
+        sink = io.BytesIO()
+        arrow_writer = None
+        if stream == 'arrow':
+            arrow_writer = pa.ipc.new_stream(sink, schema)
+        write_header = True
+
+        async def write(data):
+            self.write(data)
+            await self.flush()
+
+        # the server-side cursors of yield_per stay open across the awaits
+        # on flush, while other requests use (and may commit or release)
+        # DBSession, so the export runs on a session of its own
+        export_session = Session(bind=DBSession().get_bind())
+        query = query.with_session(export_session)
+        try:
+            while True:
+                # keyset pagination on the photometry ID: each page is an
+                # index range scan, however deep into the export we are, and
+                # a client that loses its connection can resume with afterId
+                page = query.order_by(Photometry.id)
+                if after_id is not None:
+                    page = page.filter(Photometry.id > after_id)
+                page = page.limit(page_size).yield_per(chunk_size)
+
+                n_rows = 0
+                for chunk in iterate_chunks(page, chunk_size):
+                    n_rows += len(chunk)
+                    after_id = chunk[-1].id
+                    points = serialize_export_chunk(chunk, magsys, format)
+
+                    if stream == 'ndjson':
+                        lines = [json.dumps(point) + '\n' for point in points]
+                        await write(''.join(lines))
+                        continue
+
+                    df = pd.DataFrame(points, columns=schema.names)
+                    if stream == 'csv':
+                        await write(df.to_csv(index=False, header=write_header))
+                        write_header = False
+                    else:
+                        arrow_writer.write_batch(
+                            pa.RecordBatch.from_pandas(
+                                df, schema=schema, preserve_index=False
+                            )
+                        )
+                        await write(sink.getvalue())
+                        sink.seek(0)
+                        sink.truncate()
+
+                if n_rows < page_size:
+                    break
+
+            if stream == 'csv' and write_header:
+                await write(pd.DataFrame(columns=schema.names).to_csv(index=False))
+            if arrow_writer is not None:
+                arrow_writer.close()
+                await write(sink.getvalue())
+        except tornado.iostream.StreamClosedError:
+            # the client has closed the connection
+            return
+        finally:
+            export_session.close()
 
 
 PhotometryHandler.get.__doc__ = f"""
@@ -1126,6 +1929,43 @@ PhotometryRangeHandler.get.__doc__ = f"""
             schema:
               type: string
               enum: {list(ALLOWED_MAGSYSTEMS)}
+          - in: query
+            name: stream
+            required: false
+            description: >-
+              Stream the photometry back in chunks instead of returning a
+              single JSON response, as newline-delimited JSON, CSV, or an
+              Arrow IPC stream of record batches. Points are returned in
+              order of increasing ID, with the IDs of their groups in
+              `group_ids` in place of `groups`.
+            schema:
+              type: string
+              enum: {PHOTOMETRY_EXPORT_FORMATS}
+          - in: query
+            name: afterId
+            required: false
+            description: >-
+              When streaming, only return points with an ID greater than this
+              one. Can be used to resume an interrupted export from the last
+              ID received.
+            schema:
+              type: integer
+          - in: query
+            name: pageSize
+            required: false
+            description: >-
+              When streaming, the number of points fetched per database query.
+              Defaults to 100000.
+            schema:
+              type: integer
+          - in: query
+            name: chunkSize
+            required: false
+            description: >-
+              When streaming, the number of points serialized and sent to the
+              client at a time. Defaults to 5000.
+            schema:
+              type: integer
         requestBody:
           content:
             application/json:
@@ -1,5 +1,6 @@
 from baselayer.app.access import auth_or_token
 from ..base import BaseHandler
+from .internal.plot import invalidate_plot_cache
 from ...models import DBSession, Group, Photometry, Spectrum
 
 
@@ -115,6 +116,7 @@ class SharingHandler(BaseHandler):
 
         spec_obj_ids = set(spec_obj_ids)
         phot_obj_ids = set(phot_obj_ids)
+        invalidate_plot_cache(spec_obj_ids | phot_obj_ids)
         for obj_id in phot_obj_ids:
             self.push(
                 action="skyportal/FETCH_SOURCE_PHOTOMETRY", payload={"obj_id": obj_id}
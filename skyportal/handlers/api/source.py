@@ -1,13 +1,11 @@
 import datetime
 from json.decoder import JSONDecodeError
-import python_http_client.exceptions
-from twilio.base.exceptions import TwilioException
 import tornado
 from tornado.ioloop import IOLoop
 import io
 import math
 from dateutil.parser import isoparse
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, Session
 from sqlalchemy import func, or_, tuple_
 import arrow
 from marshmallow import Schema, fields
@@ -16,6 +14,7 @@ import functools
 import healpix_alchemy as ha
 from baselayer.app.access import permissions, auth_or_token
 from baselayer.app.env import load_env
+from baselayer.log import make_log
 from ..base import BaseHandler
 from ...models import (
     DBSession,
@@ -32,6 +31,12 @@ from ...models import (
     Classification,
     Taxonomy,
     Spectrum,
+    Photometry,
+    Comment,
+    Annotation,
+    get_obj_data_readable_by,
+    get_detection_stats,
+    get_derived_astro_fields,
 )
 from .internal.source_views import register_source_view
 from ...utils import (
@@ -41,13 +46,19 @@ from ...utils import (
     get_finding_chart,
     _calculate_best_position_for_offset_stars,
 )
-from .candidate import grab_query_results, update_redshift_history_if_relevant
-from .photometry import serialize
+from ...utils.http_client import REQUEST_ERRORS
+from .candidate import (
+    InvalidPaginationError,
+    grab_query_results,
+    update_redshift_history_if_relevant,
+)
+from .photometry import serialize_many
 
 
 SOURCES_PER_PAGE = 100
 
 _, cfg = load_env()
+log = make_log('api/source')
 
 
 def apply_active_or_requested_filtering(query, include_requested, requested_only):
@@ -62,14 +73,154 @@ def apply_active_or_requested_filtering(query, include_requested, requested_only
     return query
 
 
-def add_ps1_thumbnail_and_push_ws_msg(obj, request_handler):
+async def add_ps1_thumbnail_and_push_ws_msg(obj_id, request_handler):
+    # runs after the request has finished, and waits for the PS1 cutout
+    # service, so the Obj is loaded in a session of its own
+    session = Session(bind=DBSession().get_bind())
     try:
-        obj.add_ps1_thumbnail()
-    except (ValueError, ConnectionError) as e:
-        return request_handler.error(f"Unable to generate PS1 thumbnail URL: {e}")
-    request_handler.push_all(
-        action="skyportal/REFRESH_SOURCE", payload={"obj_key": obj.internal_key}
+        obj = session.query(Obj).get(obj_id)
+        if obj is None:
+            return
+        await obj.add_ps1_thumbnail()
+        request_handler.push_all(
+            action="skyportal/REFRESH_SOURCE", payload={"obj_key": obj.internal_key}
+        )
+    except (ValueError, *REQUEST_ERRORS) as e:
+        log(f"Unable to generate PS1 thumbnail URL for {obj_id}: {e}")
+    finally:
+        session.close()
+
+
+def get_source_list_info(
+    objs,
+    user_or_token,
+    include_comments=False,
+    include_photometry=False,
+    include_photometry_exists=False,
+    include_spectrum_exists=False,
+    include_requested=False,
+    requested_only=False,
+):
+    """Build the response dicts for a page of sources.
+
+    The related data (groups, comments, annotations, classifications,
+    photometry, ...) of all of the Objs are loaded with one query per
+    relation, keyed on the page's obj_ids, so that the number of queries
+    does not depend on the number of sources on the page.
+
+    Parameters
+    ----------
+    objs : list of `skyportal.models.Obj`
+       The Objs on the page, in the order in which they should be returned.
+    user_or_token : `baselayer.app.models.User` or `baselayer.app.models.Token`
+       The requesting `User` or `Token` object.
+    include_comments, include_photometry, include_photometry_exists,
+    include_spectrum_exists, include_requested, requested_only : bool
+       The corresponding `SourceHandler.get` query arguments.
+
+    Returns
+    -------
+    source_list : list of dict
+       The serialized sources.
+    """
+    obj_ids = [obj.id for obj in objs]
+    user_accessible_group_ids = user_or_token.accessible_group_ids
+
+    if include_comments:
+        comments = get_obj_data_readable_by(
+            Comment, obj_ids, user_or_token, options=[joinedload(Comment.author)]
+        )
+    annotations = get_obj_data_readable_by(
+        Annotation, obj_ids, user_or_token, options=[joinedload(Annotation.author)]
+    )
+    classifications = get_obj_data_readable_by(Classification, obj_ids, user_or_token)
+    detection_stats = get_detection_stats(obj_ids)
+    astro_fields = get_derived_astro_fields(objs)
+    if include_photometry:
+        photometry = get_obj_data_readable_by(
+            Photometry,
+            obj_ids,
+            user_or_token,
+            options=[joinedload(Photometry.instrument)],
+        )
+    if include_photometry_exists:
+        obj_ids_with_photometry = {
+            obj_id
+            for obj_id, in DBSession()
+            .query(Photometry.obj_id)
+            .filter(Photometry.obj_id.in_(obj_ids))
+            .filter(Photometry.group_ids.overlap(user_accessible_group_ids))
+            .distinct()
+        }
+    if include_spectrum_exists:
+        obj_ids_with_spectra = {
+            obj_id
+            for obj_id, in DBSession()
+            .query(Spectrum.obj_id)
+            .filter(Spectrum.obj_id.in_(obj_ids))
+            .filter(Spectrum.group_ids.overlap(user_accessible_group_ids))
+            .distinct()
+        }
+
+    groups_query = (
+        DBSession()
+        .query(Group, Source)
+        .join(Source)
+        .filter(
+            Source.obj_id.in_(obj_ids), Group.id.in_(user_accessible_group_ids),
+        )
+        .options(joinedload(Source.saved_by))
     )
+    groups_query = apply_active_or_requested_filtering(
+        groups_query, include_requested, requested_only
+    )
+    groups = {obj_id: [] for obj_id in obj_ids}
+    for group, source_table_row in groups_query:
+        group_info = group.to_dict()
+        group_info["active"] = source_table_row.active
+        group_info["requested"] = source_table_row.requested
+        group_info["saved_at"] = source_table_row.saved_at
+        group_info["saved_by"] = (
+            source_table_row.saved_by.to_dict()
+            if source_table_row.saved_by is not None
+            else None
+        )
+        groups[source_table_row.obj_id].append(group_info)
+
+    source_list = []
+    for source in objs:
+        source_info = source.to_dict()
+        if include_comments:
+            for comment in comments[source.id]:
+                comment.author_info = comment.construct_author_info_dict()
+            source_info["comments"] = sorted(
+                [
+                    {k: v for k, v in c.to_dict().items() if k != "attachment_bytes"}
+                    for c in comments[source.id]
+                ],
+                key=lambda x: x["created_at"],
+                reverse=True,
+            )
+        source_info["classifications"] = classifications[source.id]
+        for annotation in annotations[source.id]:
+            annotation.author_info = annotation.construct_author_info_dict()
+        source_info["annotations"] = sorted(
+            annotations[source.id], key=lambda x: x.origin,
+        )
+        source_info.update(detection_stats[source.id])
+        source_info.update(astro_fields[source.id])
+        if include_photometry:
+            source_info["photometry"] = serialize_many(
+                photometry[source.id], 'ab', 'flux'
+            )
+        if include_photometry_exists:
+            source_info["photometry_exists"] = source.id in obj_ids_with_photometry
+        if include_spectrum_exists:
+            source_info["spectrum_exists"] = source.id in obj_ids_with_spectra
+        source_info["groups"] = groups[source.id]
+        source_list.append(source_info)
+
+    return source_list
 
 
 class SourceHandler(BaseHandler):
@@ -97,7 +248,7 @@ class SourceHandler(BaseHandler):
                 application/json:
                   schema: Error
         """
-        user_group_ids = [g.id for g in self.associated_user_object.accessible_groups]
+        user_group_ids = self.associated_user_object.accessible_group_ids
         num_s = (
             DBSession()
             .query(Source)
@@ -226,6 +377,26 @@ class SourceHandler(BaseHandler):
             description: |
               Used only in the case of paginating query results - if provided, this
               allows for avoiding a potentially expensive query.count() call.
+          - in: query
+            name: cursor
+            nullable: true
+            schema:
+              type: string
+            description: |
+              Use cursor pagination instead of page numbers: return the page
+              following this cursor, taken from the `nextCursor` of the previous
+              page, or the first page if empty. Later pages cost the same as the
+              first. Only supported when unsorted or sorting by ra, dec or redshift.
+          - in: query
+            name: countMode
+            nullable: true
+            schema:
+              type: string
+              enum: [exact, estimate, none]
+            description: |
+              How to compute totalMatches when it is not provided: count the
+              matches ("exact", the default), use the database's (fast but rough)
+              estimate ("estimate"), or skip it ("none").
           - in: query
             name: startDate
             nullable: true
@@ -427,10 +598,19 @@ class SourceHandler(BaseHandler):
                                   $ref: '#/components/schemas/Obj'
                               totalMatches:
                                 type: integer
+                                nullable: true
+                              totalMatchesIsEstimate:
+                                type: boolean
                               pageNumber:
                                 type: integer
                               numPerPage:
                                 type: integer
+                              nextCursor:
+                                type: string
+                                nullable: true
+                                description: |
+                                  Cursor of the next page, if using cursor
+                                  pagination. Null on the last page.
             400:
               content:
                 application/json:
@@ -519,11 +699,13 @@ class SourceHandler(BaseHandler):
                     f'Invalid group ids field ({group_ids}; Could not parse all elements to integers'
                 )
 
-        user_accessible_group_ids = [g.id for g in self.current_user.accessible_groups]
+        user_accessible_group_ids = self.current_user.accessible_group_ids
 
         simbad_class = self.get_query_argument('simbadClass', None)
         has_tns_name = self.get_query_argument('hasTNSname', None)
         total_matches = self.get_query_argument('totalMatches', None)
+        cursor = self.get_query_argument('cursor', None)
+        count_mode = self.get_query_argument('countMode', 'exact')
         is_token_request = isinstance(self.current_user, Token)
         if obj_id is not None:
             query_options = [
@@ -558,7 +740,7 @@ class SourceHandler(BaseHandler):
 
             if "ps1" not in [thumb.type for thumb in s.thumbnails]:
                 IOLoop.current().add_callback(
-                    lambda: add_ps1_thumbnail_and_push_ws_msg(s, self)
+                    add_ps1_thumbnail_and_push_ws_msg, obj_id, self
                 )
             source_info = s.to_dict()
             if include_comments:
@@ -586,11 +768,7 @@ class SourceHandler(BaseHandler):
             source_info["last_detected_mag"] = s.last_detected_mag
             source_info["peak_detected_at"] = s.peak_detected_at
             source_info["peak_detected_mag"] = s.peak_detected_mag
-            source_info["gal_lat"] = s.gal_lat_deg
-            source_info["gal_lon"] = s.gal_lon_deg
-            source_info["luminosity_distance"] = s.luminosity_distance
-            source_info["dm"] = s.dm
-            source_info["angular_diameter_distance"] = s.angular_diameter_distance
+            source_info.update(get_derived_astro_fields([s])[s.id])
 
             source_info["followup_requests"] = [
                 f for f in s.followup_requests if f.status != 'deleted'
@@ -599,9 +777,7 @@ class SourceHandler(BaseHandler):
                 photometry = Obj.get_photometry_readable_by_user(
                     obj_id, self.current_user
                 )
-                source_info["photometry"] = [
-                    serialize(phot, 'ab', 'flux') for phot in photometry
-                ]
+                source_info["photometry"] = serialize_many(photometry, 'ab', 'flux')
             if include_photometry_exists:
                 source_info["photometry_exists"] = (
                     len(Obj.get_photometry_readable_by_user(obj_id, self.current_user))
@@ -716,7 +892,7 @@ class SourceHandler(BaseHandler):
             q = q.filter(Obj.altdata['tns']['name'].isnot(None))
         if has_spectrum in ["true", True]:
             q = q.join(Spectrum).filter(
-                Spectrum.groups.any(Group.id.in_(user_accessible_group_ids))
+                Spectrum.group_ids.overlap(user_accessible_group_ids)
             )
         if min_redshift is not None:
             try:
@@ -832,9 +1008,21 @@ class SourceHandler(BaseHandler):
                     else [Classification.classification.desc().nullslast()]
                 )
 
-        if page_number:
+        # All the rows of a source sort the same way on the columns of Obj,
+        # which allows for cursor pagination. Sorting on columns of other
+        # tables (e.g. a source saved to several groups) requires sorting
+        # the rows before picking those of each Obj.
+        sort_keys = None
+        if sort_by is None:
+            sort_keys = []
+        elif sort_by in ["ra", "dec", "redshift"]:
+            sort_keys = [
+                (getattr(Obj, sort_by), "asc" if sort_order == "asc" else "desc")
+            ]
+
+        if page_number or cursor is not None:
             try:
-                page = int(page_number)
+                page = int(page_number or 1)
             except ValueError:
                 return self.error("Invalid page number value.")
             try:
@@ -846,11 +1034,12 @@ class SourceHandler(BaseHandler):
                     "sources",
                     order_by=order_by,
                     include_photometry=include_photometry,
+                    sort_keys=sort_keys,
+                    cursor=cursor,
+                    count=count_mode,
                 )
-            except ValueError as e:
-                if "Page number out of range" in str(e):
-                    return self.error("Page number out of range.")
-                raise
+            except InvalidPaginationError as e:
+                return self.error(str(e))
         elif save_summary:
             query_results = {"sources": q.all()}
         else:
@@ -862,105 +1051,20 @@ class SourceHandler(BaseHandler):
                 "sources",
                 order_by=order_by,
                 include_photometry=include_photometry,
+                sort_keys=sort_keys,
             )
 
         if not save_summary:
-            source_list = []
-            for source in query_results["sources"]:
-                source_list.append(source.to_dict())
-                if include_comments:
-                    source_list[-1]["comments"] = sorted(
-                        [
-                            {
-                                k: v
-                                for k, v in c.to_dict().items()
-                                if k != "attachment_bytes"
-                            }
-                            for c in source.get_comments_readable_by(self.current_user)
-                        ],
-                        key=lambda x: x["created_at"],
-                        reverse=True,
-                    )
-                source_list[-1][
-                    "classifications"
-                ] = source.get_classifications_readable_by(self.current_user)
-                source_list[-1]["annotations"] = sorted(
-                    source.get_annotations_readable_by(self.current_user),
-                    key=lambda x: x.origin,
-                )
-                source_list[-1]["last_detected_at"] = source.last_detected_at
-                source_list[-1]["last_detected_mag"] = source.last_detected_mag
-                source_list[-1]["peak_detected_at"] = source.peak_detected_at
-                source_list[-1]["peak_detected_mag"] = source.peak_detected_mag
-                source_list[-1]["gal_lon"] = source.gal_lon_deg
-                source_list[-1]["gal_lat"] = source.gal_lat_deg
-                source_list[-1]["luminosity_distance"] = source.luminosity_distance
-                source_list[-1]["dm"] = source.dm
-                source_list[-1][
-                    "angular_diameter_distance"
-                ] = source.angular_diameter_distance
-                if include_photometry:
-                    photometry = Obj.get_photometry_readable_by_user(
-                        source.id, self.current_user
-                    )
-                    source_list[-1]["photometry"] = [
-                        serialize(phot, 'ab', 'flux') for phot in photometry
-                    ]
-                if include_photometry_exists:
-                    source_list[-1]["photometry_exists"] = (
-                        len(
-                            Obj.get_photometry_readable_by_user(
-                                source.id, self.current_user
-                            )
-                        )
-                        > 0
-                    )
-                if include_spectrum_exists:
-                    source_list[-1]["spectrum_exists"] = (
-                        len(Obj.get_spectra_readable_by(source.id, self.current_user))
-                        > 0
-                    )
-
-                groups_query = (
-                    DBSession()
-                    .query(Group)
-                    .join(Source)
-                    .filter(
-                        Source.obj_id == source_list[-1]["id"],
-                        Group.id.in_(user_accessible_group_ids),
-                    )
-                )
-                groups_query = apply_active_or_requested_filtering(
-                    groups_query, include_requested, requested_only
-                )
-                groups = groups_query.all()
-                source_list[-1]["groups"] = [g.to_dict() for g in groups]
-                for group in source_list[-1]["groups"]:
-                    source_table_row = Source.query.filter(
-                        Source.obj_id == source.id, Source.group_id == group["id"]
-                    ).first()
-                    group["active"] = source_table_row.active
-                    group["requested"] = source_table_row.requested
-                    group["saved_at"] = source_table_row.saved_at
-                    group["saved_by"] = (
-                        source_table_row.saved_by.to_dict()
-                        if source_table_row.saved_by is not None
-                        else None
-                    )
-
-                # add the date(s) this source was saved to each of these groups
-                for i, g in enumerate(source_list[-1]["groups"]):
-                    saved_at = (
-                        DBSession()
-                        .query(Source.saved_at)
-                        .filter(
-                            Source.obj_id == source_list[-1]["id"],
-                            Source.group_id == g["id"],
-                        )
-                        .first()
-                        .saved_at
-                    )
-                    source_list[-1]["groups"][i]['saved_at'] = saved_at
+            source_list = get_source_list_info(
+                query_results["sources"],
+                self.current_user,
+                include_comments=include_comments,
+                include_photometry=include_photometry,
+                include_photometry_exists=include_photometry_exists,
+                include_spectrum_exists=include_spectrum_exists,
+                include_requested=include_requested,
+                requested_only=requested_only,
+            )
             query_results["sources"] = source_list
 
         return self.success(data=query_results)
@@ -1017,7 +1121,7 @@ class SourceHandler(BaseHandler):
             return self.error("Dec must not be null for a new Obj")
 
         user_group_ids = [g.id for g in self.current_user.groups]
-        user_accessible_group_ids = [g.id for g in self.current_user.accessible_groups]
+        user_accessible_group_ids = self.current_user.accessible_group_ids
         if not user_group_ids:
             return self.error(
                 "You must belong to one or more groups before " "you can add sources."
@@ -1060,9 +1164,9 @@ class SourceHandler(BaseHandler):
                 for group in groups
             ]
         )
-        DBSession().commit()
         if not obj_already_exists:
             obj.add_linked_thumbnails()
+        DBSession().commit()
 
         # If we're updating a source
         if previously_saved is not None:
@@ -1146,7 +1250,7 @@ class SourceHandler(BaseHandler):
               application/json:
                 schema: Success
         """
-        if group_id not in [g.id for g in self.current_user.accessible_groups]:
+        if group_id not in self.current_user.accessible_group_ids:
             return self.error("Inadequate permissions.")
         s = (
             DBSession()
@@ -1712,19 +1816,8 @@ class SourceNotificationHandler(BaseHandler):
             level=level,
         )
         DBSession().add(new_notification)
-        try:
-            DBSession().commit()
-        except python_http_client.exceptions.UnauthorizedError:
-            return self.error(
-                "Twilio Sendgrid authorization error. Please ensure "
-                "valid Sendgrid API key is set in server environment as "
-                "per their setup docs."
-            )
-        except TwilioException:
-            return self.error(
-                "Twilio Communication SMS API authorization error. Please ensure "
-                "valid Twilio API key is set in server environment as "
-                "per their setup docs."
-            )
+        # the notification is sent by a background task (see
+        # `skyportal.models.send_source_notification`)
+        DBSession().commit()
 
         return self.success(data={'id': new_notification.id})
@@ -9,6 +9,7 @@ from marshmallow.exceptions import ValidationError
 from baselayer.app.access import permissions, auth_or_token
 from baselayer.app.env import load_env
 from ..base import BaseHandler
+from .internal.plot import invalidate_plot_cache
 from ...models import (
     DBSession,
     FollowupRequest,
@@ -137,6 +138,7 @@ class SpectrumHandler(BaseHandler):
         spec.owner_id = owner_id
         DBSession().add(spec)
         DBSession().commit()
+        invalidate_plot_cache([spec.obj_id])
 
         self.push_all(
             action='skyportal/REFRESH_SOURCE',
@@ -181,9 +183,7 @@ class SpectrumHandler(BaseHandler):
             .join(GroupSpectrum)
             .filter(
                 Spectrum.id == spectrum_id,
-                GroupSpectrum.group_id.in_(
-                    [g.id for g in self.current_user.accessible_groups]
-                ),
+                GroupSpectrum.group_id.in_(self.current_user.accessible_group_ids),
             )
             .options(joinedload(Spectrum.groups))
             .first()
@@ -253,10 +253,12 @@ class SpectrumHandler(BaseHandler):
                 'Invalid/missing parameters: ' f'{e.normalized_messages()}'
             )
 
+        original_obj_id = spectrum.obj_id
         for k in data:
             setattr(spectrum, k, data[k])
 
         DBSession().commit()
+        invalidate_plot_cache({original_obj_id, spectrum.obj_id})
 
         self.push_all(
             action='skyportal/REFRESH_SOURCE',
@@ -300,6 +302,7 @@ class SpectrumHandler(BaseHandler):
 
         DBSession().delete(spectrum)
         DBSession().commit()
+        invalidate_plot_cache([spectrum.obj_id])
 
         self.push_all(
             action='skyportal/REFRESH_SOURCE',
@@ -465,6 +468,7 @@ class SpectrumASCIIFileHandler(BaseHandler, ASCIIHandler):
 
         DBSession().add(spec)
         DBSession().commit()
+        invalidate_plot_cache([spec.obj_id])
 
         self.push_all(
             action='skyportal/REFRESH_SOURCE',
@@ -654,7 +658,7 @@ class SpectrumRangeHandler(BaseHandler):
         min_date = self.get_query_argument('min_date', None)
         max_date = self.get_query_argument('max_date', None)
 
-        gids = [g.id for g in self.current_user.accessible_groups]
+        gids = self.current_user.accessible_group_ids
 
         query = (
             DBSession()
@@ -56,9 +56,7 @@ class TaxonomyHandler(BaseHandler):
             return self.success(data=taxonomy[0])
 
         query = Taxonomy.query.filter(
-            Taxonomy.groups.any(
-                Group.id.in_([g.id for g in self.current_user.accessible_groups])
-            )
+            Taxonomy.groups.any(Group.id.in_(self.current_user.accessible_group_ids))
         )
         return self.success(data=query.all())
 
@@ -163,7 +161,7 @@ class TaxonomyHandler(BaseHandler):
 
         # establish the groups to use
         user_group_ids = [g.id for g in self.current_user.groups]
-        user_accessible_group_ids = [g.id for g in self.current_user.accessible_groups]
+        user_accessible_group_ids = self.current_user.accessible_group_ids
         group_ids = data.pop("group_ids", user_group_ids)
         if group_ids == []:
             group_ids = user_group_ids
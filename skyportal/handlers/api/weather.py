@@ -1,8 +1,9 @@
 import datetime
+import json
 
 from baselayer.app.access import auth_or_token
 from baselayer.app.env import load_env
-from ...utils.offset import get_url
+from ...utils.http_client import http_client, REQUEST_ERRORS
 
 from ..base import BaseHandler
 from ...models import DBSession, Telescope
@@ -18,7 +19,7 @@ default_prefs = {'telescopeID': 1}
 
 class WeatherHandler(BaseHandler):
     @auth_or_token
-    def get(self):
+    async def get(self):
         """
         ---
         description: Retrieve weather at the telescope site saved by user
@@ -58,7 +59,8 @@ class WeatherHandler(BaseHandler):
         weather_prefs = user_prefs.get('weather', {})
         weather_prefs = {**default_prefs, **weather_prefs}
 
-        t = Telescope.query.get(int(weather_prefs["telescopeID"]))
+        telescope_id = int(weather_prefs["telescopeID"])
+        t = Telescope.query.get(telescope_id)
         if t is None:
             return self.error(
                 f"Could not load telescope with ID {weather_prefs['telescopeID']}"
@@ -76,17 +78,25 @@ class WeatherHandler(BaseHandler):
 
         message = ""
         if refresh:
-            response = get_url(
+            url = (
                 "https://api.openweathermap.org/data/2.5/onecall?"
                 f"lat={t.lat}&lon={t.lon}&appid={openweather_api_key}"
             )
-            if response is not None:
-                if response.status_code == 200:
-                    weather = response.json()
-                    t.weather = weather
-                    t.weather_retrieved_at = datetime.datetime.utcnow()
-                    DBSession().commit()
-                else:
-                    message = response.text
+            try:
+                response = await http_client.fetch(url)
+            except REQUEST_ERRORS as e:
+                response = None
+                message = f"Could not fetch the weather: {e}"
+
+            # other requests share DBSession, and may have committed or
+            # closed it while the weather was fetched
+            t = Telescope.query.get(telescope_id)
+            if response is not None and response.code == 200:
+                weather = json.loads(response.body)
+                t.weather = weather
+                t.weather_retrieved_at = datetime.datetime.utcnow()
+                DBSession().commit()
+            elif response is not None:
+                message = response.body.decode()
 
         return self.success(data={**t.to_dict(), "message": message})
@@ -3,12 +3,13 @@ import uuid
 import re
 import json
 import warnings
+import traceback
 from datetime import datetime, timezone, timedelta
-import requests
 import arrow
 
 import astroplan
 import numpy as np
+import pandas as pd
 import timezonefinder
 from slugify import slugify
 
@@ -16,7 +17,7 @@ import sqlalchemy as sa
 from sqlalchemy import cast, event
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.dialects import postgresql as psql
-from sqlalchemy.orm import relationship, joinedload
+from sqlalchemy.orm import relationship, selectinload
 from sqlalchemy.schema import UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -34,7 +35,8 @@ from astropy import coordinates as ap_coord
 from astropy.io import fits, ascii
 import healpix_alchemy as ha
 
-from .utils.cosmology import establish_cosmology
+from .utils.cosmology import establish_cosmology, get_distance_table
+from .utils.http_client import http_client
 from baselayer.app.models import (  # noqa
     init_db,
     join_model,
@@ -117,9 +119,9 @@ def is_readable_by(self, user_or_token):
     if hasattr(self, 'tokens'):
         return user_or_token in self.tokens
     if hasattr(self, 'groups'):
-        return bool(set(self.groups) & set(user_or_token.accessible_groups))
+        return bool({g.id for g in self.groups} & user_or_token.accessible_group_ids)
     if hasattr(self, 'group'):
-        return self.group in user_or_token.accessible_groups
+        return self.group.id in user_or_token.accessible_group_ids
     if hasattr(self, 'users'):
         if hasattr(user_or_token, 'created_by'):
             if user_or_token.created_by in self.users:
@@ -421,6 +423,92 @@ User.accessible_streams = user_or_token_accessible_streams
 Token.accessible_streams = user_or_token_accessible_streams
 
 
+def get_memoized_accessible_ids(user_or_token, kind, compute):
+    """Return a set of IDs of the entities of some kind (e.g., Groups) a User
+    or Token has access to, computing it at most once per database session,
+    i.e., once per request.
+
+    The memo is kept in the session's `info` and is dropped whenever the
+    session commits, rolls back, or flushes changes to group or stream
+    memberships, filters or permissions (see
+    `clear_memoized_accessible_ids`).
+
+    Parameters
+    ----------
+    user_or_token : `baselayer.app.models.User` or `baselayer.app.models.Token`
+       The requesting `User` or `Token` object.
+    kind : str
+       Name of the kind of entities, e.g., 'groups'.
+    compute : callable
+       Called without arguments on a miss, returning the IDs.
+
+    Returns
+    -------
+    ids : frozenset
+       The IDs of the accessible entities.
+    """
+    memo = DBSession().info.setdefault('accessible_ids', {})
+    key = (type(user_or_token).__name__, user_or_token.id, kind)
+    if key not in memo:
+        memo[key] = frozenset(compute())
+    return memo[key]
+
+
+@property
+def user_or_token_accessible_group_ids(self):
+    """Return the IDs of the Groups a User or Token has access to (see
+    `accessible_groups`). Unlike `accessible_groups`, this does not load all
+    the Groups for System Admins, and it is computed once per request."""
+
+    def compute():
+        if "System admin" in self.permissions:
+            return [group_id for group_id, in DBSession().query(Group.id)]
+        return [g.id for g in self.groups]
+
+    return get_memoized_accessible_ids(self, 'groups', compute)
+
+
+User.accessible_group_ids = user_or_token_accessible_group_ids
+Token.accessible_group_ids = user_or_token_accessible_group_ids
+
+
+@property
+def user_or_token_accessible_filter_ids(self):
+    """Return the IDs of the Filters of the Groups a User or Token has access
+    to, computed once per request."""
+
+    def compute():
+        return [
+            filter_id
+            for filter_id, in DBSession()
+            .query(Filter.id)
+            .filter(Filter.group_id.in_(self.accessible_group_ids))
+        ]
+
+    return get_memoized_accessible_ids(self, 'filters', compute)
+
+
+User.accessible_filter_ids = user_or_token_accessible_filter_ids
+Token.accessible_filter_ids = user_or_token_accessible_filter_ids
+
+
+@property
+def user_or_token_accessible_stream_ids(self):
+    """Return the IDs of the Streams a User or Token has access to (see
+    `accessible_streams`), computed once per request."""
+
+    def compute():
+        if "System admin" in self.permissions:
+            return [stream_id for stream_id, in DBSession().query(Stream.id)]
+        return [s.id for s in self.accessible_streams]
+
+    return get_memoized_accessible_ids(self, 'streams', compute)
+
+
+User.accessible_stream_ids = user_or_token_accessible_stream_ids
+Token.accessible_stream_ids = user_or_token_accessible_stream_ids
+
+
 @property
 def token_groups(self):
     """The groups the Token owner is a member of."""
@@ -430,6 +518,32 @@ def token_groups(self):
 Token.groups = token_groups
 
 
+def get_altdata_distance(altdata):
+    """Return the luminosity distance, in Mpc, given by the `dm` (mag),
+    `parallax` (arcsec), `dist_kpc`, `dist_Mpc`, `dist_pc` or `dist_cm`
+    entries (looked up in that order) of an Obj's `altdata`, or None if
+    there are none.
+    """
+    if altdata:
+        if altdata.get("dm") is not None:
+            # see eq (24) of https://ned.ipac.caltech.edu/level5/Hogg/Hogg7.html
+            return ((10 ** (float(altdata.get("dm")) / 5.0)) * 1e-5 * u.Mpc).value
+        if altdata.get("parallax") is not None:
+            if float(altdata.get("parallax")) > 0:
+                # assume parallax in arcsec
+                return (1e-6 * u.Mpc / float(altdata.get("parallax"))).value
+
+        if altdata.get("dist_kpc") is not None:
+            return (float(altdata.get("dist_kpc")) * 1e-3 * u.Mpc).value
+        if altdata.get("dist_Mpc") is not None:
+            return (float(altdata.get("dist_Mpc")) * u.Mpc).value
+        if altdata.get("dist_pc") is not None:
+            return (float(altdata.get("dist_pc")) * 1e-6 * u.Mpc).value
+        if altdata.get("dist_cm") is not None:
+            return (float(altdata.get("dist_cm")) * u.Mpc / 3.085e18).value
+    return None
+
+
 class Obj(Base, ha.Point):
     """A record of an astronomical Object and its metadata, such as position,
     positional uncertainties, name, and redshift. Permissioning rules,
@@ -590,114 +704,97 @@ class Obj(Base, ha.Point):
         doc="Notifications regarding the object sent out by users",
     )
 
+    photstat = relationship(
+        'PhotStat',
+        back_populates='obj',
+        uselist=False,
+        passive_deletes=True,
+        doc="Summary statistics of the photometry of the object.",
+    )
+
     @hybrid_property
     def last_detected_at(self):
         """UTC ISO date at which the object was last detected above a given S/N (3.0 by default)."""
-        detections = [
-            phot.iso
-            for phot in self.photometry
-            if phot.snr is not None and phot.snr > PHOT_DETECTION_THRESHOLD
-        ]
-        return max(detections) if detections else None
+        if self.photstat is None or self.photstat.last_detected_mjd is None:
+            return None
+        return arrow.get((self.photstat.last_detected_mjd - 40_587) * 86400.0)
 
     @last_detected_at.expression
     def last_detected_at(cls):
         """UTC ISO date at which the object was last detected above a given S/N (3.0 by default)."""
         return (
-            sa.select([sa.func.max(Photometry.iso)])
-            .where(Photometry.obj_id == cls.id)
-            .where(Photometry.snr.isnot(None))
-            .where(Photometry.snr > PHOT_DETECTION_THRESHOLD)
+            sa.select(
+                [sa.func.to_timestamp((PhotStat.last_detected_mjd - 40_587) * 86400.0)]
+            )
+            .where(PhotStat.obj_id == cls.id)
             .label('last_detected_at')
         )
 
     @hybrid_property
     def last_detected_mag(self):
         """Magnitude at which the object was last detected above a given S/N (3.0 by default)."""
-        detections = [
-            (phot.iso, phot.mag)
-            for phot in self.photometry
-            if phot.snr is not None and phot.snr > PHOT_DETECTION_THRESHOLD
-        ]
-        return max(detections, key=(lambda x: x[0]))[1] if detections else None
+        return self.photstat.last_detected_mag if self.photstat is not None else None
 
     @last_detected_mag.expression
     def last_detected_mag(cls):
         """Magnitude at which the object was last detected above a given S/N (3.0 by default)."""
-        last_detected = (
-            sa.select([cls.id, sa.func.max(Photometry.mjd).label("max_mjd")])
-            .where(Photometry.obj_id == cls.id)
-            .where(Photometry.snr.isnot(None))
-            .where(Photometry.snr > PHOT_DETECTION_THRESHOLD)
-            .group_by(cls.id)
-            .alias()
-        )
         return (
-            sa.select([Photometry.mag])
-            .where(Photometry.obj_id == cls.id)
-            .where(Photometry.snr.isnot(None))
-            .where(Photometry.snr > PHOT_DETECTION_THRESHOLD)
-            .where(cls.id == last_detected.c.id)
-            .where(Photometry.mjd == last_detected.c.max_mjd)
+            sa.select([PhotStat.last_detected_mag])
+            .where(PhotStat.obj_id == cls.id)
             .label('last_detected_mag')
         )
 
     @hybrid_property
     def peak_detected_at(self):
         """UTC ISO date at which the object was detected at peak magnitude above a given S/N (3.0 by default)."""
-        detections = [
-            (phot.iso, phot.mag)
-            for phot in self.photometry
-            if phot.snr is not None and phot.snr > PHOT_DETECTION_THRESHOLD
-        ]
-        return max(detections, key=(lambda x: x[1]))[0] if detections else None
+        if self.photstat is None or self.photstat.peak_detected_mjd is None:
+            return None
+        return arrow.get((self.photstat.peak_detected_mjd - 40_587) * 86400.0)
 
     @peak_detected_at.expression
     def peak_detected_at(cls):
         """UTC ISO date at which the object was detected at peak magnitude above a given S/N (3.0 by default)."""
         return (
-            sa.select([Photometry.iso])
-            .where(Photometry.obj_id == cls.id)
-            .where(Photometry.snr.isnot(None))
-            .where(Photometry.snr > PHOT_DETECTION_THRESHOLD)
-            .order_by(Photometry.mag.desc())
-            .limit(1)
+            sa.select(
+                [sa.func.to_timestamp((PhotStat.peak_detected_mjd - 40_587) * 86400.0)]
+            )
+            .where(PhotStat.obj_id == cls.id)
             .label('peak_detected_at')
         )
 
     @hybrid_property
     def peak_detected_mag(self):
         """Peak magnitude at which the object was detected above a given S/N (3.0 by default)."""
-        detections = [
-            phot.mag
-            for phot in self.photometry
-            if phot.snr is not None and phot.snr > PHOT_DETECTION_THRESHOLD
-        ]
-        return max(detections) if detections else None
+        return self.photstat.peak_detected_mag if self.photstat is not None else None
 
     @peak_detected_mag.expression
     def peak_detected_mag(cls):
         """Peak magnitude at which the object was detected above a given S/N (3.0 by default)."""
         return (
-            sa.select([sa.func.max(Photometry.mag)])
-            .where(Photometry.obj_id == cls.id)
-            .where(Photometry.snr.isnot(None))
-            .where(Photometry.snr > PHOT_DETECTION_THRESHOLD)
+            sa.select([PhotStat.peak_detected_mag])
+            .where(PhotStat.obj_id == cls.id)
             .label('peak_detected_mag')
         )
 
     def add_linked_thumbnails(self):
         """Determine the URLs of the SDSS and DESI DR8 thumbnails of the object,
-        insert them into the Thumbnails table, and link them to the object."""
+        and add them to the session, linked to the object. They are inserted
+        into the Thumbnails table when the session is committed."""
         sdss_thumb = Thumbnail(obj=self, public_url=self.sdss_url, type='sdss')
         dr8_thumb = Thumbnail(obj=self, public_url=self.desi_dr8_url, type='dr8')
         DBSession().add_all([sdss_thumb, dr8_thumb])
-        DBSession().commit()
 
-    def add_ps1_thumbnail(self):
-        ps1_thumb = Thumbnail(obj=self, public_url=self.panstarrs_url, type="ps1")
-        DBSession().add(ps1_thumb)
-        DBSession().commit()
+    async def add_ps1_thumbnail(self):
+        """Look up the URL of the PanSTARRS-1 thumbnail of the object, and
+        insert it into the Thumbnails table.
+
+        The thumbnail is committed with the session of the object. As other
+        requests may commit or close `DBSession` while the cutout service is
+        queried, the object should be loaded in a session of its own."""
+        public_url = await self.get_panstarrs_url()
+        session = sa.orm.object_session(self)
+        session.add(Thumbnail(obj_id=self.id, public_url=public_url, type="ps1"))
+        session.commit()
 
     @property
     def sdss_url(self):
@@ -716,8 +813,7 @@ class Obj(Base, ha.Point):
             f"&dec={self.dec}&size=200&layer=dr8&pixscale=0.262&bands=grz"
         )
 
-    @property
-    def panstarrs_url(self):
+    async def get_panstarrs_url(self):
         """Construct URL for public PanSTARRS-1 (PS1) cutout.
 
         The cutout service doesn't allow directly querying for an image; the
@@ -729,8 +825,10 @@ class Obj(Base, ha.Point):
             f"?pos={self.ra}+{self.dec}&filter=color&filter=g"
             f"&filter=r&filter=i&filetypes=stack&size=250"
         )
-        response = requests.get(ps_query_url)
-        match = re.search('src="//ps1images.stsci.edu.*?"', response.content.decode())
+        response = await http_client.fetch(ps_query_url)
+        match = re.search('src="//ps1images.stsci.edu.*?"', response.body.decode())
+        if match is None:
+            raise ValueError(f'No PS1 cutout found at {ps_query_url}')
         return match.group().replace('src="', 'http:').replace('"', '')
 
     @property
@@ -767,25 +865,9 @@ class Obj(Base, ha.Point):
 
         # there may be a non-redshift based measurement of distance
         # for nearby sources
-        if self.altdata:
-            if self.altdata.get("dm") is not None:
-                # see eq (24) of https://ned.ipac.caltech.edu/level5/Hogg/Hogg7.html
-                return (
-                    (10 ** (float(self.altdata.get("dm")) / 5.0)) * 1e-5 * u.Mpc
-                ).value
-            if self.altdata.get("parallax") is not None:
-                if float(self.altdata.get("parallax")) > 0:
-                    # assume parallax in arcsec
-                    return (1e-6 * u.Mpc / float(self.altdata.get("parallax"))).value
-
-            if self.altdata.get("dist_kpc") is not None:
-                return (float(self.altdata.get("dist_kpc")) * 1e-3 * u.Mpc).value
-            if self.altdata.get("dist_Mpc") is not None:
-                return (float(self.altdata.get("dist_Mpc")) * u.Mpc).value
-            if self.altdata.get("dist_pc") is not None:
-                return (float(self.altdata.get("dist_pc")) * 1e-6 * u.Mpc).value
-            if self.altdata.get("dist_cm") is not None:
-                return (float(self.altdata.get("dist_cm")) * u.Mpc / 3.085e18).value
+        distance = get_altdata_distance(self.altdata)
+        if distance is not None:
+            return distance
 
         if self.redshift:
             if self.redshift * 2.99e5 * u.km / u.s < 350 * u.km / u.s:
@@ -795,7 +877,7 @@ class Obj(Base, ha.Point):
                 # within ~5 Mpc (cz ~ 350 km/s) a given galaxy velocty
                 # can be between between ~0-500 km/s
                 return None
-            return (cosmo.luminosity_distance(self.redshift)).to(u.Mpc).value
+            return get_distance_table(cosmo).luminosity_distance(self.redshift)
         return None
 
     @property
@@ -997,7 +1079,7 @@ def get_candidate_if_readable_by(obj_id, user_or_token, options=[]):
 
     if Candidate.query.filter(Candidate.obj_id == obj_id).first() is None:
         return None
-    user_group_ids = [g.id for g in user_or_token.accessible_groups]
+    user_group_ids = user_or_token.accessible_group_ids
     c = (
         Candidate.query.filter(Candidate.obj_id == obj_id)
         .filter(
@@ -1028,7 +1110,7 @@ def candidate_is_readable_by(self, user_or_token):
     readable : bool
        Whether the Candidate is readable by the User or Token owner.
     """
-    return self.filter.group in user_or_token.accessible_groups
+    return self.filter_id in user_or_token.accessible_filter_ids
 
 
 Candidate.get_obj_if_readable_by = get_candidate_if_readable_by
@@ -1130,7 +1212,7 @@ def source_is_readable_by(self, user_or_token):
         .filter(Source.obj_id == self.obj_id)
         .all()
     ]
-    return bool(set(source_group_ids) & {g.id for g in user_or_token.accessible_groups})
+    return bool(set(source_group_ids) & user_or_token.accessible_group_ids)
 
 
 def get_source_if_readable_by(obj_id, user_or_token, options=[]):
@@ -1156,7 +1238,7 @@ def get_source_if_readable_by(obj_id, user_or_token, options=[]):
 
     if Source.query.filter(Source.obj_id == obj_id).first() is None:
         return None
-    user_group_ids = [g.id for g in user_or_token.accessible_groups]
+    user_group_ids = user_or_token.accessible_group_ids
     s = (
         Source.query.filter(Source.obj_id == obj_id)
         .filter(Source.group_id.in_(user_group_ids))
@@ -1172,11 +1254,64 @@ Source.is_readable_by = source_is_readable_by
 Source.get_obj_if_readable_by = get_source_if_readable_by
 
 
+def get_readable_obj_ids(obj_ids, user_or_token):
+    """Return the IDs of the Objs, among a list of Objs, that a User or Token
+    can read, i.e., that are a Source or a Candidate of, or have Photometry
+    shared with, any of the User or Token owner's accessible Groups. The
+    readability of all the Objs is resolved with a single query, without
+    loading any Obj or Photometry rows.
+
+    Parameters
+    ----------
+    obj_ids : list of str
+       The IDs of the Objs to check.
+    user_or_token : `baselayer.app.models.User` or `baselayer.app.models.Token`
+       The requesting `User` or `Token` object.
+
+    Returns
+    -------
+    readable_obj_ids : set of str
+       The IDs of the existing Objs that are readable by the User or Token.
+    """
+    obj_ids = list(set(obj_ids))
+    if len(obj_ids) == 0:
+        return set()
+
+    if "System admin" in user_or_token.permissions:
+        query = DBSession().query(Obj.id).filter(Obj.id.in_(obj_ids))
+    else:
+        group_ids = user_or_token.accessible_group_ids
+        sources = (
+            DBSession()
+            .query(Source.obj_id)
+            .filter(Source.obj_id.in_(obj_ids), Source.group_id.in_(group_ids))
+        )
+        candidates = (
+            DBSession()
+            .query(Candidate.obj_id)
+            .filter(
+                Candidate.obj_id.in_(obj_ids),
+                Candidate.filter_id.in_(user_or_token.accessible_filter_ids),
+            )
+        )
+        photometry = (
+            DBSession()
+            .query(Photometry.obj_id)
+            .filter(
+                Photometry.obj_id.in_(obj_ids), Photometry.group_ids.overlap(group_ids)
+            )
+        )
+        query = sources.union(candidates, photometry)
+
+    return {obj_id for obj_id, in query}
+
+
 def get_obj_if_readable_by(obj_id, user_or_token, options=[]):
-    """Return an Obj from the database if the Obj is either a Source or a Candidate in at least
-    one of the requesting User or Token owner's accessible Groups. If the Obj is not a
-    Source or a Candidate in one of the User or Token owner's accessible Groups, raise an AccessError.
-    If the Obj does not exist, return `None`.
+    """Return an Obj from the database if the Obj is either a Source or a Candidate
+    in at least one of the requesting User or Token owner's accessible Groups, or
+    has Photometry shared with one of them (see `get_readable_obj_ids`). If the Obj
+    is not readable by the User or Token, raise an AccessError. If the Obj does not
+    exist, return `None`.
 
     Parameters
     ----------
@@ -1193,34 +1328,12 @@ def get_obj_if_readable_by(obj_id, user_or_token, options=[]):
        The requested Obj.
     """
 
-    def construct_joinedload(base, additional_attrs):
-        jl = joinedload(base)
-        for attr in additional_attrs:
-            jl = jl.joinedload(attr)
-        return jl
-
-    if Obj.query.get(obj_id) is None:
-        return None
-    if "System admin" in user_or_token.permissions:
-        return Obj.query.options(options).get(obj_id)
-
-    # the order of the following attempts is important -
-    # this one should come first
-    if Obj.get_photometry_readable_by_user(obj_id, user_or_token):
-        return Obj.query.options(options).get(obj_id)
-
-    try:
-        source_opts = [construct_joinedload(Source.obj, o.path) for o in options]
-        obj = Source.get_obj_if_readable_by(obj_id, user_or_token, source_opts)
-    except AccessError:  # They may still be able to view the associated Candidate
-        cand_opts = [construct_joinedload(Candidate.obj, o.path) for o in options]
-        obj = Candidate.get_obj_if_readable_by(obj_id, user_or_token, cand_opts)
-
-    if obj is None:
+    if obj_id not in get_readable_obj_ids([obj_id], user_or_token):
+        if DBSession().query(Obj.id).filter(Obj.id == obj_id).first() is None:
+            return None
         raise AccessError('Insufficient permissions.')
 
-    # If we get here, the user has access to either the associated Source or Candidate
-    return obj
+    return Obj.query.options(options).get(obj_id)
 
 
 Obj.get_if_readable_by = get_obj_if_readable_by
@@ -1326,11 +1439,7 @@ def get_photometry_readable_by_user(obj_id, user_or_token):
     """
     return (
         Photometry.query.filter(Photometry.obj_id == obj_id)
-        .filter(
-            Photometry.groups.any(
-                Group.id.in_([g.id for g in user_or_token.accessible_groups])
-            )
-        )
+        .filter(Photometry.group_ids.overlap(user_or_token.accessible_group_ids))
         .all()
     )
 
@@ -1359,11 +1468,7 @@ def get_spectra_readable_by(obj_id, user_or_token, options=()):
 
     return (
         Spectrum.query.filter(Spectrum.obj_id == obj_id)
-        .filter(
-            Spectrum.groups.any(
-                Group.id.in_([g.id for g in user_or_token.accessible_groups])
-            )
-        )
+        .filter(Spectrum.group_ids.overlap(user_or_token.accessible_group_ids))
         .options(options)
         .all()
     )
@@ -1372,6 +1477,198 @@ def get_spectra_readable_by(obj_id, user_or_token, options=()):
 Obj.get_spectra_readable_by = get_spectra_readable_by
 
 
+def get_obj_data_readable_by(cls, obj_ids, user_or_token, options=()):
+    """Query the database and return the instances of `cls` (e.g.,
+    `Comment`s or `Photometry`) attached to any of a list of Objs that are
+    shared with any of the User or Token owner's accessible Groups. All of the
+    Objs are resolved in a single query, with the `groups` of each instance
+    eagerly loaded.
+
+    Parameters
+    ----------
+    cls : `skyportal.models.Base` subclass
+       The model to look up. Must have `obj_id`, `groups`, `group_ids` and
+       `created_at` attributes.
+    obj_ids : list of str
+       The IDs of the Objs to look up.
+    user_or_token : `baselayer.app.models.User` or `baselayer.app.models.Token`
+       The requesting `User` or `Token` object.
+    options : list of `sqlalchemy.orm.MapperOption`s
+       Options that wil be passed to `options()` in the loader query.
+
+    Returns
+    -------
+    data : dict
+       Maps each requested obj_id to the list of accessible `cls` instances
+       attached to it, ordered by creation time.
+    """
+
+    data = {obj_id: [] for obj_id in obj_ids}
+    if len(data) == 0:
+        return data
+
+    accessible_group_ids = user_or_token.accessible_group_ids
+    query = (
+        cls.query.filter(cls.obj_id.in_(list(data)))
+        .filter(cls.group_ids.overlap(accessible_group_ids))
+        .options(selectinload(cls.groups), *options)
+        .order_by(cls.created_at, cls.id)
+    )
+    for instance in query:
+        data[instance.obj_id].append(instance)
+    return data
+
+
+def get_detection_stats(obj_ids):
+    """Return the time and magnitude of the last and of the peak detection
+    of each of a list of Objs. This is the batched equivalent of the
+    `last_detected_at`, `last_detected_mag`, `peak_detected_at` and
+    `peak_detected_mag` instance properties of `Obj`, and reads the PhotStats
+    of all of the Objs in a single query.
+
+    Parameters
+    ----------
+    obj_ids : list of str
+       The IDs of the Objs to look up.
+
+    Returns
+    -------
+    stats : dict
+       Maps each requested obj_id to a dict with the keys `last_detected_at`,
+       `last_detected_mag`, `peak_detected_at` and `peak_detected_mag`. The
+       values are None for Objs without detections.
+    """
+
+    stats = {
+        obj_id: {
+            'last_detected_at': None,
+            'last_detected_mag': None,
+            'peak_detected_at': None,
+            'peak_detected_mag': None,
+        }
+        for obj_id in obj_ids
+    }
+    if len(stats) == 0:
+        return stats
+
+    # same conversion as the `Obj.last_detected_at` instance property
+    def iso(mjd):
+        return arrow.get((mjd - 40_587) * 86400.0) if mjd is not None else None
+
+    for photstat in PhotStat.query.filter(PhotStat.obj_id.in_(list(stats))):
+        stats[photstat.obj_id] = {
+            'last_detected_at': iso(photstat.last_detected_mjd),
+            'last_detected_mag': photstat.last_detected_mag,
+            'peak_detected_at': iso(photstat.peak_detected_mjd),
+            'peak_detected_mag': photstat.peak_detected_mag,
+        }
+
+    return stats
+
+
+def compute_derived_astro_fields(ra, dec, redshift, altdata):
+    """Compute the galactic coordinates and distances of a list of objects.
+
+    This is the vectorized equivalent of the `gal_lon_deg`, `gal_lat_deg`,
+    `luminosity_distance`, `dm` and `angular_diameter_distance` instance
+    properties of `Obj`: the coordinates are transformed with a single
+    `SkyCoord`, and the cosmological luminosity distances are interpolated
+    from the `DistanceTable` of the configured cosmology.
+
+    Parameters
+    ----------
+    ra, dec : sequence of float
+       The coordinates of the objects, in degrees.
+    redshift : sequence of float or None
+       The redshifts of the objects.
+    altdata : sequence of dict or None
+       The `altdata` of the objects, which may hold non-redshift based
+       distances (see `get_altdata_distance`).
+
+    Returns
+    -------
+    fields : dict
+       Maps `gal_lon`, `gal_lat`, `luminosity_distance`, `dm` and
+       `angular_diameter_distance` to lists with one value per object, with
+       None where the value is undefined.
+    """
+
+    n = len(ra)
+    if n == 0:
+        return {
+            'gal_lon': [],
+            'gal_lat': [],
+            'luminosity_distance': [],
+            'dm': [],
+            'angular_diameter_distance': [],
+        }
+
+    galactic = ap_coord.SkyCoord(ra, dec, unit="deg").galactic
+
+    z = np.array([np.nan if z is None else z for z in redshift], dtype=float)
+    cz = z * 2.99e5
+    # same Hubble flow cuts as `Obj.luminosity_distance` and
+    # `Obj.angular_diameter_distance`
+    in_hubble_flow = np.nan_to_num(cz, nan=0.0) >= 350
+    beyond_hubble_flow_limit = np.nan_to_num(cz, nan=0.0) > 350
+
+    dl = np.full(n, np.nan)
+    dl[in_hubble_flow] = get_distance_table(cosmo).luminosity_distance(
+        z[in_hubble_flow]
+    )
+
+    # there may be a non-redshift based measurement of distance
+    # for nearby sources, which takes precedence
+    altdata_dl = [get_altdata_distance(a) for a in altdata]
+    has_altdata_dl = np.array([d is not None for d in altdata_dl])
+    dl[has_altdata_dl] = [d for d in altdata_dl if d is not None]
+    has_dl = np.isfinite(dl) | has_altdata_dl
+
+    nonzero_dl = has_dl & (dl != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dm = 5.0 * np.log10((dl * u.Mpc) / (10 * u.pc)).value
+        da = np.where(beyond_hubble_flow_limit, dl / (1 + z) ** 2, dl)
+
+    def to_list(values, mask):
+        return [float(v) if m else None for v, m in zip(values, mask)]
+
+    return {
+        'gal_lon': galactic.l.deg.tolist(),
+        'gal_lat': galactic.b.deg.tolist(),
+        'luminosity_distance': to_list(dl, has_dl),
+        'dm': to_list(dm, nonzero_dl),
+        'angular_diameter_distance': to_list(da, nonzero_dl),
+    }
+
+
+def get_derived_astro_fields(objs):
+    """Return the galactic coordinates and distances of a list of Objs,
+    computed all at once with `compute_derived_astro_fields`.
+
+    Parameters
+    ----------
+    objs : list of `skyportal.models.Obj`
+       The Objs to compute the fields of.
+
+    Returns
+    -------
+    fields : dict
+       Maps each Obj's id to a dict with the keys `gal_lon`, `gal_lat`,
+       `luminosity_distance`, `dm` and `angular_diameter_distance`.
+    """
+
+    columns = compute_derived_astro_fields(
+        [obj.ra for obj in objs],
+        [obj.dec for obj in objs],
+        [obj.redshift for obj in objs],
+        [obj.altdata for obj in objs],
+    )
+    return {
+        obj.id: {name: values[i] for name, values in columns.items()}
+        for i, obj in enumerate(objs)
+    }
+
+
 User.sources = relationship(
     'Obj',
     backref='users',
@@ -1419,6 +1716,114 @@ class SourceView(Base):
     )
 
 
+class SourceViewCount(Base):
+    """Number of SourceViews of an Obj in an hour or a day (UTC), kept up to
+    date as views are registered. The "Top Sources" widget sums these
+    buckets instead of counting the raw SourceViews. The counts can be
+    rebuilt from the SourceViews with `tools/rebuild_source_view_counts.py`.
+    """
+
+    GRANULARITIES = ('hour', 'day')
+
+    obj_id = sa.Column(
+        sa.ForeignKey('objs.id', ondelete='CASCADE'),
+        nullable=False,
+        doc="ID of the viewed Obj.",
+    )
+    granularity = sa.Column(
+        sa.String,
+        nullable=False,
+        doc="Length of the bucket, one of `GRANULARITIES`.",
+    )
+    bucket = sa.Column(
+        sa.DateTime,
+        nullable=False,
+        doc="UTC start of the hour or day.",
+    )
+    views = sa.Column(
+        sa.Integer,
+        nullable=False,
+        doc="Number of views of the Obj in the bucket.",
+    )
+
+    @classmethod
+    def record(cls, obj_id, viewed_at, views=1):
+        """Add views of an Obj made at a given UTC time to the hourly and
+        daily buckets containing it."""
+        DBSession().execute(
+            sa.text(
+                f"""
+                INSERT INTO {cls.__tablename__} (
+                    created_at, modified, obj_id, granularity, bucket, views
+                )
+                SELECT
+                    timezone('utc', now()),
+                    timezone('utc', now()),
+                    :obj_id,
+                    granularity,
+                    date_trunc(granularity, :viewed_at),
+                    :views
+                FROM unnest(CAST(:granularities AS TEXT[])) AS granularity
+                ON CONFLICT (granularity, bucket, obj_id) DO UPDATE
+                SET views = {cls.__tablename__}.views + EXCLUDED.views,
+                    modified = EXCLUDED.modified
+                """
+            ),
+            {
+                'obj_id': obj_id,
+                'viewed_at': viewed_at,
+                'views': views,
+                'granularities': list(cls.GRANULARITIES),
+            },
+        )
+
+    @classmethod
+    def rebuild(cls):
+        """Rebuild all the counts from the SourceViews."""
+        cls.query.delete(synchronize_session=False)
+        DBSession().execute(
+            sa.text(
+                f"""
+                INSERT INTO {cls.__tablename__} (
+                    created_at, modified, obj_id, granularity, bucket, views
+                )
+                SELECT
+                    timezone('utc', now()),
+                    timezone('utc', now()),
+                    sv.obj_id,
+                    granularity,
+                    date_trunc(granularity, sv.created_at),
+                    count(*)
+                FROM {SourceView.__tablename__} AS sv
+                CROSS JOIN unnest(CAST(:granularities AS TEXT[])) AS granularity
+                GROUP BY 3, 4, 5
+                """
+            ),
+            {'granularities': list(cls.GRANULARITIES)},
+        )
+
+    @classmethod
+    def prune(cls, cutoff):
+        """Delete the SourceViews made before a UTC time, and the counts of the
+        buckets starting before it."""
+        n_deleted = SourceView.query.filter(SourceView.created_at < cutoff).delete(
+            synchronize_session=False
+        )
+        cls.query.filter(cls.bucket < cutoff).delete(synchronize_session=False)
+        return n_deleted
+
+
+SourceViewCount.__table_args__ = (
+    sa.Index(
+        "sourceviewcounts_main_index",
+        SourceViewCount.granularity,
+        SourceViewCount.bucket,
+        SourceViewCount.obj_id,
+        unique=True,
+    ),
+)
+
+
 class Telescope(Base):
     """A ground or space-based observational facility that can host Instruments."""
 
@@ -1814,11 +2219,7 @@ def get_taxonomy_usable_by_user(taxonomy_id, user_or_token):
 
     return (
         Taxonomy.query.filter(Taxonomy.id == taxonomy_id)
-        .filter(
-            Taxonomy.groups.any(
-                Group.id.in_([g.id for g in user_or_token.accessible_groups])
-            )
-        )
+        .filter(Taxonomy.groups.any(Group.id.in_(user_or_token.accessible_group_ids)))
         .all()
     )
 
@@ -1826,6 +2227,86 @@ def get_taxonomy_usable_by_user(taxonomy_id, user_or_token):
 Taxonomy.get_taxonomy_usable_by_user = get_taxonomy_usable_by_user
 
 
+def add_group_ids_column(cls, join_model_cls, foreign_key):
+    """Add to a model shared with Groups through a join table a `group_ids`
+    column holding a sorted copy of the IDs of these Groups, so that access
+    checks can be a single overlap test on the model's own rows
+    (`cls.group_ids.overlap(group_ids)`) rather than a join. The column has
+    a GIN index, and is kept in sync with the join table by statement-level
+    triggers on the join table, so that Core bulk inserts into it are
+    covered as well. The triggers are created along with the join table,
+    and by the alembic migration for existing databases.
+
+    Parameters
+    ----------
+    cls : `skyportal.models.Base` subclass
+       The model, e.g., `Photometry`.
+    join_model_cls : `skyportal.models.Base` subclass
+       The model of the join table mapping Groups to `cls`, as returned by
+       `join_model`.
+    foreign_key : str
+       The column of the join table holding the ID of the `cls` row.
+    """
+    table = cls.__tablename__
+    join_table = join_model_cls.__tablename__
+
+    cls.group_ids = sa.Column(
+        psql.ARRAY(sa.Integer),
+        nullable=False,
+        server_default='{}',
+        doc=f"IDs of the Groups the row is shared with (copy of {join_table}).",
+    )
+    sa.Index(f'{table}_group_ids_index', cls.group_ids, postgresql_using='gin')
+
+    def sync(changed_ids):
+        return f"""
+        UPDATE {table} SET group_ids = ARRAY(
+            SELECT j.group_id FROM {join_table} AS j
+            WHERE j.{foreign_key} = {table}.id
+            ORDER BY j.group_id
+        )
+        WHERE {table}.id IN ({changed_ids});
+        """
+
+    new_ids = f'SELECT new_rows.{foreign_key} FROM new_rows'
+    old_ids = f'SELECT old_rows.{foreign_key} FROM old_rows'
+    # an UPDATE of the join table may move rows from a row of `table` to
+    # another, so both the old and the new rows are resynced
+    transitions = {
+        'INSERT': 'NEW TABLE AS new_rows',
+        'UPDATE': 'NEW TABLE AS new_rows OLD TABLE AS old_rows',
+        'DELETE': 'OLD TABLE AS old_rows',
+    }
+    triggers = [
+        f"""
+        CREATE TRIGGER {join_table}_{operation.lower()}_group_ids
+        AFTER {operation} ON {join_table}
+        REFERENCING {transition}
+        FOR EACH STATEMENT EXECUTE PROCEDURE {join_table}_sync_group_ids();
+        """
+        for operation, transition in transitions.items()
+    ]
+    event.listen(
+        join_model_cls.__table__,
+        'after_create',
+        sa.DDL(
+            f"""
+            CREATE OR REPLACE FUNCTION {join_table}_sync_group_ids()
+            RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN {sync(new_ids)}
+                ELSIF TG_OP = 'DELETE' THEN {sync(old_ids)}
+                ELSE {sync(f'{new_ids} UNION {old_ids}')}
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """
+            + "".join(triggers)
+        ),
+    )
+
+
 class Comment(Base):
     """A comment made by a User or a Robot (via the API) on a Source."""
 
@@ -1891,6 +2372,7 @@ class Comment(Base):
 
 GroupComment = join_model("group_comments", Group, Comment)
 GroupComment.__doc__ = "Join table mapping Groups to Comments."
+add_group_ids_column(Comment, GroupComment, 'comment_id')
 
 User.comments = relationship("Comment", back_populates="author")
 
@@ -1964,10 +2446,227 @@ class Annotation(Base):
 
 GroupAnnotation = join_model("group_annotations", Group, Annotation)
 GroupAnnotation.__doc__ = "Join table mapping Groups to Annotation."
+add_group_ids_column(Annotation, GroupAnnotation, 'annotation_id')
 
 User.annotations = relationship("Annotation", back_populates="author")
 
 
+class AnnotationValue(Base):
+    """A top-level key/value pair of the data of an Annotation, copied into
+    typed columns so that Objs can be filtered and sorted on their annotation
+    values with index range scans. The rows of an Annotation are rewritten by
+    the annotation API handlers whenever it is posted or updated, deleted
+    along with it, and can be rebuilt from scratch with
+    `tools/backfill_annotation_values.py`."""
+
+    # Longer text values are not projected, as they would not fit in an index
+    # entry; filters on them fall back to the Annotation data.
+    MAX_TEXT_BYTES = 1024
+
+    annotation_id = sa.Column(
+        sa.ForeignKey('annotations.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True,
+        doc="ID of the Annotation the value belongs to.",
+    )
+    obj_id = sa.Column(
+        sa.ForeignKey('objs.id', ondelete='CASCADE'),
+        nullable=False,
+        doc="ID of the Annotation's Obj.",
+    )
+    origin = sa.Column(sa.String, nullable=False, doc="The Annotation's origin.")
+    key = sa.Column(
+        sa.String, nullable=False, doc="Key of the value in the Annotation's data."
+    )
+    value_type = sa.Column(
+        sa.String,
+        nullable=False,
+        doc="JSON type of the value, as returned by `jsonb_typeof`.",
+    )
+    numeric_value = sa.Column(
+        sa.Float, nullable=True, doc="The value, if it is a number."
+    )
+    text_value = sa.Column(
+        sa.String,
+        nullable=True,
+        doc=(
+            "Text representation of the value (as returned by the `->>` "
+            "operator), if it is a string, number or boolean of at most "
+            "`MAX_TEXT_BYTES` bytes."
+        ),
+    )
+
+    @classmethod
+    def refresh(cls, annotation_ids):
+        """Rewrite the values of a list of Annotations from their data."""
+        annotation_ids = list(annotation_ids)
+        if len(annotation_ids) == 0:
+            return
+        cls.query.filter(cls.annotation_id.in_(annotation_ids)).delete(
+            synchronize_session=False
+        )
+        DBSession().execute(
+            sa.text(
+                f"""
+                INSERT INTO {cls.__tablename__} (
+                    created_at, modified, annotation_id, obj_id, origin, key,
+                    value_type, numeric_value, text_value
+                )
+                SELECT
+                    timezone('utc', now()),
+                    timezone('utc', now()),
+                    annotations.id,
+                    annotations.obj_id,
+                    annotations.origin,
+                    data.key,
+                    jsonb_typeof(data.value),
+                    CASE WHEN jsonb_typeof(data.value) = 'number'
+                        THEN CAST(data.value #>> '{{}}' AS double precision)
+                    END,
+                    CASE WHEN jsonb_typeof(data.value) IN ('string', 'number', 'boolean')
+                        AND octet_length(data.value #>> '{{}}') <= :max_text_bytes
+                        THEN data.value #>> '{{}}'
+                    END
+                FROM annotations, jsonb_each(annotations.data) AS data
+                WHERE annotations.id = ANY(:annotation_ids)
+                AND jsonb_typeof(annotations.data) = 'object'
+                """
+            ),
+            {'annotation_ids': annotation_ids, 'max_text_bytes': cls.MAX_TEXT_BYTES},
+        )
+
+
+AnnotationValue.__table_args__ = (
+    sa.Index(
+        "annotationvalues_numeric_index",
+        AnnotationValue.origin,
+        AnnotationValue.key,
+        AnnotationValue.numeric_value,
+        AnnotationValue.obj_id,
+    ),
+    sa.Index(
+        "annotationvalues_text_index",
+        AnnotationValue.origin,
+        AnnotationValue.key,
+        AnnotationValue.text_value,
+        AnnotationValue.obj_id,
+    ),
+)
+
+
+class AnnotationKey(Base):
+    """An origin, key and value type found in the data of the Annotations
+    shared with a Group. This catalog lists the annotation fields that the
+    candidates can be filtered on, without scanning the annotations. It is
+    updated by the annotation API handlers, and can be rebuilt from scratch
+    with `tools/rebuild_annotation_keys.py`."""
+
+    group_id = sa.Column(
+        sa.ForeignKey('groups.id', ondelete='CASCADE'),
+        nullable=False,
+        doc="ID of the Group the Annotations are shared with.",
+    )
+    origin = sa.Column(sa.String, nullable=False, doc="The Annotations' origin.")
+    key = sa.Column(
+        sa.String, nullable=False, doc="Key of the value in the Annotations' data."
+    )
+    value_type = sa.Column(
+        sa.String,
+        nullable=False,
+        doc="JSON type of the value, as returned by `jsonb_typeof`.",
+    )
+
+    @classmethod
+    def add(cls, annotation_ids):
+        """Add the origins, keys and value types of a list of Annotations
+        (as projected into AnnotationValue) to the catalog."""
+        annotation_ids = list(annotation_ids)
+        if len(annotation_ids) == 0:
+            return
+        DBSession().execute(
+            sa.text(
+                f"""
+                INSERT INTO {cls.__tablename__} (
+                    created_at, modified, group_id, origin, key, value_type
+                )
+                SELECT DISTINCT
+                    timezone('utc', now()),
+                    timezone('utc', now()),
+                    ga.group_id,
+                    av.origin,
+                    av.key,
+                    av.value_type
+                FROM {AnnotationValue.__tablename__} AS av
+                JOIN group_annotations AS ga ON ga.annotation_id = av.annotation_id
+                WHERE av.annotation_id = ANY(:annotation_ids)
+                ON CONFLICT DO NOTHING
+                """
+            ),
+            {'annotation_ids': annotation_ids},
+        )
+
+    @classmethod
+    def prune(cls, origins):
+        """Remove the entries of a list of origins that no Annotation has
+        anymore, e.g., after Annotations were updated or deleted."""
+        origins = list(origins)
+        if len(origins) == 0:
+            return
+        DBSession().execute(
+            sa.text(
+                f"""
+                DELETE FROM {cls.__tablename__} AS entry
+                WHERE entry.origin = ANY(:origins)
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM {AnnotationValue.__tablename__} AS av
+                    JOIN group_annotations AS ga ON ga.annotation_id = av.annotation_id
+                    WHERE av.origin = entry.origin
+                    AND av.key = entry.key
+                    AND av.value_type = entry.value_type
+                    AND ga.group_id = entry.group_id
+                )
+                """
+            ),
+            {'origins': origins},
+        )
+
+    @classmethod
+    def rebuild(cls):
+        """Rebuild the whole catalog from AnnotationValue."""
+        cls.query.delete(synchronize_session=False)
+        DBSession().execute(
+            sa.text(
+                f"""
+                INSERT INTO {cls.__tablename__} (
+                    created_at, modified, group_id, origin, key, value_type
+                )
+                SELECT DISTINCT
+                    timezone('utc', now()),
+                    timezone('utc', now()),
+                    ga.group_id,
+                    av.origin,
+                    av.key,
+                    av.value_type
+                FROM {AnnotationValue.__tablename__} AS av
+                JOIN group_annotations AS ga ON ga.annotation_id = av.annotation_id
+                """
+            )
+        )
+
+
+AnnotationKey.__table_args__ = (
+    sa.Index(
+        "annotationkeys_main_index",
+        AnnotationKey.group_id,
+        AnnotationKey.origin,
+        AnnotationKey.key,
+        AnnotationKey.value_type,
+        unique=True,
+    ),
+)
+
+
 class Classification(Base):
     """Classification of an Obj."""
 
@@ -2021,6 +2720,7 @@ class Classification(Base):
 
 GroupClassifications = join_model("group_classifications", Group, Classification)
 GroupClassifications.__doc__ = "Join table mapping Groups to Classifications."
+add_group_ids_column(Classification, GroupClassifications, 'classification_id')
 
 
 class Photometry(Base, ha.Point):
@@ -2238,6 +2938,217 @@ User.photometry = relationship(
 
 GroupPhotometry = join_model("group_photometry", Group, Photometry)
 GroupPhotometry.__doc__ = "Join table mapping Groups to Photometry."
+add_group_ids_column(Photometry, GroupPhotometry, 'photometr_id')
+
+
+def summarize_photometry(obj_ids, mjds, fluxes, fluxerrs, filters):
+    """Reduce a set of photometry points to per-Obj summary statistics.
+
+    Parameters
+    ----------
+    obj_ids, mjds, fluxes, fluxerrs, filters : array-like
+       The obj_id, MJD, flux [µJy], flux error [µJy] and filter of each point.
+
+    Returns
+    -------
+    summaries : dict
+       Maps each obj_id to a dict with the keys `num_obs`,
+       `num_det_per_filter`, `last_detected_mjd`, `last_detected_mag`,
+       `peak_detected_mjd` and `peak_detected_mag`.
+    """
+
+    df = pd.DataFrame(
+        {
+            'obj_id': obj_ids,
+            'mjd': np.asarray(mjds, dtype=float),
+            'flux': np.asarray(fluxes, dtype=float),
+            'fluxerr': np.asarray(fluxerrs, dtype=float),
+            'filter': filters,
+        }
+    )
+
+    # same definition of a detection as `Photometry.snr`
+    with np.errstate(divide='ignore', invalid='ignore'):
+        snr = df['flux'] / df['fluxerr']
+    detected = (df['fluxerr'] != 0) & (snr > PHOT_DETECTION_THRESHOLD)
+    det = df[detected]
+
+    summaries = {
+        obj_id: {
+            'num_obs': int(num_obs),
+            'num_det_per_filter': {},
+            'last_detected_mjd': None,
+            'last_detected_mag': None,
+            'peak_detected_mjd': None,
+            'peak_detected_mag': None,
+        }
+        for obj_id, num_obs in df.groupby('obj_id').size().items()
+    }
+
+    for (obj_id, filt), num_det in det.groupby(['obj_id', 'filter']).size().items():
+        summaries[obj_id]['num_det_per_filter'][filt] = int(num_det)
+
+    # use the same arithmetic as `Photometry.mag` so that the summarized
+    # magnitudes are identical to the per-point ones
+    def mag(flux):
+        return -2.5 * np.log10(flux) + PHOT_ZP if flux > 0 else None
+
+    last = det.sort_values('mjd', kind='mergesort').groupby('obj_id').tail(1)
+    for obj_id, mjd, flux in zip(last['obj_id'], last['mjd'], last['flux']):
+        summaries[obj_id]['last_detected_mjd'] = float(mjd)
+        summaries[obj_id]['last_detected_mag'] = mag(float(flux))
+
+    # the peak magnitude is the largest one, i.e. the one with the lowest flux
+    peak = det.sort_values(['flux', 'mjd'], kind='mergesort').groupby('obj_id').head(1)
+    for obj_id, mjd, flux in zip(peak['obj_id'], peak['mjd'], peak['flux']):
+        summaries[obj_id]['peak_detected_mjd'] = float(mjd)
+        summaries[obj_id]['peak_detected_mag'] = mag(float(flux))
+
+    return summaries
+
+
+class PhotStat(Base):
+    """Summary statistics of the Photometry of an Obj, used for fast filtering
+    and sorting of Objs on their detections. The statistics are updated by the
+    photometry API handlers whenever Photometry is added or removed, and can be
+    rebuilt from scratch with `tools/backfill_phot_stats.py`."""
+
+    obj_id = sa.Column(
+        sa.ForeignKey('objs.id', ondelete='CASCADE'),
+        nullable=False,
+        unique=True,
+        index=True,
+        doc="ID of the Obj these statistics describe.",
+    )
+    obj = relationship('Obj', back_populates='photstat', doc="The PhotStat's Obj.")
+    num_obs = sa.Column(
+        sa.Integer,
+        nullable=False,
+        server_default='0',
+        doc="Number of Photometry points of the Obj.",
+    )
+    num_det_per_filter = sa.Column(
+        JSONB,
+        nullable=False,
+        server_default='{}',
+        doc="Number of detections of the Obj above :math:`S/N = phot_detection_threshold` per filter.",
+    )
+    last_detected_mjd = sa.Column(
+        sa.Float,
+        nullable=True,
+        index=True,
+        doc="MJD at which the Obj was last detected.",
+    )
+    last_detected_mag = sa.Column(
+        sa.Float,
+        nullable=True,
+        index=True,
+        doc="Magnitude [AB] at which the Obj was last detected.",
+    )
+    peak_detected_mjd = sa.Column(
+        sa.Float,
+        nullable=True,
+        index=True,
+        doc="MJD at which the Obj was detected at peak magnitude.",
+    )
+    peak_detected_mag = sa.Column(
+        sa.Float,
+        nullable=True,
+        index=True,
+        doc="Peak magnitude [AB] at which the Obj was detected.",
+    )
+
+    @classmethod
+    def lock(cls, obj_ids):
+        """Return the PhotStats of a list of Objs, creating those that do not
+        exist yet. The rows are locked until the end of the transaction, so
+        that concurrent uploads for the same Obj are merged one at a time."""
+        obj_ids = sorted(set(obj_ids))
+        if len(obj_ids) == 0:
+            return []
+        DBSession().execute(
+            psql.insert(cls.__table__).on_conflict_do_nothing(
+                index_elements=['obj_id']
+            ),
+            [{'obj_id': obj_id} for obj_id in obj_ids],
+        )
+        return (
+            cls.query.filter(cls.obj_id.in_(obj_ids))
+            .order_by(cls.obj_id)
+            .with_for_update()
+            .populate_existing()
+            .all()
+        )
+
+    def merge(self, summary):
+        """Fold the summary of a set of new photometry points of this Obj (as
+        returned by `summarize_photometry`) into these statistics."""
+        self.num_obs = (self.num_obs or 0) + summary['num_obs']
+        num_det_per_filter = dict(self.num_det_per_filter or {})
+        for filt, num_det in summary['num_det_per_filter'].items():
+            num_det_per_filter[filt] = num_det_per_filter.get(filt, 0) + num_det
+        self.num_det_per_filter = num_det_per_filter
+
+        if summary['last_detected_mjd'] is not None and (
+            self.last_detected_mjd is None
+            or summary['last_detected_mjd'] > self.last_detected_mjd
+        ):
+            self.last_detected_mjd = summary['last_detected_mjd']
+            self.last_detected_mag = summary['last_detected_mag']
+
+        if summary['peak_detected_mag'] is not None and (
+            self.peak_detected_mag is None
+            or summary['peak_detected_mag'] > self.peak_detected_mag
+            or (
+                summary['peak_detected_mag'] == self.peak_detected_mag
+                and summary['peak_detected_mjd'] < self.peak_detected_mjd
+            )
+        ):
+            self.peak_detected_mjd = summary['peak_detected_mjd']
+            self.peak_detected_mag = summary['peak_detected_mag']
+
+    def reset(self):
+        """Reset these statistics to those of an Obj without photometry."""
+        self.num_obs = 0
+        self.num_det_per_filter = {}
+        self.last_detected_mjd = None
+        self.last_detected_mag = None
+        self.peak_detected_mjd = None
+        self.peak_detected_mag = None
+
+    @classmethod
+    def add_photometry(cls, obj_ids, mjds, fluxes, fluxerrs, filters):
+        """Incrementally update the statistics of the Objs of a set of newly
+        inserted photometry points, without re-reading their existing
+        photometry. See `summarize_photometry` for the parameters."""
+        summaries = summarize_photometry(obj_ids, mjds, fluxes, fluxerrs, filters)
+        for photstat in cls.lock(summaries):
+            photstat.merge(summaries[photstat.obj_id])
+
+    @classmethod
+    def recompute(cls, obj_ids):
+        """Recompute the statistics of a list of Objs from all of their
+        photometry, e.g., after some of it was modified or deleted."""
+        photstats = cls.lock(obj_ids)
+        if len(photstats) == 0:
+            return
+        points = (
+            DBSession()
+            .query(
+                Photometry.obj_id,
+                Photometry.mjd,
+                Photometry.flux,
+                Photometry.fluxerr,
+                Photometry.filter,
+            )
+            .filter(Photometry.obj_id.in_([p.obj_id for p in photstats]))
+            .all()
+        )
+        summaries = summarize_photometry(*zip(*points)) if points else {}
+        for photstat in photstats:
+            photstat.reset()
+            if photstat.obj_id in summaries:
+                photstat.merge(summaries[photstat.obj_id])
 
 
 class Spectrum(Base):
@@ -2518,6 +3429,7 @@ SpectrumObserver = join_model("spectrum_observers", Spectrum, User)
 
 GroupSpectrum = join_model("group_spectra", Group, Spectrum)
 GroupSpectrum.__doc__ = 'Join table mapping Groups to Spectra.'
+add_group_ids_column(Spectrum, GroupSpectrum, 'spectr_id')
 
 
 # def format_public_url(context):
@@ -2624,7 +3536,7 @@ class FollowupRequest(Base):
            accessible to the given user or token.
         """
 
-        user_or_token_group_ids = [g.id for g in user_or_token.accessible_groups]
+        user_or_token_group_ids = user_or_token.accessible_group_ids
         return self.allocation.group_id in user_or_token_group_ids
 
 
@@ -3021,12 +3933,259 @@ StreamInvitation = join_model('stream_invitations', Stream, Invitation)
 UserInvitation = join_model("user_invitations", User, Invitation)
 
 
-@event.listens_for(Invitation, 'after_insert')
-def send_user_invite_email(mapper, connection, target):
+BACKGROUND_TASKS = {}
+
+
+def background_task(func):
+    """Register a function as a background task, so that calls to it can be
+    queued with `BackgroundTask.enqueue` and run by the task queue workers.
+
+    The function is called with the JSON-serializable keyword arguments
+    passed to `enqueue`. Its database changes are committed along with the
+    status of the task, and rolled back if it raises. As failed tasks are
+    retried, a task may run more than once.
+    """
+    BACKGROUND_TASKS[func.__name__] = func
+    return func
+
+
+class BackgroundTask(Base):
+    """A queued call to a function registered with `background_task`.
+
+    Slow side effects of API writes (sending emails, text messages, ...) are
+    queued as BackgroundTasks in the transaction of the write, and run by
+    the workers of the `task_queue` service rather than while handling the
+    request. Workers claim tasks with `SELECT ... FOR UPDATE SKIP LOCKED`,
+    so that several of them can share the queue. Failed tasks are retried
+    with exponential backoff.
+    """
+
+    STATUSES = ('pending', 'running', 'succeeded', 'failed')
+
+    name = sa.Column(
+        sa.String,
+        nullable=False,
+        doc="Name of the function, as registered with `background_task`.",
+    )
+    kwargs = sa.Column(
+        JSONB, nullable=False, doc="Keyword arguments of the function call."
+    )
+    status = sa.Column(
+        sa.String, nullable=False, doc="Status of the task, one of `STATUSES`."
+    )
+    run_at = sa.Column(
+        sa.DateTime,
+        nullable=False,
+        doc="UTC time after which the pending task may be run (or retried).",
+    )
+    started_at = sa.Column(
+        sa.DateTime, nullable=True, doc="UTC time the last attempt started."
+    )
+    attempts = sa.Column(
+        sa.Integer, nullable=False, doc="Number of attempts to run the task."
+    )
+    error = sa.Column(
+        sa.String, nullable=True, doc="Traceback of the last failed attempt."
+    )
+
+    @classmethod
+    def enqueue(cls, name, connection=None, **kwargs):
+        """Queue a call to a background task. The task is inserted in the
+        current transaction, so that it only runs once that transaction is
+        committed.
+
+        Parameters
+        ----------
+        name : str
+            Name of the function, as registered with `background_task`.
+        connection : `sqlalchemy.engine.Connection`, optional
+            Connection to insert the task with, for use in mapper event
+            listeners, where the session cannot be used. Defaults to the
+            connection of `DBSession`.
+        **kwargs
+            JSON-serializable keyword arguments of the function call.
+
+        Returns
+        -------
+        task_id : int
+            The ID of the queued BackgroundTask.
+        """
+        if name not in BACKGROUND_TASKS:
+            raise ValueError(f'Unknown background task: {name}')
+        insert = (
+            cls.__table__.insert()
+            .values(
+                name=name,
+                kwargs=kwargs,
+                status='pending',
+                run_at=datetime.utcnow(),
+                attempts=0,
+            )
+            .returning(cls.id)
+        )
+        if connection is None:
+            connection = DBSession()
+        return connection.execute(insert).scalar()
+
+    @classmethod
+    def claim(cls, max_attempts, timeout):
+        """Mark the next due task as running, and return it.
+
+        Only the tasks registered in this process are claimed. Tasks still
+        running after `timeout` seconds are assumed to have lost their
+        worker, and are claimed again, unless this was their last attempt:
+        as they may have crashed or hung the worker themselves, they are then
+        marked as failed.
+
+        Parameters
+        ----------
+        max_attempts : int
+            Number of attempts after which a task that lost its worker is
+            marked as failed.
+        timeout : float
+            Time (s) after which a running task may be claimed again.
+
+        Returns
+        -------
+        task : `sqlalchemy.engine.RowProxy` or None
+            The `id`, `name`, `kwargs` and `attempts` of the task, or None if
+            no task is due.
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=timeout)
+        names = list(BACKGROUND_TASKS)
+        DBSession().execute(
+            cls.__table__.update()
+            .where(cls.name.in_(names))
+            .where(cls.status == 'running')
+            .where(cls.started_at < stale)
+            .where(cls.attempts >= max_attempts)
+            .values(
+                status='failed',
+                modified=now,
+                error=f'Still running after {timeout} s on attempt {max_attempts}; '
+                'its worker was presumably lost.',
+            )
+        )
+        result = DBSession().execute(
+            sa.text(
+                f"""
+                UPDATE {cls.__tablename__}
+                SET status = 'running',
+                    attempts = attempts + 1,
+                    started_at = :now,
+                    modified = :now
+                WHERE id = (
+                    SELECT id FROM {cls.__tablename__}
+                    WHERE name = ANY(:names)
+                    AND (
+                        (status = 'pending' AND run_at <= :now)
+                        OR (
+                            status = 'running'
+                            AND started_at < :stale
+                            AND attempts < :max_attempts
+                        )
+                    )
+                    ORDER BY run_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, name, kwargs, attempts
+                """
+            ),
+            {
+                'now': now,
+                'stale': stale,
+                'max_attempts': max_attempts,
+                'names': names,
+            },
+        )
+        task = result.first()
+        DBSession().commit()
+        return task
+
+    @classmethod
+    def run_next(cls, max_attempts, retry_backoff, timeout):
+        """Claim and run the next due task.
+
+        Parameters
+        ----------
+        max_attempts : int
+            Number of attempts after which a failing task is marked as
+            failed.
+        retry_backoff : float
+            Delay (s) before the first retry of a failing task, doubled for
+            each later one.
+        timeout : float
+            Time (s) after which a running task may be claimed again.
+
+        Returns
+        -------
+        task : `skyportal.models.BackgroundTask` or None
+            The task that was run, with its new status (`succeeded`, `failed`,
+            or `pending` if it is to be retried), or None if no task was due.
+        """
+        task = cls.claim(max_attempts, timeout)
+        if task is None:
+            return None
+
+        try:
+            BACKGROUND_TASKS[task.name](**task.kwargs)
+        except Exception:
+            DBSession().rollback()
+            if task.attempts >= max_attempts:
+                values = {'status': 'failed'}
+            else:
+                delay = retry_backoff * 2 ** (task.attempts - 1)
+                values = {
+                    'status': 'pending',
+                    'run_at': datetime.utcnow() + timedelta(seconds=delay),
+                }
+            values['error'] = traceback.format_exc()
+        else:
+            values = {'status': 'succeeded', 'error': None}
+
+        DBSession().execute(
+            cls.__table__.update().where(cls.id == task.id).values(**values)
+        )
+        DBSession().commit()
+        return cls.query.get(task.id)
+
+    @classmethod
+    def prune(cls, succeeded_cutoff, failed_cutoff):
+        """Delete the tasks that succeeded before a UTC time, and those that
+        failed before another, and return their number."""
+        n_deleted = cls.query.filter(
+            sa.or_(
+                sa.and_(cls.status == 'succeeded', cls.modified < succeeded_cutoff),
+                sa.and_(cls.status == 'failed', cls.modified < failed_cutoff),
+            )
+        ).delete(synchronize_session=False)
+        return n_deleted
+
+
+# The queue of each worker: the pending tasks, and the running tasks that may
+# have lost their worker
+sa.Index(
+    'backgroundtasks_queue_index',
+    BackgroundTask.run_at,
+    postgresql_where=BackgroundTask.status.in_(['pending', 'running']),
+)
+sa.Index('backgroundtasks_status_index', BackgroundTask.status, BackgroundTask.name)
+
+
+@background_task
+def send_user_invite_email(invitation_id):
+    invitation = Invitation.query.get(invitation_id)
+    if invitation is None:
+        # the invitation was deleted before it could be sent
+        return
     app_base_url = get_app_base_url()
-    link_location = f'{app_base_url}/login/google-oauth2/?invite_token={target.token}'
+    link_location = (
+        f'{app_base_url}/login/google-oauth2/?invite_token={invitation.token}'
+    )
     send_email(
-        recipients=[target.user_email],
+        recipients=[invitation.user_email],
         subject=cfg["invitations.email_subject"],
         body=(
             f'{cfg["invitations.email_body_preamble"]}<br /><br />'
@@ -3035,6 +4194,13 @@ def send_user_invite_email(mapper, connection, target):
     )
 
 
+@event.listens_for(Invitation, 'after_insert')
+def queue_user_invite_email(mapper, connection, target):
+    BackgroundTask.enqueue(
+        'send_user_invite_email', connection=connection, invitation_id=target.id
+    )
+
+
 class SourceNotification(Base):
     groups = relationship(
         "Group",
@@ -3077,8 +4243,12 @@ User.source_notifications = relationship(
 )
 
 
-@event.listens_for(SourceNotification, 'after_insert')
-def send_source_notification(mapper, connection, target):
+@background_task
+def send_source_notification(source_notification_id):
+    target = SourceNotification.query.get(source_notification_id)
+    if target is None:
+        # the notification was deleted before it could be sent
+        return
     app_base_url = get_app_base_url()
 
     link_location = f'{app_base_url}/source/{target.source_id}'
@@ -3156,6 +4326,15 @@ def send_source_notification(mapper, connection, target):
         )
 
 
+@event.listens_for(SourceNotification, 'after_insert')
+def queue_source_notification(mapper, connection, target):
+    BackgroundTask.enqueue(
+        'send_source_notification',
+        connection=connection,
+        source_notification_id=target.id,
+    )
+
+
 @event.listens_for(User, 'after_insert')
 def create_single_user_group(mapper, connection, target):
 
@@ -3185,4 +4364,41 @@ def update_single_user_group(mapper, connection, target):
         DBSession().add(single_user_group)
 
 
+# Changes to these models may change what Users and Tokens have access to
+ACCESS_MODELS = (
+    Group,
+    GroupUser,
+    GroupStream,
+    Stream,
+    StreamUser,
+    Filter,
+    User,
+    Token,
+    UserACL,
+    UserRole,
+)
+
+
+@event.listens_for(DBSession, 'after_flush')
+def clear_memoized_accessible_ids(session, flush_context):
+    if any(
+        isinstance(instance, ACCESS_MODELS)
+        for instance in [*session.new, *session.dirty, *session.deleted]
+    ):
+        session.info.pop('accessible_ids', None)
+
+
+@event.listens_for(DBSession, 'after_bulk_update')
+@event.listens_for(DBSession, 'after_bulk_delete')
+def clear_memoized_accessible_ids_after_bulk(context):
+    if issubclass(context.mapper.class_, ACCESS_MODELS):
+        context.session.info.pop('accessible_ids', None)
+
+
+@event.listens_for(DBSession, 'after_commit')
+@event.listens_for(DBSession, 'after_rollback')
+def clear_memoized_accessible_ids_after_transaction(session):
+    session.info.pop('accessible_ids', None)
+
+
 schema.setup_schema()
@@ -23,13 +23,13 @@ from skyportal.models import (
     DBSession,
     Obj,
     Photometry,
-    Group,
     Instrument,
     Telescope,
     PHOT_ZP,
     Spectrum,
     GroupSpectrum,
 )
+from skyportal.utils.lightcurve import reduce_light_curve
 
 import sncosmo
 
@@ -154,19 +154,21 @@ def get_color(bandpass_name):
         return bandcolor
 
 
-def photometry_plot(obj_id, user, width=600, height=300):
-    """Create scatter plot of photometry for object.
+def get_photometry_data(obj_id, user):
+    """Load the photometry of an object visible to a user.
     Parameters
     ----------
     obj_id : str
-        ID of Obj to be plotted.
+        ID of Obj whose photometry should be loaded.
+    user : User or Token
+        The user (or token) requesting the data.
     Returns
     -------
-    (str, str)
-        Returns (docs_json, render_items) json for the desired plot.
+    pandas.DataFrame
+        One row per photometry point, with the telescope nickname and
+        instrument name.
     """
-
-    data = pd.read_sql(
+    return pd.read_sql(
         DBSession()
         .query(
             Photometry,
@@ -176,26 +178,33 @@ def photometry_plot(obj_id, user, width=600, height=300):
         .join(Instrument, Instrument.id == Photometry.instrument_id)
         .join(Telescope, Telescope.id == Instrument.telescope_id)
         .filter(Photometry.obj_id == obj_id)
-        .filter(
-            Photometry.groups.any(Group.id.in_([g.id for g in user.accessible_groups]))
-        )
+        .filter(Photometry.group_ids.overlap(user.accessible_group_ids))
         .statement,
         DBSession().bind,
     )
 
-    if data.empty:
-        return None, None, None
 
-    data['color'] = [get_color(f) for f in data['filter']]
-
-    labels = []
-    for i, datarow in data.iterrows():
-        label = f'{datarow["instrument"]}/{datarow["filter"]}'
-        if datarow['origin'] is not None:
-            label += f'/{datarow["origin"]}'
-        labels.append(label)
+def prepare_photometry_data(data):
+    """Compute the columns needed to plot a light curve.
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Photometry, as returned by `get_photometry_data` or reduced by
+        `reduce_photometry_data`.
+    Returns
+    -------
+    pandas.DataFrame
+        The photometry, with colors, legend labels, AB magnitudes and
+        limiting magnitudes added. Points that are not detections have no
+        magnitude (`None`).
+    """
+    colors = {f: get_color(f) for f in data['filter'].unique()}
+    data['color'] = data['filter'].map(colors)
 
-    data['label'] = labels
+    labels = data['instrument'] + '/' + data['filter']
+    data['label'] = labels.where(
+        data['origin'].isna(), labels + '/' + data['origin'].astype(str)
+    )
     data['zp'] = PHOT_ZP
     data['magsys'] = 'ab'
     data['alpha'] = 1.0
@@ -205,7 +214,8 @@ def photometry_plot(obj_id, user, width=600, height=300):
 
     # Passing a dictionary to a bokeh datasource causes the frontend to die,
     # deleting the dictionary column fixes that
-    del data['original_user_data']
+    if 'original_user_data' in data:
+        del data['original_user_data']
 
     # keep track of things that are only upper limits
     data['hasflux'] = ~data['flux'].isna()
@@ -213,20 +223,91 @@ def photometry_plot(obj_id, user, width=600, height=300):
     # calculate the magnitudes - a photometry point is considered "significant"
     # or "detected" (and thus can be represented by a magnitude) if its snr
     # is above PHOT_DETECTION_THRESHOLD
-    obsind = data['hasflux'] & (
-        data['flux'].fillna(0.0) / data['fluxerr'] >= PHOT_DETECTION_THRESHOLD
-    )
-    data.loc[~obsind, 'mag'] = None
-    data.loc[obsind, 'mag'] = -2.5 * np.log10(data[obsind]['flux']) + PHOT_ZP
+    flux = data['flux'].fillna(0.0).to_numpy()
+    fluxerr = data['fluxerr'].to_numpy()
+    obsind = data['hasflux'] & (flux / fluxerr >= PHOT_DETECTION_THRESHOLD)
+    detected = obsind.to_numpy()
+
+    # only detections have a positive flux, the rest are masked out below
+    safe_flux = np.where(detected, flux, 1.0)
+    data['mag'] = np.where(detected, -2.5 * np.log10(safe_flux) + PHOT_ZP, None)
 
     # calculate the magnitude errors using standard error propagation formulae
     # https://en.wikipedia.org/wiki/Propagation_of_uncertainty#Example_formulae
-    data.loc[~obsind, 'magerr'] = None
     coeff = 2.5 / np.log(10)
-    magerrs = np.abs(coeff * data[obsind]['fluxerr'] / data[obsind]['flux'])
-    data.loc[obsind, 'magerr'] = magerrs
+    data['magerr'] = np.where(detected, np.abs(coeff * fluxerr / safe_flux), None)
     data['obs'] = obsind
-    data['stacked'] = False
+
+    # light curves binned on the server have more than one point per bin
+    data['stacked'] = data['n_points'] > 1 if 'n_points' in data else False
+
+    return data
+
+
+def reduce_photometry_data(data, reduce, max_points, bin_size):
+    """Bin or downsample photometry, separately for each legend entry.
+    See `skyportal.utils.lightcurve.reduce_light_curve`.
+    """
+    return reduce_light_curve(
+        data,
+        reduce,
+        max_points=max_points,
+        bin_size=bin_size,
+        by=['instrument', 'filter', 'origin'],
+    )
+
+
+def get_errorbar_coordinates(x, y, err):
+    """Compute the vertical error bars of a set of points.
+    Parameters
+    ----------
+    x, y, err : array-like
+        Positions of the points and their (symmetric) errors along y.
+    Returns
+    -------
+    (list, list)
+        The x and y coordinates of each error bar, as passed to
+        `bokeh.plotting.Figure.multi_line`.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    err = np.asarray(err, dtype=float)
+    return (
+        np.column_stack((x, x)).tolist(),
+        np.column_stack((y - err, y + err)).tolist(),
+    )
+
+
+def photometry_plot(
+    obj_id, user, width=600, height=300, reduce=None, max_points=None, bin_size=None
+):
+    """Create scatter plot of photometry for object.
+    Parameters
+    ----------
+    obj_id : str
+        ID of Obj to be plotted.
+    reduce : str, optional
+        'bin' or 'downsample' to plot a reduced light curve, see
+        `reduce_photometry_data`.
+    max_points : int, optional
+        Number of points to keep when downsampling.
+    bin_size : float, optional
+        Width of the bins, in days, when binning.
+    Returns
+    -------
+    (str, str)
+        Returns (docs_json, render_items) json for the desired plot.
+    """
+
+    data = get_photometry_data(obj_id, user)
+
+    if data.empty:
+        return None, None, None
+
+    if reduce is not None:
+        data = reduce_photometry_data(data, reduce, max_points, bin_size)
+    data = prepare_photometry_data(data)
+    obsind = data['obs']
 
     split = data.groupby('label', sort=False)
 
@@ -292,16 +373,9 @@ def photometry_plot(obj_id, user, width=600, height=300):
         imhover.renderers.append(model_dict[key])
 
         key = 'obserr' + str(i)
-        y_err_x = []
-        y_err_y = []
-
-        for d, ro in df.iterrows():
-            px = ro['mjd']
-            py = ro['flux']
-            err = ro['fluxerr']
-
-            y_err_x.append((px, px))
-            y_err_y.append((py - err, py + err))
+        y_err_x, y_err_y = get_errorbar_coordinates(
+            df['mjd'], df['flux'], df['fluxerr']
+        )
 
         model_dict[key] = plot.multi_line(
             xs='xs',
@@ -534,16 +608,10 @@ def photometry_plot(obj_id, user, width=600, height=300):
         imhover.renderers.append(model_dict[key])
 
         key = 'obserr' + str(i)
-        y_err_x = []
-        y_err_y = []
-
-        for d, ro in df[df['obs']].iterrows():
-            px = ro['mjd']
-            py = ro['mag']
-            err = ro['magerr']
-
-            y_err_x.append((px, px))
-            y_err_y.append((py - err, py + err))
+        obs_df = df[df['obs']]
+        y_err_x, y_err_y = get_errorbar_coordinates(
+            obs_df['mjd'], obs_df['mag'], obs_df['magerr']
+        )
 
         model_dict[key] = plot.multi_line(
             xs='xs',
@@ -554,8 +622,8 @@ def photometry_plot(obj_id, user, width=600, height=300):
                 data=dict(
                     xs=y_err_x,
                     ys=y_err_y,
-                    color=df[df['obs']]['color'],
-                    alpha=[1.0] * len(df[df['obs']]),
+                    color=obs_df['color'],
+                    alpha=[1.0] * len(obs_df),
                 )
             ),
         )
@@ -700,7 +768,7 @@ def spectroscopy_plot(obj_id, user, spec_id=None, width=600, height=300):
         .join(GroupSpectrum)
         .filter(
             Spectrum.obj_id == obj_id,
-            GroupSpectrum.group_id.in_([g.id for g in user.accessible_groups]),
+            GroupSpectrum.group_id.in_(user.accessible_group_ids),
         )
     ).all()
 
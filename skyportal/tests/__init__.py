@@ -1,6 +1,10 @@
 import os
+import time
 import urllib.parse
+from contextlib import contextmanager
+
 import requests
+import sqlalchemy as sa
 
 from baselayer.app.env import load_env
 
@@ -57,3 +61,60 @@ def api(
                 return response.status_code, response.json()
         else:
             return response.status_code, None
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements emitted by the test process's database session.
+
+    Yields
+    ------
+    statements : list of str
+        Grows with every statement executed inside the `with` block, so that
+        `len(statements)` is the number of queries issued.
+    """
+    from skyportal.models import DBSession
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = DBSession().get_bind()
+    sa.event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        sa.event.remove(engine, 'before_cursor_execute', record)
+
+
+def run_background_task(task_id, timeout=10):
+    """Run the due background tasks until a given one has been attempted.
+
+    The task queue service of the test server may run the task instead, in
+    which case this waits for it to finish. Failed tasks are not retried
+    within `timeout`.
+
+    Parameters
+    ----------
+    task_id : int
+        ID of the `BackgroundTask`.
+    timeout : float
+        Time (s) after which to give up.
+
+    Returns
+    -------
+    task : `skyportal.models.BackgroundTask`
+        The task, once attempted.
+    """
+    from skyportal.models import DBSession, BackgroundTask
+
+    start = time.time()
+    while time.time() - start < timeout:
+        ran = BackgroundTask.run_next(max_attempts=5, retry_backoff=3600, timeout=600)
+        task = DBSession().query(BackgroundTask).populate_existing().get(task_id)
+        if task.attempts > 0 and task.status != 'running':
+            return task
+        if ran is None:
+            time.sleep(0.1)
+    raise TimeoutError(f'Background task {task_id} was not run')
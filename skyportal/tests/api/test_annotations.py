@@ -1,5 +1,6 @@
 import uuid
 from skyportal.tests import api
+from skyportal.models import DBSession, AnnotationValue
 
 
 def test_post_without_origin_fails(annotation_token, public_source, public_group):
@@ -277,3 +278,95 @@ def test_delete_annotation(annotation_token, public_source):
 
     status, data = api('GET', f'annotation/{annotation_id}', token=annotation_token)
     assert status == 400
+
+
+def test_annotation_values_follow_annotation(annotation_token, public_source):
+    def values(annotation_id):
+        DBSession().expire_all()
+        return {
+            v.key: (v.value_type, v.numeric_value, v.text_value)
+            for v in AnnotationValue.query.filter(
+                AnnotationValue.annotation_id == annotation_id
+            )
+        }
+
+    origin = str(uuid.uuid4())
+    status, data = api(
+        'POST',
+        'annotation',
+        data={
+            'obj_id': public_source.id,
+            'origin': origin,
+            'data': {
+                'offset_from_host_galaxy': 1.5,
+                'host': 'NGC 1234',
+                'nuclear': False,
+                'photoz': {'value': 0.1},
+            },
+        },
+        token=annotation_token,
+    )
+    assert status == 200
+    annotation_id = data['data']['annotation_id']
+
+    assert values(annotation_id) == {
+        'offset_from_host_galaxy': ('number', 1.5, '1.5'),
+        'host': ('string', None, 'NGC 1234'),
+        'nuclear': ('boolean', None, 'false'),
+        'photoz': ('object', None, None),
+    }
+
+    status, data = api(
+        'PUT',
+        f'annotation/{annotation_id}',
+        data={'data': {'offset_from_host_galaxy': 1.7}},
+        token=annotation_token,
+    )
+    assert status == 200
+    assert values(annotation_id) == {'offset_from_host_galaxy': ('number', 1.7, '1.7')}
+
+    status, data = api('DELETE', f'annotation/{annotation_id}', token=annotation_token)
+    assert status == 200
+    assert values(annotation_id) == {}
+
+
+def test_annotations_info_follows_annotations(annotation_token, public_source):
+    origin = str(uuid.uuid4())
+    status, data = api(
+        'POST',
+        'annotation',
+        data={
+            'obj_id': public_source.id,
+            'origin': origin,
+            'data': {'offset_from_host_galaxy': 1.5, 'host': 'NGC 1234'},
+        },
+        token=annotation_token,
+    )
+    assert status == 200
+    annotation_id = data['data']['annotation_id']
+
+    status, data = api('GET', 'internal/annotations_info', token=annotation_token)
+    assert status == 200
+    assert sorted(data['data'][origin], key=lambda field: list(field)) == [
+        {'host': 'string'},
+        {'offset_from_host_galaxy': 'number'},
+    ]
+
+    status, data = api(
+        'PUT',
+        f'annotation/{annotation_id}',
+        data={'data': {'offset_from_host_galaxy': 1.7}},
+        token=annotation_token,
+    )
+    assert status == 200
+
+    status, data = api('GET', 'internal/annotations_info', token=annotation_token)
+    assert status == 200
+    assert data['data'][origin] == [{'offset_from_host_galaxy': 'number'}]
+
+    status, data = api('DELETE', f'annotation/{annotation_id}', token=annotation_token)
+    assert status == 200
+
+    status, data = api('GET', 'internal/annotations_info', token=annotation_token)
+    assert status == 200
+    assert origin not in data['data']
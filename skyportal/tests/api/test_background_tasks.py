@@ -0,0 +1,156 @@
+import datetime
+
+import pytest
+
+from skyportal.tests import api, run_background_task
+from skyportal.models import DBSession, BackgroundTask, Comment, background_task
+
+
+# Only registered in the test process, so that the task queue service of the
+# test server does not claim these tasks
+@background_task
+def add_test_comment(obj_id, author_id, text, fail=False):
+    DBSession().add(Comment(obj_id=obj_id, author_id=author_id, text=text))
+    if fail:
+        raise RuntimeError('Test task failure')
+
+
+def test_background_task_runs_after_commit(public_source, user):
+    task_id = BackgroundTask.enqueue(
+        'add_test_comment', obj_id=public_source.id, author_id=user.id, text='test'
+    )
+    DBSession().commit()
+
+    task = run_background_task(task_id)
+    assert task.status == 'succeeded'
+    assert task.attempts == 1
+    assert task.error is None
+    assert [c.text for c in public_source.comments] == ['test']
+
+
+def test_failed_background_task_is_retried(public_source, user):
+    task_id = BackgroundTask.enqueue(
+        'add_test_comment',
+        obj_id=public_source.id,
+        author_id=user.id,
+        text='test',
+        fail=True,
+    )
+    DBSession().commit()
+
+    task = run_background_task(task_id)
+    assert task.status == 'pending'
+    assert task.attempts == 1
+    assert 'Test task failure' in task.error
+    assert task.run_at > datetime.datetime.utcnow()
+    # the changes of the failed attempt are rolled back
+    assert Comment.query.filter(Comment.obj_id == public_source.id).count() == 0
+
+    # the task is marked as failed after the last attempt
+    for attempt in range(2, 6):
+        task.run_at = datetime.datetime.utcnow()
+        DBSession().commit()
+        task = run_background_task(task_id)
+        assert task.attempts == attempt
+    assert task.status == 'failed'
+
+
+def test_background_task_that_lost_its_worker(public_source, user):
+    task_ids = [
+        BackgroundTask.enqueue(
+            'add_test_comment', obj_id=public_source.id, author_id=user.id, text=text
+        )
+        for text in ['retried', 'failed']
+    ]
+    DBSession().commit()
+
+    # tasks still running after the timeout are claimed again, unless that
+    # was their last attempt
+    for task_id, attempts in zip(task_ids, [1, 5]):
+        DBSession().execute(
+            BackgroundTask.__table__.update()
+            .where(BackgroundTask.id == task_id)
+            .values(
+                status='running',
+                started_at=datetime.datetime.utcnow() - datetime.timedelta(hours=1),
+                attempts=attempts,
+            )
+        )
+    DBSession().commit()
+
+    retried, failed = [run_background_task(task_id) for task_id in task_ids]
+    assert retried.status == 'succeeded'
+    assert retried.attempts == 2
+    assert failed.status == 'failed'
+    assert failed.attempts == 5
+    assert 'worker was presumably lost' in failed.error
+    assert [c.text for c in public_source.comments] == ['retried']
+
+
+def test_prune_background_tasks(public_source, user):
+    now = datetime.datetime.utcnow()
+    task_ids = {}
+    for status, days_ago in [
+        ('succeeded', 10),
+        ('succeeded', 1),
+        ('failed', 40),
+        ('failed', 10),
+    ]:
+        task_id = BackgroundTask.enqueue(
+            'add_test_comment', obj_id=public_source.id, author_id=user.id, text='test'
+        )
+        DBSession().execute(
+            BackgroundTask.__table__.update()
+            .where(BackgroundTask.id == task_id)
+            .values(status=status, modified=now - datetime.timedelta(days=days_ago))
+        )
+        task_ids[(status, days_ago)] = task_id
+    DBSession().commit()
+
+    BackgroundTask.prune(
+        now - datetime.timedelta(days=7), now - datetime.timedelta(days=30)
+    )
+    DBSession().commit()
+    remaining = {
+        id
+        for id, in DBSession()
+        .query(BackgroundTask.id)
+        .filter(BackgroundTask.id.in_(task_ids.values()))
+    }
+    assert remaining == {task_ids[('succeeded', 1)], task_ids[('failed', 10)]}
+
+
+def test_unknown_background_task_cannot_be_queued():
+    with pytest.raises(ValueError, match='Unknown background task'):
+        BackgroundTask.enqueue('not_a_task')
+
+
+def test_inspect_background_task_queue(
+    public_source, user, super_admin_token, view_only_token
+):
+    task_id = BackgroundTask.enqueue(
+        'add_test_comment',
+        obj_id=public_source.id,
+        author_id=user.id,
+        text='test',
+        fail=True,
+    )
+    DBSession().commit()
+    BackgroundTask.query.get(task_id).attempts = 4
+    DBSession().commit()
+    run_background_task(task_id)
+
+    status, data = api('GET', 'background_tasks', token=super_admin_token)
+    assert status == 200
+    assert data['data']['counts']['add_test_comment']['failed'] >= 1
+    task = next(t for t in data['data']['tasks'] if t['id'] == task_id)
+    assert task['status'] == 'failed'
+    assert 'Test task failure' in task['error']
+
+    status, data = api(
+        'GET', 'background_tasks', params={'status': 'done'}, token=super_admin_token
+    )
+    assert status == 400
+
+    status, data = api('GET', 'background_tasks', token=view_only_token)
+    assert status == 400
@@ -2,7 +2,10 @@ import datetime
 import numpy.testing as npt
 import uuid
 
-from skyportal.tests import api
+from skyportal.tests import api, count_queries
+from skyportal.tests.fixtures import ObjFactory
+from skyportal.models import DBSession, Candidate, Obj, Source
+from skyportal.handlers.api.candidate import get_candidate_list_info
 
 from tdtax import taxonomy, __version__
 
@@ -253,6 +256,42 @@ def test_candidate_list_sorting_basic(
     assert data["data"]["candidates"][1]["id"] == public_candidate2.id
 
 
+def test_candidate_list_default_order(
+    annotation_token, view_only_token, public_candidate, public_candidate2
+):
+    # several annotations per candidate must not duplicate the candidates
+    for origin in [str(uuid.uuid4()), str(uuid.uuid4())]:
+        for candidate in [public_candidate, public_candidate2]:
+            status, data = api(
+                "POST",
+                "annotation",
+                data={
+                    "obj_id": candidate.id,
+                    "origin": origin,
+                    "data": {"numeric_field": 1},
+                },
+                token=annotation_token,
+            )
+            assert status == 200
+
+    status, data = api(
+        "GET",
+        "candidates?numPerPage=100&includePhotometry=true",
+        token=view_only_token,
+    )
+    assert status == 200
+    candidates = data["data"]["candidates"]
+    ids = [c["id"] for c in candidates]
+    assert len(ids) == len(set(ids))
+    assert all("photometry" in c for c in candidates)
+
+    # most recently detected first, undetected candidates last
+    dates = [c["last_detected_at"] for c in candidates]
+    detected = [d for d in dates if d is not None]
+    assert dates[: len(detected)] == detected
+    assert detected == sorted(detected, reverse=True)
+
+
 def test_candidate_list_sorting_different_origins(
     annotation_token, view_only_token, public_candidate, public_candidate2
 ):
@@ -504,6 +543,49 @@ def test_candidate_list_filtering_string(
     assert data["data"]["candidates"][0]["id"] == public_candidate.id
 
 
+def test_candidate_list_filtering_several_origins(
+    annotation_token, view_only_token, public_candidate, public_candidate2
+):
+    origin = str(uuid.uuid4())
+    origin2 = str(uuid.uuid4())
+    for candidate, value in [(public_candidate, 1), (public_candidate2, 2)]:
+        for annotation_origin in [origin, origin2]:
+            status, data = api(
+                "POST",
+                "annotation",
+                data={
+                    "obj_id": candidate.id,
+                    "origin": annotation_origin,
+                    "data": {"numeric_field": value, "string_field": f"{value}"},
+                },
+                token=annotation_token,
+            )
+            assert status == 200
+
+    # Each filter may be satisfied by a different annotation of the candidate
+    filters = (
+        f'{{"origin":"{origin}","key":"numeric_field","min":1.5, "max":2.5}},'
+        f'{{"origin":"{origin2}","key":"string_field","value":"2"}}'
+    )
+    status, data = api(
+        "GET", f"candidates/?annotationFilterList={filters}", token=view_only_token
+    )
+    assert status == 200
+    assert [c["id"] for c in data["data"]["candidates"]] == [public_candidate2.id]
+
+    # Sorting on an annotation value does not duplicate the candidates
+    status, data = api(
+        "GET",
+        f"candidates/?sortByAnnotationOrigin={origin2}&sortByAnnotationKey=numeric_field"
+        "&sortByAnnotationOrder=desc",
+        token=view_only_token,
+    )
+    assert status == 200
+    ids = [c["id"] for c in data["data"]["candidates"]]
+    assert len(ids) == len(set(ids))
+    assert ids[:2] == [public_candidate2.id, public_candidate.id]
+
+
 def test_candidate_list_classifications(
     upload_data_token,
     taxonomy_token,
@@ -697,3 +779,81 @@ def test_exclude_by_outdated_annotations(
     assert num_candidates == len(
         data["data"]["candidates"]
     )  # should now have all the original candidates
+
+
+def test_candidate_list_cursor_pagination(
+    view_only_token, public_candidate, public_candidate2
+):
+    status, data = api(
+        "GET", "candidates?numPerPage=100&countMode=none", token=view_only_token
+    )
+    assert status == 200
+    assert data["data"]["totalMatches"] is None
+    expected_ids = [c["id"] for c in data["data"]["candidates"]]
+
+    ids = []
+    cursor = ""
+    while cursor is not None and len(ids) < len(expected_ids):
+        status, data = api(
+            "GET",
+            f"candidates?numPerPage=1&cursor={cursor}&countMode=estimate",
+            token=view_only_token,
+        )
+        assert status == 200
+        assert data["data"]["totalMatchesIsEstimate"]
+        assert isinstance(data["data"]["totalMatches"], int)
+        assert len(data["data"]["candidates"]) <= 1
+        ids += [c["id"] for c in data["data"]["candidates"]]
+        cursor = data["data"]["nextCursor"]
+
+    assert ids == expected_ids[: len(ids)]
+    assert len(ids) == len(expected_ids)
+
+    status, data = api(
+        "GET", "candidates?numPerPage=1&cursor=notacursor", token=view_only_token
+    )
+    assert status == 400
+    assert "Invalid cursor" in data["message"]
+
+    status, data = api(
+        "GET", "candidates?countMode=approximately", token=view_only_token
+    )
+    assert status == 400
+
+
+def test_candidate_list_query_count_independent_of_page_size(
+    user, public_group, public_filter
+):
+    obj_ids = []
+    for i in range(5):
+        obj = ObjFactory(groups=[public_group])
+        DBSession().add(
+            Candidate(
+                obj_id=obj.id,
+                filter_id=public_filter.id,
+                passed_at=datetime.datetime.utcnow(),
+                uploader_id=user.id,
+            )
+        )
+        if i % 2 == 0:
+            DBSession().add(Source(obj_id=obj.id, group_id=public_group.id))
+        obj_ids.append(obj.id)
+    DBSession().commit()
+    filter_ids = [public_filter.id]
+
+    def n_queries(page_obj_ids):
+        objs = DBSession().query(Obj).filter(Obj.id.in_(page_obj_ids)).all()
+        with count_queries() as statements:
+            candidate_list = get_candidate_list_info(objs, user, filter_ids)
+        assert len(candidate_list) == len(page_obj_ids)
+        for candidate in candidate_list:
+            assert candidate["passing_group_ids"] == [public_group.id]
+            assert len(candidate["comments"]) == 10
+            assert candidate["is_source"] == (obj_ids.index(candidate["id"]) % 2 == 0)
+            if candidate["is_source"]:
+                assert [g.id for g in candidate["saved_groups"]] == [public_group.id]
+        return len(statements)
+
+    # warm up the user's lazily loaded attributes (e.g., accessible groups)
+    n_queries(obj_ids[:1])
+    assert n_queries(obj_ids[:1]) == n_queries(obj_ids)
@@ -1,4 +1,7 @@
 from skyportal.tests import api
+from skyportal.tests.fixtures import CommentFactory
+from skyportal.handlers.api.internal import dashboard_cache
+from skyportal.utils.cache import TTLCache
 
 
 def test_add_and_retrieve_comment_group_id(comment_token, public_source, public_group):
@@ -247,3 +250,17 @@ def test_problematic_post_comment_attachment_1275(
     )
     assert status == 200
     assert data['status'] == 'success'
+
+
+def test_comment_invalidates_cached_news_feed(public_source, public_group, monkeypatch):
+    cache = TTLCache(ttl=60)
+    monkeypatch.setattr(dashboard_cache, 'dashboard_cache', cache)
+    cache[('news_feed', (public_group.id,), '')] = ['stale']
+    cache[('source_counts', (public_group.id,), '')] = 1
+
+    # committed through this process' session, which drops the widgets the
+    # new comment affects
+    CommentFactory(obj_id=public_source.id, groups=[public_group])
+
+    assert cache[('news_feed', (public_group.id,), '')] is None
+    assert cache[('source_counts', (public_group.id,), '')] == 1
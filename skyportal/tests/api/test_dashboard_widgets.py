@@ -0,0 +1,115 @@
+import datetime
+
+from skyportal.tests import api, count_queries
+from skyportal.tests.fixtures import ObjFactory
+from skyportal.models import DBSession, Source, SourceViewCount
+from skyportal.handlers.api.internal.recent_sources import get_recent_sources
+from skyportal.handlers.api.internal.source_views import get_top_sources
+
+
+def test_recent_sources_query_count_independent_of_num_sources(
+    user, public_group, public_group2
+):
+    obj_ids = []
+    for _ in range(5):
+        obj = ObjFactory(groups=[public_group])
+        DBSession().add(Source(obj_id=obj.id, group_id=public_group.id))
+        DBSession().commit()
+        obj_ids.append(obj.id)
+    # the latest save of an Obj saved twice is flagged as such
+    DBSession().add(Source(obj_id=obj_ids[-1], group_id=public_group2.id))
+    DBSession().commit()
+
+    def n_queries(max_num_sources):
+        with count_queries() as statements:
+            sources = get_recent_sources(user, max_num_sources)
+        assert len(sources) == max_num_sources
+        assert all(s["public_url"] for s in sources)
+        return len(statements)
+
+    # warm up the user's lazily loaded attributes (e.g., accessible groups)
+    n_queries(1)
+    assert n_queries(1) == n_queries(6)
+
+    sources = get_recent_sources(user, 6)
+    assert [s["obj_id"] for s in sources] == [obj_ids[-1]] + obj_ids[::-1]
+    assert [s["resaved"] for s in sources] == [True] + [False] * 5
+    assert sources[0]["created_at"] > sources[1]["created_at"]
+
+
+def test_top_sources_query_count_independent_of_num_sources(user, public_group):
+    obj_ids = []
+    for i in range(5):
+        obj = ObjFactory(groups=[public_group])
+        DBSession().add(Source(obj_id=obj.id, group_id=public_group.id))
+        DBSession().flush()
+        SourceViewCount.record(obj.id, datetime.datetime.utcnow(), views=100 + i)
+        obj_ids.append(obj.id)
+    DBSession().commit()
+
+    def n_queries(max_num_sources):
+        with count_queries() as statements:
+            sources = get_top_sources(user, max_num_sources, 1)
+        assert len(sources) == max_num_sources
+        assert all(s["public_url"] for s in sources)
+        return len(statements)
+
+    # warm up the user's lazily loaded attributes (e.g., accessible groups)
+    n_queries(1)
+    assert n_queries(1) == n_queries(5)
+
+    sources = get_top_sources(user, 5, 1)
+    assert [s["obj_id"] for s in sources] == obj_ids[::-1]
+    assert [s["views"] for s in sources] == list(range(104, 99, -1))
+
+
+def test_source_views_are_counted_in_buckets(view_only_token, user, public_source):
+    def view_counts():
+        counts = (
+            DBSession()
+            .query(
+                SourceViewCount.granularity,
+                SourceViewCount.bucket,
+                SourceViewCount.views,
+            )
+            .filter(SourceViewCount.obj_id == public_source.id)
+            .all()
+        )
+        return {(granularity, bucket): views for granularity, bucket, views in counts}
+
+    for _ in range(2):
+        # token requests register a view
+        status, _ = api('GET', f'sources/{public_source.id}', token=view_only_token)
+        assert status == 200
+
+    # the two views may fall on either side of an hour (or day) boundary
+    counts = view_counts()
+    for granularity in SourceViewCount.GRANULARITIES:
+        assert (
+            sum(v for (g, _), v in counts.items() if g == granularity) == 2
+        ), granularity
+
+    sources = get_top_sources(user, 1000, 1)
+    assert [s['views'] for s in sources if s['obj_id'] == public_source.id] == [2]
+
+    # views made at the same time are added to the same buckets
+    viewed_at = datetime.datetime.utcnow() - datetime.timedelta(days=30)
+    for _ in range(2):
+        SourceViewCount.record(public_source.id, viewed_at)
+    DBSession().commit()
+    counts = view_counts()
+    assert counts[('hour', viewed_at.replace(minute=0, second=0, microsecond=0))] == 2
+    assert (
+        counts[('day', viewed_at.replace(hour=0, minute=0, second=0, microsecond=0))]
+        == 2
+    )
+
+    # views older than the retention period are pruned with their buckets
+    now = datetime.datetime.utcnow()
+    SourceViewCount.record(public_source.id, now - datetime.timedelta(days=400))
+    DBSession().commit()
+    SourceViewCount.prune(now - datetime.timedelta(days=365))
+    DBSession().commit()
+    buckets = {bucket for _, bucket in view_counts()}
+    assert all(b > now - datetime.timedelta(days=32) for b in buckets)
+    assert len(buckets) >= 4
@@ -1,6 +1,8 @@
 import uuid
-from skyportal.tests import api
+from skyportal.tests import api, count_queries
+from skyportal.tests.fixtures import GroupFactory
 from skyportal.model_util import create_token
+from skyportal.models import DBSession, Group
 from baselayer.app.env import load_env
 
 _, cfg = load_env()
@@ -363,3 +365,23 @@ def test_obj_groups(public_source, public_group, super_admin_token):
     )
     assert status == 200
     assert data["data"][0]["id"] == public_group.id
+
+
+def test_accessible_group_ids_memoized_until_membership_changes(
+    user, super_admin_user, public_group
+):
+    group_ids = user.accessible_group_ids
+    assert public_group.id in group_ids
+    with count_queries() as statements:
+        assert user.accessible_group_ids is group_ids
+    assert len(statements) == 0
+
+    group = GroupFactory()
+    assert group.id not in user.accessible_group_ids
+    user.groups.append(group)
+    DBSession().flush()
+    assert group.id in user.accessible_group_ids
+    DBSession().commit()
+
+    all_group_ids = {group_id for group_id, in DBSession().query(Group.id)}
+    assert super_admin_user.accessible_group_ids == all_group_ids
@@ -1,10 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+
 from baselayer.app.env import load_env
 from skyportal.tests import api
 import numpy as np
+import pandas as pd
 import sncosmo
 import math
 
-from skyportal.models import DBSession, Token
+from skyportal.models import DBSession, Token, PhotStat
 
 
 _, cfg = load_env()
@@ -217,6 +222,42 @@ def test_token_user_post_put_get_photometry_data(
     )
 
 
+def test_concurrent_put_photometry_is_deduplicated(
+    upload_data_token, public_source, public_group, ztf_camera
+):
+    payload = {
+        'obj_id': str(public_source.id),
+        'instrument_id': ztf_camera.id,
+        'mjd': [59500.0, 59501.0, 59502.0],
+        'mag': [19.2, 19.3, 19.4],
+        'magerr': [0.05, 0.06, 0.07],
+        'limiting_mag': 20.0,
+        'magsys': 'ab',
+        'filter': 'ztfr',
+        'group_ids': [public_group.id],
+    }
+
+    def put(_):
+        return api('PUT', 'photometry', data=payload, token=upload_data_token)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(put, range(4)))
+
+    for status, data in results:
+        assert status == 200
+        assert data['status'] == 'success'
+
+    # every request resolves to the same three points
+    assert len({tuple(data['data']['ids']) for _, data in results}) == 1
+
+    status, data = api(
+        'GET', f'sources/{public_source.id}/photometry', token=upload_data_token
+    )
+    assert status == 200
+    mjds = [p['mjd'] for p in data['data'] if p['mjd'] in payload['mjd']]
+    assert sorted(mjds) == payload['mjd']
+
+
 def test_post_photometry_multiple_groups(
     upload_data_token_two_groups,
     public_source_two_groups,
@@ -812,6 +853,56 @@ def test_token_user_post_photometry_limits(
     )
 
 
+def test_token_user_bulk_post_photometry(
+    upload_data_token, public_source, ztf_camera, public_group
+):
+    payload = {
+        'obj_id': str(public_source.id),
+        'mjd': [59400.0, 59401.0, 59402.0],
+        'instrument_id': ztf_camera.id,
+        'mag': [19.2, None, 19.5],
+        'magerr': [0.05, None, 0.07],
+        'limiting_mag': [21.0, 21.5, 21.2],
+        'magsys': 'vega',
+        'filter': ['ztfg', 'ztfr', 'ztfg'],
+        'group_ids': [public_group.id],
+    }
+    status, data = api(
+        'POST', 'photometry?bulk=true', data=payload, token=upload_data_token
+    )
+    assert status == 200
+    assert data['status'] == 'success'
+    assert len(data['data']['ids']) == 3
+    upload_id = data['data']['upload_id']
+
+    for photometry_id, mjd, filter in zip(
+        data['data']['ids'], payload['mjd'], payload['filter']
+    ):
+        status, data = api(
+            'GET', f'photometry/{photometry_id}?magsys=vega', token=upload_data_token
+        )
+        assert status == 200
+        assert data['data']['mjd'] == mjd
+        assert data['data']['filter'] == filter
+        assert public_group.id in [g['id'] for g in data['data']['groups']]
+
+    np.testing.assert_allclose(data['data']['mag'], 19.5)
+    np.testing.assert_allclose(data['data']['limiting_mag'], 21.2)
+
+    # re-posting the same points is rejected, as in the default mode
+    status, data = api(
+        'POST', 'photometry?bulk=true', data=payload, token=upload_data_token
+    )
+    assert status == 400
+    assert 'already exists' in data['message']
+
+    status, data = api(
+        'DELETE', f'photometry/bulk_delete/{upload_id}', token=upload_data_token
+    )
+    assert status == 200
+    assert data['status'] == 'success'
+
+
 def test_token_user_post_invalid_filter(
     upload_data_token, public_source, ztf_camera, public_group
 ):
@@ -1151,6 +1242,50 @@ def test_user_can_delete_owned_photometry_data(
     assert status == 400
 
 
+def test_phot_stats_track_post_and_delete(
+    upload_data_token, public_source, ztf_camera, public_group
+):
+    def get_stats():
+        DBSession().expire_all()
+        return PhotStat.query.filter(PhotStat.obj_id == public_source.id).first()
+
+    num_obs = get_stats().num_obs
+    num_ztfi = get_stats().num_det_per_filter.get('ztfi', 0)
+
+    status, data = api(
+        'POST',
+        'photometry',
+        data={
+            'obj_id': str(public_source.id),
+            'mjd': 70000.0,
+            'instrument_id': ztf_camera.id,
+            'flux': 12.24,
+            'fluxerr': 0.031,
+            'zp': 25.0,
+            'magsys': 'ab',
+            'filter': 'ztfi',
+            'group_ids': [public_group.id],
+        },
+        token=upload_data_token,
+    )
+    assert status == 200
+    assert data['status'] == 'success'
+    photometry_id = data['data']['ids'][0]
+
+    stats = get_stats()
+    assert stats.num_obs == num_obs + 1
+    assert stats.num_det_per_filter['ztfi'] == num_ztfi + 1
+    assert stats.last_detected_mjd == 70000.0
+
+    status, data = api('DELETE', f'photometry/{photometry_id}', token=upload_data_token)
+    assert status == 200
+
+    stats = get_stats()
+    assert stats.num_obs == num_obs
+    assert stats.num_det_per_filter.get('ztfi', 0) == num_ztfi
+    assert stats.last_detected_mjd is None or stats.last_detected_mjd < 70000.0
+
+
 def test_user_cannot_delete_unowned_photometry_data(
     upload_data_token, manage_sources_token, public_source, ztf_camera, public_group
 ):
@@ -1412,6 +1547,75 @@ def test_token_user_get_range_photometry(
     assert len(data['data']) == 2
 
 
+def test_token_user_stream_range_photometry(
+    upload_data_token, public_source, public_group, ztf_camera
+):
+    status, data = api(
+        'POST',
+        'photometry',
+        data={
+            'obj_id': str(public_source.id),
+            'mjd': [58000.0, 58500.0, 59000.0],
+            'instrument_id': ztf_camera.id,
+            'flux': 12.24,
+            'fluxerr': 0.031,
+            'zp': 25.0,
+            'magsys': 'ab',
+            'filter': 'ztfg',
+            'group_ids': [public_group.id],
+        },
+        token=upload_data_token,
+    )
+    assert status == 200
+    assert data['status'] == 'success'
+
+    query = {'instrument_ids': [ztf_camera.id], 'max_date': '2019-02-01T00:00:00'}
+    status, data = api(
+        'GET', 'photometry/range?format=flux', token=upload_data_token, data=query
+    )
+    assert status == 200
+    expected = sorted(data['data'], key=lambda p: p['id'])
+    assert len(expected) == 2
+
+    # page and chunk sizes of one exercise the keyset pagination
+    response = api(
+        'GET',
+        'photometry/range?format=flux&stream=ndjson&pageSize=1&chunkSize=1',
+        token=upload_data_token,
+        data=query,
+        raw_response=True,
+    )
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/x-ndjson'
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    assert [p['id'] for p in streamed] == [p['id'] for p in expected]
+    for point, expected_point in zip(streamed, expected):
+        assert point['group_ids'] == [g['id'] for g in expected_point['groups']]
+        for key in ['obj_id', 'mjd', 'filter', 'flux', 'fluxerr', 'zp', 'magsys']:
+            assert point[key] == expected_point[key]
+
+    response = api(
+        'GET',
+        f'photometry/range?stream=csv&afterId={expected[0]["id"]}',
+        token=upload_data_token,
+        data=query,
+        raw_response=True,
+    )
+    assert response.status_code == 200
+    df = pd.read_csv(io.StringIO(response.text))
+    assert df['id'].tolist() == [expected[1]['id']]
+    assert 'limiting_mag' in df.columns
+
+    response = api(
+        'GET',
+        'photometry/range?stream=xml',
+        token=upload_data_token,
+        data=query,
+        raw_response=True,
+    )
+    assert response.status_code == 400
+
+
 def test_reject_photometry_inf(
     upload_data_token, public_source, public_group, ztf_camera
 ):
@@ -2164,3 +2368,66 @@ def test_problematic_photometry_1276(
     status, data = api('PUT', 'photometry', data=payload, token=super_admin_token,)
     assert status == 400
     assert data['status'] == 'error'
+
+
+def test_token_user_get_reduced_obj_photometry(
+    upload_data_token, public_source, ztf_camera, public_group
+):
+    status, data = api(
+        'POST',
+        'photometry',
+        data={
+            'obj_id': str(public_source.id),
+            'mjd': [59800.0 + 0.01 * i for i in range(20)],
+            'instrument_id': ztf_camera.id,
+            'flux': [100.0 + i for i in range(20)],
+            'fluxerr': 1.0,
+            'zp': 23.9,
+            'magsys': 'ab',
+            'filter': 'ztfg',
+            'group_ids': [public_group.id],
+        },
+        token=upload_data_token,
+    )
+    assert status == 200
+
+    status, data = api(
+        'GET', f'sources/{public_source.id}/photometry', token=upload_data_token
+    )
+    assert status == 200
+    n_points = len(data['data'])
+
+    status, data = api(
+        'GET',
+        f'sources/{public_source.id}/photometry?reduce=downsample&maxPoints=10',
+        token=upload_data_token,
+    )
+    assert status == 200
+    assert data['data']['reduced']
+    assert data['data']['n_points'] == n_points
+    assert len(data['data']['photometry']) < n_points
+    assert all(p['id'] is not None for p in data['data']['photometry'])
+
+    # the 20 new points all fall in the same 1-day bin
+    status, data = api(
+        'GET',
+        f'sources/{public_source.id}/photometry?reduce=bin&maxPoints=10'
+        '&minMJD=59800&maxMJD=59801&format=flux',
+        token=upload_data_token,
+    )
+    assert status == 200
+    assert data['data']['reduced']
+    assert data['data']['n_points'] == 20
+    assert len(data['data']['photometry']) == 1
+    point = data['data']['photometry'][0]
+    assert point['id'] is None
+    assert point['filter'] == 'ztfg'
+    np.testing.assert_allclose(point['fluxerr'], 1 / np.sqrt(20))
+
+    status, data = api(
+        'GET',
+        f'sources/{public_source.id}/photometry?minMJD=59800&maxMJD=59801',
+        token=upload_data_token,
+    )
+    assert status == 200
+    assert len(data['data']) == 20
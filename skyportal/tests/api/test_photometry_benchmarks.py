@@ -0,0 +1,119 @@
+import time
+import uuid
+
+import numpy as np
+from astropy.table import Table
+from sncosmo.photdata import PhotometricData
+
+from skyportal.models import DBSession, Group, GroupPhotometry, Photometry, PHOT_ZP
+from skyportal.handlers.api.photometry import standardize_photometry_data
+
+
+def test_standardize_photometry_points_per_second(
+    public_source, ztf_camera, record_property
+):
+    n = 20_000
+    rng = np.random.default_rng(0)
+    detected = rng.random(n) < 0.8
+    mag = np.where(detected, rng.uniform(17.0, 21.0, size=n), np.nan)
+    magerr = np.where(detected, rng.uniform(0.01, 0.2, size=n), np.nan)
+    magsys = rng.choice(['ab', 'vega'], size=n)
+    filters = rng.choice(['ztfg', 'ztfr', 'ztfi'], size=n)
+
+    data = {
+        'obj_id': str(public_source.id),
+        'instrument_id': ztf_camera.id,
+        'mjd': (59000.0 + np.arange(n) * 0.01).tolist(),
+        'mag': [m if d else None for m, d in zip(mag.tolist(), detected)],
+        'magerr': [e if d else None for e, d in zip(magerr.tolist(), detected)],
+        'limiting_mag': 21.5,
+        'magsys': magsys.tolist(),
+        'filter': filters.tolist(),
+    }
+
+    tic = time.perf_counter()
+    df, instrument_cache = standardize_photometry_data(data)
+    points_per_second = n / (time.perf_counter() - tic)
+
+    record_property('standardize_photometry_points_per_second', points_per_second)
+
+    assert len(df) == n
+    assert list(instrument_cache) == [ztf_camera.id]
+
+    # the conversion must agree with sncosmo's
+    table = Table(
+        {
+            'mjd': df['mjd'],
+            'band': filters,
+            'flux': np.where(detected, 10 ** (-0.4 * (mag - PHOT_ZP)), np.nan),
+            'fluxerr': np.ones(n),
+            'zp': np.full(n, PHOT_ZP),
+            'zpsys': magsys,
+        }
+    )
+    normalized = PhotometricData(table).normalized(zp=PHOT_ZP, zpsys='ab')
+    standardized_flux = df['standardized_flux'].values
+    np.testing.assert_allclose(standardized_flux[detected], normalized.flux[detected])
+
+    ab = magsys == 'ab'
+    np.testing.assert_allclose(
+        standardized_flux[detected & ab],
+        10 ** (-0.4 * (mag[detected & ab] - PHOT_ZP)),
+    )
+
+
+def test_photometry_access_check_points_per_second(
+    public_source, public_group, public_group2, ztf_camera, user, record_property
+):
+    n = 20_000
+    upload_id = uuid.uuid4().hex
+    rows = [
+        {
+            'obj_id': public_source.id,
+            'instrument_id': ztf_camera.id,
+            'mjd': 59000.0 + i * 0.01,
+            'flux': 100.0,
+            'fluxerr': 1.0,
+            'filter': 'ztfg',
+            'upload_id': upload_id,
+            'origin': upload_id,
+            'owner_id': user.id,
+        }
+        for i in range(n)
+    ]
+    DBSession().execute(Photometry.__table__.insert(), rows)
+    ids = [
+        id
+        for id, in DBSession()
+        .query(Photometry.id)
+        .filter(Photometry.upload_id == upload_id)
+        .order_by(Photometry.id)
+    ]
+    # every other point is only shared with a group the user is not a member of
+    DBSession().execute(
+        GroupPhotometry.__table__.insert(),
+        [
+            {
+                'photometr_id': id,
+                'group_id': public_group.id if i % 2 == 0 else public_group2.id,
+            }
+            for i, id in enumerate(ids)
+        ],
+    )
+    DBSession().commit()
+
+    group_ids = user.accessible_group_ids
+    query = DBSession().query(Photometry.id).filter(Photometry.upload_id == upload_id)
+    access_checks = {
+        'join': Photometry.groups.any(Group.id.in_(group_ids)),
+        'group_ids': Photometry.group_ids.overlap(group_ids),
+    }
+    readable_ids = {}
+    for name, access_check in access_checks.items():
+        tic = time.perf_counter()
+        readable_ids[name] = {id for id, in query.filter(access_check)}
+        points_per_second = n / (time.perf_counter() - tic)
+
+        record_property(f'{name}_access_check_points_per_second', points_per_second)
+
+    assert readable_ids['group_ids'] == readable_ids['join'] == set(ids[::2])
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from skyportal.tests import api
+from skyportal.handlers.api.internal.plot import get_photometry_version
+from skyportal.models import PHOT_ZP
+from skyportal.plot import (
+    PHOT_DETECTION_THRESHOLD,
+    get_errorbar_coordinates,
+    prepare_photometry_data,
+)
+
+
+def test_plot_cache_stats(view_only_token, public_source):
+    status, data = api(
+        'GET', f'internal/plot/photometry/{public_source.id}', token=view_only_token
+    )
+    assert status == 200
+    assert data['status'] == 'success'
+
+    # the counters are per server process, and requests may be served by
+    # any of them
+    status, data = api('GET', 'internal/plot/cache', token=view_only_token)
+    assert status == 200
+    assert set(data['data']) == {'hits', 'misses', 'size', 'max_items', 'ttl'}
+    assert data['data']['size'] <= data['data']['max_items']
+
+
+def test_photometry_plot_version_changes_with_data(
+    upload_data_token, public_source, ztf_camera, public_group
+):
+    group_ids = [public_group.id]
+    version = get_photometry_version(public_source.id, group_ids)
+
+    status, data = api(
+        'POST',
+        'photometry',
+        data={
+            'obj_id': str(public_source.id),
+            'mjd': 59600.0,
+            'instrument_id': ztf_camera.id,
+            'flux': 12.24,
+            'fluxerr': 0.031,
+            'zp': 25.0,
+            'magsys': 'ab',
+            'filter': 'ztfg',
+            'group_ids': group_ids,
+        },
+        token=upload_data_token,
+    )
+    assert status == 200
+    photometry_id = data['data']['ids'][0]
+
+    new_version = get_photometry_version(public_source.id, group_ids)
+    assert new_version != version
+
+    status, data = api(
+        'PATCH',
+        f'photometry/{photometry_id}',
+        data={
+            'obj_id': str(public_source.id),
+            'flux': 15.0,
+            'mjd': 59600.0,
+            'fluxerr': 0.031,
+            'zp': 25.0,
+            'magsys': 'ab',
+            'filter': 'ztfg',
+            'instrument_id': ztf_camera.id,
+        },
+        token=upload_data_token,
+    )
+    assert status == 200
+    patched_version = get_photometry_version(public_source.id, group_ids)
+    assert patched_version != new_version
+
+    status, data = api('DELETE', f'photometry/{photometry_id}', token=upload_data_token)
+    assert status == 200
+    deleted_version = get_photometry_version(public_source.id, group_ids)
+    assert deleted_version not in (new_version, patched_version)
+
+    # the absolute magnitude axis depends on the redshift of the object
+    status, data = api(
+        'PATCH',
+        f'sources/{public_source.id}',
+        data={'ra': public_source.ra, 'dec': public_source.dec, 'redshift': 0.05},
+        token=upload_data_token,
+    )
+    assert status == 200
+    assert get_photometry_version(public_source.id, group_ids) != deleted_version
+
+
+def test_prepare_photometry_data():
+    data = pd.DataFrame(
+        {
+            'mjd': [58000.0, 58001.0, 58002.0],
+            'flux': [100.0, np.nan, 1.0],
+            'fluxerr': [1.0, 2.0, 1.0],
+            'filter': ['ztfg', 'ztfr', 'ztfg'],
+            'instrument': ['ZTF', 'ZTF', 'ZTF'],
+            'origin': [None, 'fp', None],
+            'original_user_data': [None, None, {'limiting_mag': 20.0}],
+        }
+    )
+    data = prepare_photometry_data(data)
+
+    assert data['label'].tolist() == ['ZTF/ztfg', 'ZTF/ztfr/fp', 'ZTF/ztfg']
+    assert data['color'].tolist() == ['green', 'red', 'green']
+    assert 'original_user_data' not in data
+    assert data['hasflux'].tolist() == [True, False, True]
+    assert data['obs'].tolist() == [True, False, 1.0 >= PHOT_DETECTION_THRESHOLD]
+
+    np.testing.assert_allclose(data['mag'][0], -2.5 * np.log10(100.0) + PHOT_ZP)
+    np.testing.assert_allclose(data['magerr'][0], 2.5 / np.log(10) / 100.0)
+    assert data['mag'][1] is None and data['magerr'][1] is None
+    np.testing.assert_allclose(
+        data['lim_mag'],
+        -2.5 * np.log10(data['fluxerr'] * PHOT_DETECTION_THRESHOLD) + PHOT_ZP,
+    )
+
+
+def test_get_errorbar_coordinates():
+    xs, ys = get_errorbar_coordinates([1.0, 2.0], [10.0, 20.0], [1.0, 0.5])
+    assert xs == [[1.0, 1.0], [2.0, 2.0]]
+    assert ys == [[9.0, 11.0], [19.5, 20.5]]
+
+    assert get_errorbar_coordinates([], [], []) == ([], [])
+
+
+def test_photometry_plot_reduced(view_only_token, public_source):
+    status, data = api(
+        'GET',
+        f'internal/plot/photometry/{public_source.id}?reduce=bin&maxPoints=2',
+        token=view_only_token,
+    )
+    assert status == 200
+    assert data['data']['n_points'] > 2
+    assert data['data']['reduced']
+
+    status, data = api(
+        'GET',
+        f'internal/plot/photometry/{public_source.id}?reduce=average',
+        token=view_only_token,
+    )
+    assert status == 400
@@ -1,4 +1,10 @@
-from skyportal.tests import api
+import uuid
+
+import sqlalchemy as sa
+
+from skyportal.tests import api, count_queries
+from skyportal.models import DBSession, GroupPhotometry, Photometry
+from skyportal.handlers.api.photometry import share_photometry_with_groups
 import datetime
 
 
@@ -366,3 +372,169 @@ def test_system_admin_can_share_unowned_photometry(
     # `view_only_token only` belongs to `public_group`, but not `public_group2`
     assert status == 200
     assert data["status"] == "success"
+
+
+def test_sharing_photometry_updates_group_ids(
+    upload_data_token_two_groups,
+    public_source_two_groups,
+    public_group,
+    public_group2,
+    ztf_camera,
+):
+    upload_data_token = upload_data_token_two_groups
+    status, data = api(
+        "POST",
+        "photometry",
+        data={
+            "obj_id": str(public_source_two_groups.id),
+            "mjd": 58000.0,
+            "instrument_id": ztf_camera.id,
+            "flux": 12.24,
+            "fluxerr": 0.031,
+            "zp": 25.0,
+            "magsys": "ab",
+            "filter": "ztfg",
+            "group_ids": [public_group2.id],
+        },
+        token=upload_data_token,
+    )
+    assert status == 200
+    assert data["status"] == "success"
+    photometry_id = data["data"]["ids"][0]
+
+    def group_ids():
+        DBSession().rollback()
+        return (
+            DBSession()
+            .query(Photometry.group_ids)
+            .filter(Photometry.id == photometry_id)
+            .scalar()
+        )
+
+    # the photometry is also shared with the single user group of the poster
+    assert public_group2.id in group_ids()
+    assert public_group.id not in group_ids()
+    assert group_ids() == sorted(group_ids())
+
+    status, data = api(
+        "POST",
+        "sharing",
+        data={"photometryIDs": [photometry_id], "groupIDs": [public_group.id]},
+        token=upload_data_token,
+    )
+    assert status == 200
+    assert data["status"] == "success"
+    assert {public_group.id, public_group2.id} <= set(group_ids())
+
+    DBSession().query(GroupPhotometry).filter(
+        GroupPhotometry.photometr_id == photometry_id,
+        GroupPhotometry.group_id == public_group2.id,
+    ).delete()
+    DBSession().commit()
+    assert public_group.id in group_ids()
+    assert public_group2.id not in group_ids()
+
+
+def test_moving_group_photometry_updates_group_ids(
+    upload_data_token_two_groups,
+    public_source_two_groups,
+    public_group,
+    public_group2,
+    ztf_camera,
+):
+    photometry_ids = []
+    for group in [public_group2, public_group]:
+        status, data = api(
+            "POST",
+            "photometry",
+            data={
+                "obj_id": str(public_source_two_groups.id),
+                "mjd": 58000.0,
+                "instrument_id": ztf_camera.id,
+                "flux": 12.24,
+                "fluxerr": 0.031,
+                "zp": 25.0,
+                "magsys": "ab",
+                "filter": "ztfg",
+                "group_ids": [group.id],
+            },
+            token=upload_data_token_two_groups,
+        )
+        assert status == 200
+        assert data["status"] == "success"
+        photometry_ids.append(data["data"]["ids"][0])
+    moved_from, moved_to = photometry_ids
+
+    # an update of the join table changes the groups of both the old and the
+    # new photometry
+    DBSession().query(GroupPhotometry).filter(
+        GroupPhotometry.photometr_id == moved_from,
+        GroupPhotometry.group_id == public_group2.id,
+    ).update({"photometr_id": moved_to})
+    DBSession().commit()
+
+    group_ids = dict(
+        DBSession()
+        .query(Photometry.id, Photometry.group_ids)
+        .filter(Photometry.id.in_(photometry_ids))
+    )
+    assert public_group2.id not in group_ids[moved_from]
+    assert {public_group.id, public_group2.id} <= set(group_ids[moved_to])
+    assert group_ids[moved_to] == sorted(group_ids[moved_to])
+
+
+def test_sharing_new_photometry_rewrites_each_point_once(
+    user, public_source, public_group, public_group2, ztf_camera
+):
+    n = 10
+    upload_id = str(uuid.uuid4())
+    DBSession().execute(
+        Photometry.__table__.insert(),
+        [
+            {
+                "obj_id": public_source.id,
+                "instrument_id": ztf_camera.id,
+                "mjd": 59000.0 + i,
+                "flux": 100.0,
+                "fluxerr": 1.0,
+                "filter": "ztfg",
+                "upload_id": upload_id,
+                "owner_id": user.id,
+            }
+            for i in range(n)
+        ],
+    )
+    ids = [
+        id
+        for id, in DBSession()
+        .query(Photometry.id)
+        .filter(Photometry.upload_id == upload_id)
+    ]
+    group_ids = [public_group.id, public_group2.id, user.single_user_group.id]
+
+    def n_photometry_updates():
+        # row updates of the current transaction, including those of triggers
+        return (
+            DBSession()
+            .execute(
+                sa.text(
+                    "SELECT n_tup_upd FROM pg_stat_xact_user_tables "
+                    "WHERE relname = 'photometry'"
+                )
+            )
+            .scalar()
+        )
+
+    n_updates = n_photometry_updates()
+    with count_queries() as statements:
+        share_photometry_with_groups(ids, group_ids)
+    assert len(statements) == 1
+    # the group_ids sync trigger fires once, rather than once per join row
+    assert n_photometry_updates() - n_updates == n
+    DBSession().commit()
+
+    assert DBSession().query(GroupPhotometry).filter(
+        GroupPhotometry.photometr_id.in_(ids)
+    ).count() == n * len(group_ids)
+    rows = DBSession().query(Photometry.group_ids).filter(Photometry.id.in_(ids))
+    assert all(row_group_ids == sorted(group_ids) for row_group_ids, in rows)
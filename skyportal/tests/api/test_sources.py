@@ -5,8 +5,20 @@ import numpy as np
 import arrow
 from tdtax import taxonomy, __version__
 
-from skyportal.tests import api
-from skyportal.models import cosmo
+from skyportal.tests import api, count_queries, run_background_task
+from skyportal.tests.fixtures import ObjFactory
+from skyportal.models import (
+    cosmo,
+    DBSession,
+    BackgroundTask,
+    Candidate,
+    Obj,
+    Source,
+    get_derived_astro_fields,
+    get_readable_obj_ids,
+)
+from baselayer.app.access import AccessError
+from skyportal.handlers.api.source import get_source_list_info
 
 from datetime import datetime, timezone, timedelta
 from dateutil import parser
@@ -73,8 +85,11 @@ def test_token_user_update_source(upload_data_token, public_source):
     assert data["status"] == "success"
     npt.assert_almost_equal(data["data"]["ra"], 234.22)
     npt.assert_almost_equal(data["data"]["redshift"], 3.0)
-    npt.assert_almost_equal(
-        cosmo.luminosity_distance(3.0).value, data["data"]["luminosity_distance"]
+    # distances are interpolated, see `skyportal.utils.cosmology.DistanceTable`
+    npt.assert_allclose(
+        cosmo.luminosity_distance(3.0).value,
+        data["data"]["luminosity_distance"],
+        rtol=1e-7,
     )
 
 
@@ -104,6 +119,33 @@ def test_distance_modulus(upload_data_token, public_source):
     )
 
 
+def test_derived_astro_fields_match_obj_properties():
+    objs = [
+        Obj(id="astro0", ra=234.22, dec=-22.33, redshift=3.0),
+        Obj(id="astro1", ra=10.0, dec=41.2, redshift=0.0001),
+        Obj(id="astro2", ra=10.0, dec=41.2, redshift=0.05, altdata={"dm": 28.5}),
+        Obj(id="astro3", ra=359.9, dec=-89.0, altdata={"parallax": 0.001}),
+        Obj(id="astro4", ra=120.0, dec=5.0, redshift=3.0),
+        Obj(id="astro5", ra=120.0, dec=5.0),
+    ]
+    fields = get_derived_astro_fields(objs)
+    for obj in objs:
+        expected = {
+            "gal_lon": obj.gal_lon_deg,
+            "gal_lat": obj.gal_lat_deg,
+            "luminosity_distance": obj.luminosity_distance,
+            "dm": obj.dm,
+            "angular_diameter_distance": obj.angular_diameter_distance,
+        }
+        for name, value in expected.items():
+            if value is None:
+                assert fields[obj.id][name] is None
+            else:
+                npt.assert_allclose(fields[obj.id][name], value)
+
+    assert get_derived_astro_fields([]) == {}
+
+
 def test_parallax(upload_data_token, public_source):
     parallax = 0.001  # in arcsec = 1 kpc
     d_pc = 1 / parallax
@@ -352,11 +394,19 @@ def test_source_notifications_unauthorized(
         },
         token=source_notification_user_token,
     )
-    assert status == 400
-    # Test server should have no valid Twilio API credentials
-    assert data["message"].startswith(
-        "Twilio Communication SMS API authorization error"
-    )
+    # the notification is sent in the background
+    assert status == 200
+    notification_id = data["data"]["id"]
+
+    task = BackgroundTask.query.filter(
+        BackgroundTask.name == "send_source_notification",
+        BackgroundTask.kwargs == {"source_notification_id": notification_id},
+    ).one()
+    task = run_background_task(task.id)
+    # Test server should have no valid Twilio API credentials, so the task
+    # fails and is retried later
+    assert task.status == "pending"
+    assert "Twilio" in task.error
 
 
 def test_token_user_source_summary(
@@ -497,6 +547,59 @@ def test_sources_sorting(upload_data_token, view_only_token, public_group):
     npt.assert_almost_equal(data["data"]["sources"][1]["ra"], ra1)
 
 
+def test_sources_cursor_pagination(upload_data_token, view_only_token, public_group):
+    obj_ids = [str(uuid.uuid4()) for _ in range(3)]
+    for obj_id, ra in zip(obj_ids, [10.0, 20.0, 30.0]):
+        status, data = api(
+            "POST",
+            "sources",
+            data={"id": obj_id, "ra": ra, "dec": 0.0, "group_ids": [public_group.id]},
+            token=upload_data_token,
+        )
+        assert status == 200
+
+    params = {
+        "sortBy": "ra",
+        "sortOrder": "desc",
+        "group_ids": f"{public_group.id}",
+        "numPerPage": 2,
+    }
+    status, data = api(
+        "GET", "sources", params={**params, "pageNumber": 1}, token=view_only_token
+    )
+    assert status == 200
+    total_matches = data["data"]["totalMatches"]
+
+    sources = []
+    cursor = ""
+    while cursor is not None:
+        status, data = api(
+            "GET",
+            "sources",
+            params={**params, "cursor": cursor, "countMode": "none"},
+            token=view_only_token,
+        )
+        assert status == 200
+        assert data["data"]["totalMatches"] is None
+        sources += data["data"]["sources"]
+        cursor = data["data"]["nextCursor"]
+
+    ids = [s["id"] for s in sources]
+    assert len(ids) == len(set(ids)) == total_matches
+    assert set(obj_ids) <= set(ids)
+    ras = [s["ra"] for s in sources]
+    assert ras == sorted(ras, reverse=True)
+
+    # cursors are only supported for sorts on the columns of Obj
+    status, data = api(
+        "GET",
+        "sources",
+        params={**params, "sortBy": "saved_at", "cursor": ""},
+        token=view_only_token,
+    )
+    assert status == 400
+
+
 def test_object_last_detected(
     upload_data_token, view_only_token, public_source, ztf_camera, public_group
 ):
@@ -1244,3 +1347,79 @@ def test_sources_filter_by_has_spectrum(
     assert status == 200
     assert len(data["data"]["sources"]) == 1
     assert data["data"]["sources"][0]["id"] == public_source.id
+
+
+def test_source_list_query_count_independent_of_page_size(user, public_group):
+    obj_ids = []
+    for _ in range(5):
+        obj = ObjFactory(groups=[public_group])
+        DBSession().add(Source(obj_id=obj.id, group_id=public_group.id))
+        obj_ids.append(obj.id)
+    DBSession().commit()
+
+    def n_queries(page_obj_ids):
+        objs = DBSession().query(Obj).filter(Obj.id.in_(page_obj_ids)).all()
+        with count_queries() as statements:
+            source_list = get_source_list_info(
+                objs,
+                user,
+                include_comments=True,
+                include_photometry=True,
+                include_photometry_exists=True,
+                include_spectrum_exists=True,
+            )
+        assert len(source_list) == len(page_obj_ids)
+        assert all(len(s["photometry"]) == 20 for s in source_list)
+        assert all(len(s["comments"]) == 10 for s in source_list)
+        assert all(len(s["groups"]) == 1 for s in source_list)
+        return len(statements)
+
+    # warm up the user's lazily loaded attributes (e.g., accessible groups)
+    n_queries(obj_ids[:1])
+    assert n_queries(obj_ids[:1]) == n_queries(obj_ids)
+
+
+def test_readable_obj_ids(
+    user,
+    super_admin_user,
+    public_group,
+    public_source,
+    public_source_group2,
+    public_filter,
+):
+    # an Obj that is only a Candidate passing one of the user's filters
+    candidate_obj = Obj(id=str(uuid.uuid4()), ra=0.0, dec=0.0)
+    DBSession().add(candidate_obj)
+    DBSession().add(
+        Candidate(
+            obj=candidate_obj,
+            filter=public_filter,
+            passed_at=datetime.utcnow(),
+            uploader_id=user.id,
+        )
+    )
+    # an Obj that only has Photometry shared with one of the user's groups
+    photometry_obj = ObjFactory(groups=[public_group])
+    DBSession().commit()
+
+    obj_ids = [
+        public_source.id,
+        public_source_group2.id,
+        candidate_obj.id,
+        photometry_obj.id,
+        str(uuid.uuid4()),
+    ]
+
+    # warm up the user's lazily loaded attributes (e.g., accessible groups)
+    get_readable_obj_ids(obj_ids, user)
+    with count_queries() as statements:
+        readable_obj_ids = get_readable_obj_ids(obj_ids, user)
+    assert len(statements) == 1
+    assert readable_obj_ids == {public_source.id, candidate_obj.id, photometry_obj.id}
+
+    assert get_readable_obj_ids(obj_ids, super_admin_user) == set(obj_ids[:4])
+
+    assert Obj.get_if_readable_by(candidate_obj.id, user).id == candidate_obj.id
+    assert Obj.get_if_readable_by(obj_ids[-1], user) is None
+    with pytest.raises(AccessError):
+        Obj.get_if_readable_by(public_source_group2.id, user)
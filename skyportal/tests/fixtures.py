@@ -21,6 +21,7 @@ from skyportal.models import (
     Filter,
     ObservingRun,
     ClassicalAssignment,
+    PhotStat,
 )
 
 from baselayer.app.env import load_env
@@ -233,6 +234,8 @@ class ObjFactory(factory.alchemy.SQLAlchemyModelFactory):
                 obj_id=obj.id, instrument=instruments[0], groups=passed_groups
             )
         )
+        DBSession().flush()
+        PhotStat.recompute([obj.id])
         DBSession().commit()
 
 
@@ -6,6 +6,7 @@ from os.path import join as pjoin
 import pytest
 
 from skyportal.utils.offset import Cache
+from skyportal.utils.cache import LRUCache, TTLCache
 
 
 @pytest.fixture(scope="module")
@@ -71,3 +72,64 @@ def test_cache_reference_refresh(cache):
 
 def test_cache_nested_root(cache_parent_dir):
     Cache(cache_parent_dir / 'some/deeper/path', 1)
+
+
+def test_lru_cache_eviction():
+    cache = LRUCache(max_items=2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache['a'] == 1  # 'b' is now the least recently used
+
+    cache['c'] = 3
+    assert cache['b'] is None
+    assert cache['a'] == 1
+    assert cache['c'] == 3
+    assert len(cache) == 2
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'size': 2, 'max_items': 2}
+
+
+def test_lru_cache_invalidate():
+    cache = LRUCache(max_items=10)
+    for obj_id in ['obj1', 'obj2', 'obj1']:
+        cache[(obj_id, len(cache))] = b'x'
+
+    cache.invalidate(lambda key: key[0] == 'obj1')
+    assert len(cache) == 1
+    assert cache[('obj2', 1)] == b'x'
+
+
+def test_lru_cache_disabled():
+    cache = LRUCache(max_items=0)
+    cache['a'] = 1
+    assert cache['a'] is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_expiry():
+    cache = TTLCache(max_items=10, ttl=0.5)
+    cache['a'] = 1
+    assert cache['a'] == 1
+
+    time.sleep(0.6)
+    assert cache['a'] is None
+    assert len(cache) == 0
+    assert cache.stats() == {
+        'hits': 1,
+        'misses': 1,
+        'size': 0,
+        'max_items': 10,
+        'ttl': 0.5,
+    }
+
+
+def test_ttl_cache_invalidate_and_disable():
+    cache = TTLCache(max_items=10, ttl=60)
+    cache[('news_feed', (1, 2))] = []
+    cache[('source_counts', (1, 2))] = {'count': 0}
+    cache.invalidate(lambda key: key[0] == 'news_feed')
+    assert cache[('news_feed', (1, 2))] is None
+    assert cache[('source_counts', (1, 2))] == {'count': 0}
+
+    cache = TTLCache(max_items=10, ttl=0)
+    cache['a'] = 1
+    assert cache['a'] is None
@@ -1,7 +1,13 @@
+import numpy as np
+import numpy.testing as npt
 from astropy import cosmology
 from astropy import units as u
 
-from skyportal.utils.cosmology import establish_cosmology
+from skyportal.utils.cosmology import (
+    DistanceTable,
+    establish_cosmology,
+    get_distance_table,
+)
 
 fallback_cosmology = cosmology.Planck18_arXiv_v2
 
@@ -34,3 +40,47 @@ def test_bad_cosmology():
 
     cosmo = establish_cosmology(cfg=cfg, fallback_cosmology=fallback_cosmology)
     assert cosmo.name == fallback_cosmology.name
+
+
+def test_distance_table_accuracy():
+    table = DistanceTable(fallback_cosmology)
+    assert table.max_relative_error < 1e-7
+
+    z = np.concatenate([[0.0, 1e-4, table.max_redshift], np.linspace(0.001, 9.9, 57)])
+    npt.assert_allclose(
+        table.luminosity_distance(z),
+        fallback_cosmology.luminosity_distance(z).to(u.Mpc).value,
+        rtol=1e-7,
+    )
+    npt.assert_allclose(
+        table.angular_diameter_distance(z),
+        fallback_cosmology.angular_diameter_distance(z).to(u.Mpc).value,
+        rtol=1e-7,
+    )
+
+    assert isinstance(table.luminosity_distance(0.5), float)
+    assert np.isnan(table.luminosity_distance(np.nan))
+
+
+def test_distance_table_exact_outside_grid():
+    table = DistanceTable(fallback_cosmology, max_redshift=1.0, size=100)
+    z = np.array([0.5, 2.0, 20.0])
+    distances = table.luminosity_distance(z)
+    exact = fallback_cosmology.luminosity_distance(z[1:]).to(u.Mpc).value
+    assert (distances[1:] == exact).all()
+
+
+def test_distance_table_rebuilt_for_new_cosmology():
+    table = get_distance_table(fallback_cosmology)
+    assert get_distance_table(fallback_cosmology) is table
+
+    cfg = {"misc": {"cosmology": "WMAP9"}}
+    wmap9 = establish_cosmology(cfg=cfg, fallback_cosmology=fallback_cosmology)
+    wmap9_table = get_distance_table(wmap9)
+    assert wmap9_table is not table
+    assert wmap9_table.cosmo is wmap9
+    npt.assert_allclose(
+        wmap9_table.luminosity_distance(1.0),
+        wmap9.luminosity_distance(1.0).to(u.Mpc).value,
+        rtol=1e-7,
+    )
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import tornado.web
+from tornado import gen
+from tornado.httpclient import HTTPClientError
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.testing import bind_unused_port
+
+from skyportal.utils.http_client import CircuitOpenError, HTTPClient
+
+
+class StubHandler(tornado.web.RequestHandler):
+    """Responds after `state['delay']` seconds with the next status code in
+    `state['statuses']`, or 200 once they are used up."""
+
+    def initialize(self, state):
+        self.state = state
+
+    async def respond(self):
+        state = self.state
+        state['requests'].append(self.request.method)
+        state['in_flight'] += 1
+        state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+        try:
+            await gen.sleep(state['delay'])
+        finally:
+            state['in_flight'] -= 1
+        status = state['statuses'].pop(0) if state['statuses'] else 200
+        self.set_status(status)
+        self.write(f'status {status}')
+
+    get = post = respond
+
+
+@pytest.fixture()
+def stub_server():
+    """A local HTTP server, running on an IOLoop in a separate thread."""
+    state = {
+        'requests': [],
+        'statuses': [],
+        'delay': 0,
+        'in_flight': 0,
+        'max_in_flight': 0,
+    }
+    app = tornado.web.Application([(r'/.*', StubHandler, {'state': state})])
+    sock, port = bind_unused_port()
+    server = SimpleNamespace(url=f'http://127.0.0.1:{port}/', state=state)
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        http_server = HTTPServer(app)
+        http_server.add_sockets([sock])
+        server.io_loop = IOLoop.current()
+        started.set()
+        server.io_loop.start()
+        http_server.stop()
+        server.io_loop.close(all_fds=True)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait()
+    yield server
+    server.io_loop.add_callback(server.io_loop.stop)
+    thread.join()
+
+
+def test_failed_requests_are_retried(stub_server):
+    client = HTTPClient(max_retries=2, retry_backoff=0.01)
+    stub_server.state['statuses'] = [503, 500]
+
+    response = client.fetch_sync(stub_server.url)
+    assert response.code == 200
+    assert stub_server.state['requests'] == ['GET'] * 3
+
+
+def test_post_requests_are_not_retried(stub_server):
+    client = HTTPClient(max_retries=2, retry_backoff=0.01)
+    stub_server.state['statuses'] = [503]
+
+    response = client.fetch_sync(stub_server.url, method='POST', body='payload')
+    assert response.code == 503
+    assert stub_server.state['requests'] == ['POST']
+
+
+def test_timed_out_requests_are_retried_then_raise(stub_server):
+    client = HTTPClient(request_timeout=0.1, max_retries=1, retry_backoff=0.01)
+    stub_server.state['delay'] = 0.5
+
+    with pytest.raises(HTTPClientError) as e:
+        client.fetch_sync(stub_server.url)
+    assert e.value.code == 599
+    assert stub_server.state['requests'] == ['GET'] * 2
+
+
+def test_circuit_breaker(stub_server):
+    client = HTTPClient(
+        max_retries=0, circuit_breaker_failures=2, circuit_breaker_reset_time=0.2
+    )
+    stub_server.state['statuses'] = [500, 500, 500]
+
+    for _ in range(2):
+        assert client.fetch_sync(stub_server.url).code == 500
+
+    # the host is no longer contacted...
+    with pytest.raises(CircuitOpenError):
+        client.fetch_sync(stub_server.url)
+    assert len(stub_server.state['requests']) == 2
+
+    # ...until a trial request is let through after the reset time; as it
+    # fails, the breaker opens again
+    time.sleep(0.25)
+    assert client.fetch_sync(stub_server.url).code == 500
+    with pytest.raises(CircuitOpenError):
+        client.fetch_sync(stub_server.url)
+
+    # a successful trial request closes the breaker
+    time.sleep(0.25)
+    for _ in range(3):
+        assert client.fetch_sync(stub_server.url).code == 200
+    assert len(stub_server.state['requests']) == 6
+
+
+def test_concurrent_requests_per_host_are_limited(stub_server):
+    client = HTTPClient(max_clients_per_host=2)
+    stub_server.state['delay'] = 0.05
+
+    async def fetch_all():
+        return await asyncio.gather(*[client.fetch(stub_server.url) for _ in range(6)])
+
+    responses = asyncio.run(fetch_all())
+    assert [r.code for r in responses] == [200] * 6
+    assert stub_server.state['max_in_flight'] == 2
+
+
+def test_fetch_sync_runs_on_io_loop(stub_server):
+    client = HTTPClient()
+    # requests of other threads are sent from the IOLoop of the server
+    # process, here the one of the stub server
+    client.io_loop = stub_server.io_loop
+
+    assert client.fetch_sync(stub_server.url).code == 200
+    assert list(client._loop_clients) == [stub_server.io_loop]
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from skyportal.utils.lightcurve import (
+    bin_light_curve,
+    downsample_light_curve,
+    lttb_indices,
+    parse_reduction_arguments,
+)
+
+
+def test_bin_light_curve():
+    data = pd.DataFrame(
+        {
+            'mjd': [0.1, 0.3, 0.5, 2.2, 0.2, 0.4],
+            'flux': [10.0, 20.0, np.nan, np.nan, 5.0, 5.0],
+            'fluxerr': [1.0, 2.0, 3.0, 4.0, 1.0, 1.0],
+            'filter': ['ztfg', 'ztfg', 'ztfg', 'ztfg', 'ztfr', 'ztfr'],
+            'origin': [None, None, None, None, 'fp', 'fp'],
+        }
+    )
+    binned = bin_light_curve(data, 1.0, by=['filter', 'origin'])
+
+    assert binned['filter'].tolist() == ['ztfg', 'ztfg', 'ztfr']
+    assert binned['origin'].tolist() == [None, None, 'fp']
+    assert binned['n_points'].tolist() == [3, 1, 2]
+
+    # inverse-variance weighted means, ignoring the non-detection
+    np.testing.assert_allclose(binned['flux'][0], (10 + 20 / 4) / (1 + 1 / 4))
+    np.testing.assert_allclose(binned['mjd'][0], (0.1 + 0.3 / 4) / (1 + 1 / 4))
+    np.testing.assert_allclose(binned['fluxerr'][0], np.sqrt(1 / (1 + 1 / 4)))
+
+    # bins without detections keep their deepest non-detection
+    assert np.isnan(binned['flux'][1])
+    assert binned['fluxerr'][1] == 4.0
+    assert binned['mjd'][1] == 2.2
+
+    np.testing.assert_allclose(binned['flux'][2], 5.0)
+    np.testing.assert_allclose(binned['fluxerr'][2], np.sqrt(1 / 2))
+
+
+def test_lttb_indices():
+    x = np.arange(100, dtype=float)
+    y = np.zeros(100)
+    y[42] = 10.0
+
+    indices = lttb_indices(x, y, 10)
+    assert len(indices) == 10
+    assert indices[0] == 0 and indices[-1] == 99
+    assert 42 in indices
+    assert np.all(np.diff(indices) > 0)
+
+    np.testing.assert_array_equal(lttb_indices(x, y, 200), np.arange(100))
+
+
+def test_downsample_light_curve():
+    rng = np.random.default_rng(0)
+    n = 1000
+    data = pd.DataFrame(
+        {
+            'mjd': rng.uniform(58000, 59000, size=n),
+            'flux': rng.normal(100.0, 10.0, size=n),
+            'fluxerr': 1.0,
+            'filter': rng.choice(['ztfg', 'ztfr'], size=n),
+        }
+    )
+    data.loc[::10, 'flux'] = np.nan
+
+    downsampled = downsample_light_curve(data, 100, by=['filter'])
+    assert 90 <= len(downsampled) <= 100
+    assert set(downsampled['filter']) == {'ztfg', 'ztfr'}
+    assert downsampled.index.is_monotonic_increasing
+    assert downsampled.index.isin(data.index).all()
+
+    assert downsample_light_curve(data, n, by=['filter']) is data
+
+
+def test_parse_reduction_arguments():
+    assert parse_reduction_arguments(None, '100', '0.5') == (None, 100, 0.5)
+    assert parse_reduction_arguments('bin', 100, 1) == ('bin', 100, 1.0)
+
+    with pytest.raises(ValueError):
+        parse_reduction_arguments('average', 100, 1.0)
+    with pytest.raises(ValueError):
+        parse_reduction_arguments('bin', 'many', 1.0)
+    with pytest.raises(ValueError):
+        parse_reduction_arguments('bin', 100, 0.0)
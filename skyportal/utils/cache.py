@@ -1,6 +1,8 @@
+from collections import OrderedDict
 from pathlib import Path
 import hashlib
 import os
+import time
 
 from baselayer.log import make_log
 
@@ -88,3 +90,131 @@ class Cache:
 
     def __len__(self):
         return len(list(self._cache_dir.glob('*')))
+
+
+class LRUCache:
+    def __init__(self, max_items=100):
+        """In-memory cache that evicts the least recently used entry once
+        it holds `max_items` entries.
+
+        Parameters
+        ----------
+        max_items : int, optional
+            Maximum number of items held in the cache. 0 disables it.
+        """
+        self._items = OrderedDict()
+        self._max_items = max_items
+        self.hits = 0
+        self.misses = 0
+
+    def __getitem__(self, key):
+        """Return item from the cache, or None if it is not cached.
+
+        Parameters
+        ----------
+        key : hashable
+        """
+        if key not in self._items:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._items.move_to_end(key)  # Make newest in cache
+        return self._items[key]
+
+    def __setitem__(self, key, value):
+        """Insert item into cache, evicting the least recently used
+        items if the cache is full.
+
+        Parameters
+        ----------
+        key : hashable
+        value : object
+        """
+        # Cache is disabled, do not add entry
+        if self._max_items == 0:
+            return
+
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_items:
+            self._items.popitem(last=False)
+
+    def invalidate(self, predicate):
+        """Remove every entry whose key satisfies `predicate`.
+
+        Parameters
+        ----------
+        predicate : callable
+            Called with each key, returns True for keys to remove.
+        """
+        for key in [key for key in self._items if predicate(key)]:
+            del self._items[key]
+
+    def stats(self):
+        """Return the hit and miss counts and the size of the cache."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._items),
+            'max_items': self._max_items,
+        }
+
+    def __len__(self):
+        return len(self._items)
+
+
+class TTLCache(LRUCache):
+    def __init__(self, max_items=100, ttl=60):
+        """`LRUCache` whose entries also expire `ttl` seconds after they
+        were inserted.
+
+        Parameters
+        ----------
+        max_items : int, optional
+            Maximum number of items held in the cache. 0 disables it.
+        ttl : float, optional
+            Lifetime of the entries, in seconds. 0 disables the cache.
+        """
+        super().__init__(max_items=max_items)
+        self._ttl = ttl
+
+    def __getitem__(self, key):
+        """Return item from the cache, or None if it is not cached or
+        has expired.
+
+        Parameters
+        ----------
+        key : hashable
+        """
+        entry = self._items.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._items[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._items.move_to_end(key)  # Make newest in cache
+        return entry[1]
+
+    def __setitem__(self, key, value):
+        """Insert item into cache. See `LRUCache.__setitem__`.
+
+        Parameters
+        ----------
+        key : hashable
+        value : object
+        """
+        # Cache is disabled, do not add entry
+        if self._ttl <= 0:
+            return
+
+        super().__setitem__(key, (time.monotonic() + self._ttl, value))
+
+    def stats(self):
+        """Return the hit and miss counts, size and entry lifetime of the
+        cache."""
+        return {**super().stats(), 'ttl': self._ttl}
@@ -1,5 +1,7 @@
+import numpy as np
 from astropy import cosmology
 from astropy import units as u
+from scipy.interpolate import CubicSpline
 
 from baselayer.log import make_log
 
@@ -59,3 +61,126 @@ def establish_cosmology(cfg={}, fallback_cosmology=cosmology.Planck18_arXiv_v2):
     except Exception:
         log(f'Error setting cosmology using {fallback_cosmology.name} as a fallback')
         return fallback_cosmology
+
+
+class DistanceTable:
+    """Luminosity and angular diameter distances of a cosmology, interpolated
+    from a redshift grid.
+
+    Computing a distance with `astropy.cosmology` integrates the expansion
+    history numerically for every redshift. The table instead evaluates the
+    luminosity distance exactly on a grid of redshifts, uniformly spaced in
+    ln(1 + z) between 0 and `max_redshift`, and serves lookups with a cubic
+    spline of D_L(z) / z, which is smooth and tends to the Hubble distance
+    c / H0 as z goes to 0. Angular diameter distances follow exactly from
+    D_A = D_L / (1 + z) ** 2.
+
+    The interpolation error is largest halfway between grid points. It is
+    measured there against the exact distances when the table is built, and
+    stored in `max_relative_error`. For the default grid, the relative error
+    is below 1e-7 (as checked by the tests), far below the uncertainty that
+    any measured redshift puts on a distance. Redshifts outside of the grid
+    are computed exactly.
+
+    Parameters
+    ----------
+    cosmo : `astropy.cosmology.FLRW`
+        The cosmology.
+    max_redshift : float
+        Largest redshift of the grid.
+    size : int
+        Number of grid points.
+    """
+
+    def __init__(self, cosmo, max_redshift=10.0, size=2000):
+        self.cosmo = cosmo
+        self.max_redshift = max_redshift
+        self.size = size
+
+        x = np.linspace(0.0, np.log1p(max_redshift), size)
+        self._spline = CubicSpline(x, self._reduced_distance(np.expm1(x)))
+
+        midpoints = np.expm1((x[1:] + x[:-1]) / 2)
+        self.max_relative_error = float(
+            np.max(
+                np.abs(
+                    self._interpolate(midpoints)
+                    / self._exact_luminosity_distance(midpoints)
+                    - 1
+                )
+            )
+        )
+
+    def _exact_luminosity_distance(self, z):
+        return self.cosmo.luminosity_distance(z).to(u.Mpc).value
+
+    def _reduced_distance(self, z):
+        reduced = np.empty_like(z)
+        at_origin = z == 0
+        reduced[at_origin] = self.cosmo.hubble_distance.to(u.Mpc).value
+        reduced[~at_origin] = (
+            self._exact_luminosity_distance(z[~at_origin]) / z[~at_origin]
+        )
+        return reduced
+
+    def _interpolate(self, z):
+        return z * self._spline(np.log1p(z))
+
+    def luminosity_distance(self, z):
+        """Luminosity distance, in Mpc, at redshift(s) `z`.
+
+        Parameters
+        ----------
+        z : float or array-like
+            The redshift(s).
+
+        Returns
+        -------
+        float or numpy.ndarray
+            The distance(s), NaN where `z` is not finite.
+        """
+        z = np.asarray(z, dtype=float)
+        distance = np.full(z.shape, np.nan)
+        on_grid = (z >= 0) & (z <= self.max_redshift)
+        distance[on_grid] = self._interpolate(z[on_grid])
+        off_grid = ~on_grid & np.isfinite(z)
+        if off_grid.any():
+            distance[off_grid] = self._exact_luminosity_distance(z[off_grid])
+        return distance if distance.ndim else float(distance)
+
+    def angular_diameter_distance(self, z):
+        """Angular diameter distance, in Mpc, at redshift(s) `z`.
+
+        See `luminosity_distance`.
+        """
+        return self.luminosity_distance(z) / (1 + np.asarray(z, dtype=float)) ** 2
+
+
+_distance_table = None
+
+
+def get_distance_table(cosmo):
+    """Return the `DistanceTable` of a cosmology.
+
+    The table is built on first use, kept for subsequent calls, and rebuilt
+    whenever it is requested for a different cosmology (e.g. after the
+    `misc.cosmology` configuration changed).
+
+    Parameters
+    ----------
+    cosmo : `astropy.cosmology.FLRW`
+        The cosmology.
+
+    Returns
+    -------
+    `DistanceTable`
+    """
+    global _distance_table
+    if _distance_table is None or repr(_distance_table.cosmo) != repr(cosmo):
+        _distance_table = DistanceTable(cosmo)
+        log(
+            f'built distance table for {cosmo.name} up to z = '
+            f'{_distance_table.max_redshift} (max relative error '
+            f'{_distance_table.max_relative_error:.1e})'
+        )
+    return _distance_table
@@ -33,3 +33,22 @@ def serialize_tornado_request(handler):
         'url': handler.request.uri,
         'method': handler.request.method,
     }
+
+
+def serialize_tornado_http_request(request):
+    return {
+        'headers': dict(request.headers),
+        'body': (request.body or b'').decode(),
+        'url': request.url,
+        'method': request.method,
+    }
+
+
+def serialize_tornado_http_response(response):
+    return {
+        'headers': dict(response.headers),
+        'content': (response.body or b'').decode(),
+        'elapsed': response.request_time,
+        'status_code': response.code,
+        'ok': response.code < 400,
+    }
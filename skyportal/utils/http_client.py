@@ -0,0 +1,292 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+from tornado import gen
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError, HTTPRequest
+from tornado.ioloop import IOLoop
+from tornado.locks import Semaphore
+
+from baselayer.app.env import load_env
+from baselayer.log import make_log
+
+log = make_log('http-client')
+
+_, cfg = load_env()
+
+# Responses worth retrying, and counted as failures by the circuit breakers
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Methods that are retried by default; others (e.g., the POSTs submitting
+# follow-up requests) could have been processed by the server even though
+# the response did not make it back
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host whose circuit breaker is
+    open."""
+
+
+# The exceptions raised by `HTTPClient.fetch` when no response was received
+REQUEST_ERRORS = (CircuitOpenError, HTTPClientError, OSError)
+
+
+class CircuitBreaker:
+    """Stops requests to a host after a run of consecutive failures.
+
+    After `max_failures` consecutive failed requests, the breaker opens and
+    requests fail immediately with `CircuitOpenError`, rather than each
+    waiting for the host to time out. Once `reset_time` seconds have passed,
+    a single trial request is let through: the breaker closes if it
+    succeeds, and stays open for another `reset_time` seconds otherwise.
+    """
+
+    def __init__(self, max_failures, reset_time):
+        self.max_failures = max_failures
+        self.reset_time = reset_time
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return (
+            self.opened_at is not None
+            and time.monotonic() - self.opened_at < self.reset_time
+        )
+
+    def acquire(self, host):
+        """Raise `CircuitOpenError` if a request to `host` may not be sent
+        now."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if self.is_open:
+                raise CircuitOpenError(
+                    f'Not sending request to {host} after {self.failures} '
+                    'consecutive failures'
+                )
+            # Let this request through as a trial, and hold back the others
+            # until it succeeds or `reset_time` seconds have passed again
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                self.opened_at = time.monotonic()
+
+
+class HTTPClient:
+    """Non-blocking client for requests to external services (image cutout
+    servers, weather, follow-up facilities, ...).
+
+    Requests go through one `tornado.httpclient.AsyncHTTPClient` per IOLoop,
+    which reuses connections where the underlying implementation supports
+    it, and share:
+
+    - a limit on the number of simultaneous requests to each host, on top of
+      the overall `max_clients` limit;
+    - connect and request timeouts;
+    - retries, with exponential backoff and jitter, of idempotent requests
+      failing with a connection error, a timeout or a 429/5xx response;
+    - a circuit breaker per host (see `CircuitBreaker`).
+
+    Parameters
+    ----------
+    max_clients : int
+        Maximum number of simultaneous requests per IOLoop.
+    max_clients_per_host : int
+        Maximum number of simultaneous requests to a host per IOLoop.
+    connect_timeout : float
+        Timeout (s) for establishing a connection.
+    request_timeout : float
+        Timeout (s) for the whole request.
+    max_retries : int
+        Number of times idempotent requests are retried.
+    retry_backoff : float
+        Delay (s) before the first retry, doubled for each later one.
+    circuit_breaker_failures : int
+        Number of consecutive failures after which requests to a host are
+        stopped.
+    circuit_breaker_reset_time : float
+        Time (s) after which a request to a stopped host is tried again.
+    """
+
+    def __init__(
+        self,
+        max_clients=100,
+        max_clients_per_host=10,
+        connect_timeout=6.05,
+        request_timeout=20.0,
+        max_retries=2,
+        retry_backoff=0.5,
+        circuit_breaker_failures=5,
+        circuit_breaker_reset_time=60.0,
+    ):
+        self.max_clients = max_clients
+        self.max_clients_per_host = max_clients_per_host
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.circuit_breaker_failures = circuit_breaker_failures
+        self.circuit_breaker_reset_time = circuit_breaker_reset_time
+
+        # The IOLoop of the server process, on which `fetch_sync` runs the
+        # requests of other threads (see `fetch_sync`)
+        self.io_loop = None
+
+        self._breakers = {}
+        self._loop_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get_circuit_breaker(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(
+                    self.circuit_breaker_failures, self.circuit_breaker_reset_time
+                )
+            return self._breakers[host]
+
+    def _get_client_and_semaphore(self, host):
+        io_loop = IOLoop.current()
+        if io_loop not in self._loop_clients:
+            client = AsyncHTTPClient(force_instance=True, max_clients=self.max_clients)
+            self._loop_clients[io_loop] = (client, {})
+        client, semaphores = self._loop_clients[io_loop]
+        if host not in semaphores:
+            semaphores[host] = Semaphore(self.max_clients_per_host)
+        return client, semaphores[host]
+
+    async def fetch(self, url, method='GET', headers=None, body=None, retries=None):
+        """Send a request, retrying it if it fails and is idempotent.
+
+        Parameters
+        ----------
+        url : str
+            URL of the request.
+        method : str, optional
+            HTTP method of the request.
+        headers : dict, optional
+            Headers of the request.
+        body : str or bytes, optional
+            Body of the request.
+        retries : int, optional
+            Number of times the request is retried. Defaults to
+            `max_retries` for idempotent methods, and 0 otherwise.
+
+        Returns
+        -------
+        response : `tornado.httpclient.HTTPResponse`
+            The response, whatever its status code.
+
+        Raises
+        ------
+        CircuitOpenError
+            If the circuit breaker of the host is open.
+        tornado.httpclient.HTTPClientError or OSError
+            If the last attempt failed with a timeout or connection error.
+            `REQUEST_ERRORS` holds these exception types.
+        """
+        host = urlsplit(url).netloc
+        breaker = self.get_circuit_breaker(host)
+        client, semaphore = self._get_client_and_semaphore(host)
+        if retries is None:
+            retries = self.max_retries if method in IDEMPOTENT_METHODS else 0
+
+        request = HTTPRequest(
+            url,
+            method=method,
+            headers=headers,
+            body=body,
+            connect_timeout=self.connect_timeout,
+            request_timeout=self.request_timeout,
+        )
+        for attempt in range(retries + 1):
+            if attempt > 0:
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                await gen.sleep(delay * random.uniform(0.5, 1.5))
+
+            breaker.acquire(host)
+            try:
+                async with semaphore:
+                    response = await client.fetch(request, raise_error=False)
+            except (HTTPClientError, OSError) as e:
+                breaker.record_failure()
+                if attempt == retries:
+                    raise
+                log(f'Retrying {method} {url} after error: {e}')
+                continue
+
+            if response.code not in RETRY_STATUS_CODES:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if attempt == retries:
+                return response
+            log(f'Retrying {method} {url} after {response.code} response')
+
+    def fetch_sync(self, url, **kwargs):
+        """Send a request from a thread other than the IOLoop's, blocking
+        until the response arrives.
+
+        Meant for code running in executor threads (e.g., the finding chart
+        generation) or outside of the server. If `io_loop` is set, the request
+        is run on it, so that it shares connections, per-host limits and
+        circuit breakers with the requests of the handlers; otherwise it is
+        run on a temporary IOLoop.
+
+        Parameters
+        ----------
+        url : str
+            URL of the request.
+        **kwargs
+            Other parameters passed to `fetch`.
+
+        Returns
+        -------
+        response : `tornado.httpclient.HTTPResponse`
+            The response, whatever its status code.
+        """
+        if self.io_loop is not None:
+            try:
+                running_loop = asyncio.get_running_loop()
+            except RuntimeError:
+                running_loop = None
+            if running_loop is self.io_loop.asyncio_loop:
+                raise RuntimeError('fetch_sync would block the IOLoop; use fetch')
+            future = asyncio.run_coroutine_threadsafe(
+                self.fetch(url, **kwargs), self.io_loop.asyncio_loop
+            )
+            return future.result()
+
+        io_loop = IOLoop(make_current=False)
+        try:
+            return io_loop.run_sync(lambda: self.fetch(url, **kwargs))
+        finally:
+            client, _ = self._loop_clients.pop(io_loop, (None, None))
+            if client is not None:
+                client.close()
+            io_loop.close()
+
+
+http_client = HTTPClient(
+    max_clients=cfg['http_client.max_clients'],
+    max_clients_per_host=cfg['http_client.max_clients_per_host'],
+    connect_timeout=cfg['http_client.connect_timeout'],
+    request_timeout=cfg['http_client.request_timeout'],
+    max_retries=cfg['http_client.max_retries'],
+    retry_backoff=cfg['http_client.retry_backoff'],
+    circuit_breaker_failures=cfg['http_client.circuit_breaker_failures'],
+    circuit_breaker_reset_time=cfg['http_client.circuit_breaker_reset_time'],
+)
@@ -0,0 +1,281 @@
+import numpy as np
+import pandas as pd
+
+
+LIGHT_CURVE_REDUCTIONS = ['bin', 'downsample']
+
+
+def parse_reduction_arguments(reduce, max_points, bin_size):
+    """Validate the light curve reduction arguments of a request.
+
+    Parameters
+    ----------
+    reduce : str or None
+        Requested reduction, one of `LIGHT_CURVE_REDUCTIONS`, or None.
+    max_points : str or int
+        Number of points above which the light curve is reduced, and
+        number of points to keep when downsampling.
+    bin_size : str or float
+        Width of the bins, in days, when binning.
+
+    Returns
+    -------
+    (str or None, int, float)
+        The reduction, maximum number of points and bin size.
+
+    Raises
+    ------
+    ValueError
+        If any of the arguments is invalid.
+    """
+    if reduce is not None and reduce not in LIGHT_CURVE_REDUCTIONS:
+        raise ValueError(
+            f'Invalid reduce argument, must be one of {LIGHT_CURVE_REDUCTIONS}.'
+        )
+    try:
+        max_points = int(max_points)
+        bin_size = float(bin_size)
+    except ValueError:
+        raise ValueError('maxPoints must be an integer and binSize a number.')
+    if max_points < 2 or not bin_size > 0:
+        raise ValueError('maxPoints must be at least 2 and binSize positive.')
+    return reduce, max_points, bin_size
+
+
+def get_group_codes(data, by):
+    """Number the groups formed by the values of some columns.
+
+    Unlike `DataFrame.groupby`, missing values (e.g. an origin of None)
+    form groups of their own.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        The rows to group.
+    by : sequence of str
+        Columns identifying the groups.
+
+    Returns
+    -------
+    numpy.ndarray
+        The group number of each row.
+    """
+    columns = [
+        np.where(data[column].isna().to_numpy(), None, data[column].to_numpy(object))
+        for column in by
+    ]
+    keys = pd.Series(list(zip(*columns)), dtype=object)
+    codes, _ = pd.factorize(keys)
+    return codes
+
+
+def bin_light_curve(data, bin_size, by=('filter',)):
+    """Bin a light curve in time.
+
+    Within each group of points (e.g. each filter), points are binned in
+    MJD bins of `bin_size` days starting at the group's first point. The
+    flux and MJD of a bin are the inverse-variance weighted means of its
+    detections (points with a finite flux), and its error is the error on
+    the weighted mean flux, as done by the binning slider of the photometry
+    plot. Bins without any detection keep their deepest non-detection.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        The light curve. Must have `mjd`, `flux` and `fluxerr` columns as
+        well as the columns in `by`.
+    bin_size : float
+        Width of the bins, in days.
+    by : sequence of str
+        Columns identifying the groups of points that are binned
+        separately. Missing values form groups of their own.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per non-empty bin, with the columns in `by`, `mjd`, `flux`,
+        `fluxerr` and `n_points`, the number of points in the bin.
+    """
+    by = list(by)
+    if bin_size <= 0:
+        raise ValueError(f'bin_size must be positive, got {bin_size}.')
+
+    flux = data['flux'].to_numpy(dtype=float)
+    fluxerr = data['fluxerr'].to_numpy(dtype=float)
+    mjd = data['mjd'].to_numpy(dtype=float)
+    detected = np.isfinite(flux)
+
+    group = get_group_codes(data, by)
+    start = pd.Series(mjd).groupby(group).transform('min').to_numpy()
+
+    with np.errstate(divide='ignore'):
+        ivar = np.where(detected, 1 / fluxerr ** 2, 0.0)
+
+    weights = pd.DataFrame(
+        {
+            'group': group,
+            'bin': np.floor((mjd - start) / bin_size).astype(int),
+            'ivar': ivar,
+            'ivar_flux': ivar * np.where(detected, flux, 0.0),
+            'ivar_mjd': ivar * mjd,
+            'mjd': mjd,
+            'fluxerr': fluxerr,
+            'row': np.arange(len(data)),
+        }
+    )
+
+    bins = weights.groupby(['group', 'bin'], sort=False).agg(
+        ivar=('ivar', 'sum'),
+        ivar_flux=('ivar_flux', 'sum'),
+        ivar_mjd=('ivar_mjd', 'sum'),
+        mean_mjd=('mjd', 'mean'),
+        min_fluxerr=('fluxerr', 'min'),
+        n_points=('mjd', 'size'),
+        row=('row', 'first'),
+    )
+
+    # the group columns are the same for all the points of a bin
+    binned = data[by].iloc[bins['row'].to_numpy()].reset_index(drop=True)
+
+    ivar = bins['ivar'].to_numpy()
+    has_detections = ivar > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        binned['mjd'] = np.where(
+            has_detections, bins['ivar_mjd'].to_numpy() / ivar, bins['mean_mjd']
+        )
+        binned['flux'] = np.where(
+            has_detections, bins['ivar_flux'].to_numpy() / ivar, np.nan
+        )
+        binned['fluxerr'] = np.where(
+            has_detections, np.sqrt(1 / ivar), bins['min_fluxerr']
+        )
+    binned['n_points'] = bins['n_points'].to_numpy()
+
+    return binned
+
+
+def lttb_indices(x, y, n_out):
+    """Select the points that best preserve the shape of a curve.
+
+    Implements the Largest-Triangle-Three-Buckets algorithm (Steinarsson
+    2013, "Downsampling Time Series for Visual Representation"). The first
+    and last points are always kept; the points in between are split into
+    `n_out - 2` buckets, and from each bucket the point forming the largest
+    triangle with the previously selected point and the average of the next
+    bucket is kept.
+
+    Parameters
+    ----------
+    x, y : array-like
+        Coordinates of the points, sorted by `x`.
+    n_out : int
+        Number of points to select.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted indices of the selected points.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out <= 2:
+        return np.array([0, n - 1])
+
+    # n_out - 2 buckets splitting the points between the first and the last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_bucket = slice(edges[i + 1], edges[i + 2])
+            next_x, next_y = x[next_bucket].mean(), y[next_bucket].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        # twice the area of the triangles; the factor does not matter
+        area = np.abs(
+            (x[a] - next_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (next_y - y[a])
+        )
+        a = start + np.argmax(area)
+        selected[i + 1] = a
+
+    return selected
+
+
+def downsample_light_curve(data, max_points, by=('filter',)):
+    """Visually downsample a light curve.
+
+    The points are shared between the groups (e.g. filters) in proportion
+    to their size, and each group is downsampled with `lttb_indices`.
+    Non-detections (points without a finite flux) are placed at their
+    1-sigma flux error when selecting points.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        The light curve, with a unique index. Must have `mjd`, `flux` and
+        `fluxerr` columns as well as the columns in `by`.
+    max_points : int
+        Approximate number of points to keep. At least two points (the
+        first and last) are kept from each group.
+    by : sequence of str
+        Columns identifying the groups of points that are downsampled
+        separately. Missing values form groups of their own.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The selected rows of `data`, in their original order.
+    """
+    if len(data) <= max_points:
+        return data
+
+    data_by_mjd = data.sort_values('mjd', kind='mergesort')
+    kept = []
+    for _, group in data_by_mjd.groupby(get_group_codes(data_by_mjd, by), sort=False):
+        n_out = max(2, int(max_points * len(group) / len(data)))
+        flux = group['flux'].to_numpy(dtype=float)
+        y = np.where(np.isfinite(flux), flux, group['fluxerr'].to_numpy(dtype=float))
+        kept.append(group.index[lttb_indices(group['mjd'], y, n_out)])
+
+    return data[data.index.isin(np.concatenate(kept))]
+
+
+def reduce_light_curve(data, reduce, max_points, bin_size, by=('filter',)):
+    """Reduce a light curve with one of `LIGHT_CURVE_REDUCTIONS`.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        The light curve. See `bin_light_curve` and `downsample_light_curve`.
+    reduce : str
+        'bin' to bin the points in time, or 'downsample' to keep a visually
+        representative subset of them.
+    max_points : int
+        Number of points to keep when downsampling.
+    bin_size : float
+        Width of the bins, in days, when binning.
+    by : sequence of str
+        Columns identifying the groups of points reduced separately.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The reduced light curve.
+    """
+    if reduce == 'bin':
+        return bin_light_curve(data, bin_size, by=by)
+    if reduce == 'downsample':
+        return downsample_light_curve(data, max_points, by=by)
+    raise ValueError(
+        f'Invalid light curve reduction, must be one of {LIGHT_CURVE_REDUCTIONS}, '
+        f"got '{reduce}'."
+    )
@@ -5,7 +5,6 @@ import warnings
 from functools import wraps
 
 import pandas as pd
-import requests
 from requests.exceptions import HTTPError
 import matplotlib
 import matplotlib.pyplot as plt
@@ -31,6 +30,7 @@ import pyvo as vo
 from pyvo.dal.exceptions import DALQueryError
 
 from .cache import Cache
+from .http_client import http_client, REQUEST_ERRORS
 
 from baselayer.log import make_log
 from baselayer.app.env import load_env
@@ -199,12 +199,19 @@ JOBLIB_CACHE_SIZE = 100e6  # 100 MB
 offsets_memory = Memory("./cache/offsets/", verbose=0, bytes_limit=JOBLIB_CACHE_SIZE)
 
 
-def get_url(*args, **kwargs):
-    # Connect and read timeouts
-    kwargs['timeout'] = (6.05, 20)
+def get_url(url):
+    """Fetch a URL with the shared HTTP client, blocking until the response
+    arrives, so not to be called from the IOLoop (see
+    `HTTPClient.fetch_sync`). Redirects are followed.
+
+    Returns
+    -------
+    response : `tornado.httpclient.HTTPResponse` or None
+        The response, or None if it could not be fetched.
+    """
     try:
-        return requests.get(*args, **kwargs)
-    except requests.exceptions.RequestException:
+        return http_client.fetch_sync(url)
+    except REQUEST_ERRORS:
         return None
 
 
@@ -244,7 +251,7 @@ def get_ztfref_url(ra, dec, imsize, *args, **kwargs):
     r = get_url(url_ref_meta)
     if r is None:
         return ''
-    s = r.content
+    s = r.body
     c = pd.read_csv(io.StringIO(s.decode('utf-8')))
 
     try:
@@ -327,11 +334,11 @@ def get_ztfcatalog(ra, dec, cache_dir="./cache/finder_cat/", cache_max_items=100
         with fits.open(hdu_fn) as hdu:
             data = hdu[1].data
     else:
-        response = get_url(caturl, stream=True, allow_redirects=True)
-        if response is None or response.status_code != 200:
+        response = get_url(caturl)
+        if response is None or response.code != 200:
             return None
         else:
-            with fits.open(io.BytesIO(response.content)) as hdu:
+            with fits.open(io.BytesIO(response.body)) as hdu:
                 buf = io.BytesIO()
                 hdu.writeto(buf)
                 buf.seek(0)
@@ -919,12 +926,12 @@ def fits_image(
         if hdu_fn is not None:
             return fits.open(hdu_fn)[0]
 
-        response = get_url(url, stream=True, allow_redirects=True)
-        if response is None or response.status_code != 200:
+        response = get_url(url)
+        if response is None or response.code != 200:
             return None
 
         # Check if HDU is a valid FITS file
-        hdu = fits.open(io.BytesIO(response.content))[0]
+        hdu = fits.open(io.BytesIO(response.body))[0]
 
         # Ensure it is not empty
         if np.count_nonzero(hdu.data) == 0:
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+from baselayer.app.env import load_env, parser
+
+
+if __name__ == "__main__":
+    parser.description = (
+        'Rebuild the typed projection of the annotation data (AnnotationValue table)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1000,
+        help='Number of Annotations to project per transaction',
+    )
+
+    env, cfg = load_env()
+
+    from skyportal.models import init_db, DBSession, Annotation, AnnotationValue
+
+    init_db(**cfg['database'])
+
+    n_done = 0
+    last_annotation_id = None
+    while True:
+        # keyset pagination over the Annotation IDs, so that each batch is an
+        # index range scan however far into the table we are
+        query = DBSession().query(Annotation.id).order_by(Annotation.id)
+        if last_annotation_id is not None:
+            query = query.filter(Annotation.id > last_annotation_id)
+        annotation_ids = [
+            annotation_id for annotation_id, in query.limit(env.batch_size)
+        ]
+        if len(annotation_ids) == 0:
+            break
+
+        AnnotationValue.refresh(annotation_ids)
+        DBSession().commit()
+
+        n_done += len(annotation_ids)
+        last_annotation_id = annotation_ids[-1]
+        print(f'Projected the data of {n_done} annotations')
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+from baselayer.app.env import load_env, parser
+
+
+if __name__ == "__main__":
+    parser.description = 'Rebuild the per-Obj photometry summaries (PhotStat table)'
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1000,
+        help='Number of Objs to summarize per transaction',
+    )
+
+    env, cfg = load_env()
+
+    from skyportal.models import init_db, DBSession, Obj, PhotStat
+
+    init_db(**cfg['database'])
+
+    n_done = 0
+    last_obj_id = None
+    while True:
+        # keyset pagination over the Obj IDs, so that each batch is an
+        # index range scan however far into the table we are
+        query = DBSession().query(Obj.id).order_by(Obj.id)
+        if last_obj_id is not None:
+            query = query.filter(Obj.id > last_obj_id)
+        obj_ids = [obj_id for obj_id, in query.limit(env.batch_size)]
+        if len(obj_ids) == 0:
+            break
+
+        PhotStat.recompute(obj_ids)
+        DBSession().commit()
+
+        n_done += len(obj_ids)
+        last_obj_id = obj_ids[-1]
+        print(f'Summarized the photometry of {n_done} objects')
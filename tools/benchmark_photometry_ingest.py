@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+import time
+
+import numpy as np
+import requests
+
+from baselayer.app.env import load_env, parser
+
+
+def post_photometry(url, token, payload, bulk):
+    params = {'bulk': 'true'} if bulk else None
+    tic = time.perf_counter()
+    response = requests.post(
+        f'{url}/api/photometry',
+        json=payload,
+        params=params,
+        headers={'Authorization': f'token {token}'},
+    )
+    elapsed = time.perf_counter() - tic
+    data = response.json()
+    if data['status'] != 'success':
+        raise RuntimeError(f'Upload failed: {data["message"]}')
+    return elapsed, data['data']['upload_id']
+
+
+def delete_upload(url, token, upload_id):
+    response = requests.delete(
+        f'{url}/api/photometry/bulk_delete/{upload_id}',
+        headers={'Authorization': f'token {token}'},
+    )
+    response.raise_for_status()
+
+
+if __name__ == "__main__":
+    parser.description = (
+        'Compare the throughput of the default and COPY-based (bulk) '
+        'photometry upload paths against a running SkyPortal instance. '
+        'The uploaded points are deleted afterwards.'
+    )
+    parser.add_argument('--token', required=True, help='Token with Upload data ACL')
+    parser.add_argument('--obj-id', required=True, help='Obj to attach points to')
+    parser.add_argument(
+        '--instrument-id', type=int, required=True, help='Instrument with ztfg'
+    )
+    parser.add_argument(
+        '--points',
+        type=int,
+        nargs='+',
+        default=[10_000, 100_000],
+        help='Upload sizes to time',
+    )
+
+    env, cfg = load_env()
+    url = f'http://localhost:{cfg["ports.app"]}'
+    rng = np.random.default_rng()
+
+    for n in env.points:
+        for bulk in [False, True]:
+            # random MJDs, so that consecutive runs never collide
+            payload = {
+                'obj_id': env.obj_id,
+                'instrument_id': env.instrument_id,
+                'mjd': (50_000 + rng.random(n) * 10_000).tolist(),
+                'flux': rng.normal(100.0, 10.0, size=n).tolist(),
+                'fluxerr': 1.0,
+                'zp': 23.9,
+                'magsys': 'ab',
+                'filter': 'ztfg',
+                'group_ids': 'all',
+            }
+            elapsed, upload_id = post_photometry(url, env.token, payload, bulk)
+            delete_upload(url, env.token, upload_id)
+
+            mode = 'bulk (COPY)' if bulk else 'default'
+            print(f'{n} points, {mode}: {elapsed:.2f}s ({n / elapsed:,.0f} points/s)')
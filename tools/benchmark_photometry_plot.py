@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from baselayer.app.env import load_env, parser
+
+
+def make_photometry(n, seed=0):
+    """Mimic the output of `skyportal.plot.get_photometry_data`."""
+    rng = np.random.default_rng(seed)
+    flux = rng.normal(100.0, 60.0, size=n)
+    flux[rng.random(n) < 0.2] = np.nan
+    return pd.DataFrame(
+        {
+            'id': np.arange(n),
+            'mjd': 58000.0 + np.sort(rng.random(n)) * 1000,
+            'flux': flux,
+            'fluxerr': rng.uniform(1.0, 10.0, size=n),
+            'filter': rng.choice(['ztfg', 'ztfr', 'ztfi'], size=n),
+            'instrument': 'ZTF',
+            'telescope': 'P48',
+            'origin': rng.choice([None, 'fp'], size=n),
+            'original_user_data': None,
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser.description = 'Time the light curve data preparation of photometry_plot'
+    parser.add_argument(
+        '--points',
+        type=int,
+        nargs='+',
+        default=[1_000, 10_000, 100_000],
+        help='Numbers of photometry points',
+    )
+
+    env, cfg = load_env()
+
+    from skyportal.plot import get_errorbar_coordinates, prepare_photometry_data
+
+    for n in env.points:
+        data = make_photometry(n)
+
+        tic = time.perf_counter()
+        data = prepare_photometry_data(data)
+        for label, df in data.groupby('label', sort=False):
+            get_errorbar_coordinates(df['mjd'], df['flux'], df['fluxerr'])
+            obs = df[df['obs']]
+            get_errorbar_coordinates(obs['mjd'], obs['mag'], obs['magerr'])
+        elapsed = time.perf_counter() - tic
+
+        print(f'{n} points: {elapsed:.3f}s ({n / elapsed:,.0f} points/s)')
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import sncosmo
+
+from baselayer.app.env import load_env, parser
+
+
+def legacy_serialize(phot, outsys, format, PHOT_ZP):
+    """The original one-point-at-a-time serializer, used as a reference."""
+    return_value = {
+        'obj_id': phot.obj_id,
+        'ra': phot.ra,
+        'dec': phot.dec,
+        'filter': phot.filter,
+        'mjd': phot.mjd,
+        'instrument_id': phot.instrument_id,
+        'instrument_name': phot.instrument.name,
+        'ra_unc': phot.ra_unc,
+        'dec_unc': phot.dec_unc,
+        'origin': phot.origin,
+        'id': phot.id,
+        'groups': phot.groups,
+    }
+
+    magsys_db = sncosmo.get_magsystem('ab')
+    outsys = sncosmo.get_magsystem(outsys)
+    relzp_out = 2.5 * np.log10(outsys.zpbandflux(phot.filter))
+    relzp_db = 2.5 * np.log10(magsys_db.zpbandflux(phot.filter))
+    db_correction = relzp_out - relzp_db
+    corrected_db_zp = PHOT_ZP + db_correction
+
+    if format == 'mag':
+        if (
+            phot.original_user_data is not None
+            and 'limiting_mag' in phot.original_user_data
+        ):
+            magsys_packet = sncosmo.get_magsystem(phot.original_user_data['magsys'])
+            relzp_packet = 2.5 * np.log10(magsys_packet.zpbandflux(phot.filter))
+            packet_correction = relzp_out - relzp_packet
+            maglimit_out = phot.original_user_data['limiting_mag'] + packet_correction
+        else:
+            maglimit_out = -2.5 * np.log10(5 * phot.fluxerr) + corrected_db_zp
+
+        mag = None
+        magerr = None
+        if not np.isnan(phot.flux) and phot.flux > 0:
+            mag = -2.5 * np.log10(phot.flux) + PHOT_ZP + db_correction
+            if phot.fluxerr > 0:
+                magerr = (2.5 / np.log(10)) * (phot.fluxerr / phot.flux)
+        return_value.update(
+            {
+                'mag': mag,
+                'magerr': magerr,
+                'magsys': outsys.name,
+                'limiting_mag': maglimit_out,
+            }
+        )
+    else:
+        return_value.update(
+            {
+                'flux': None if np.isnan(phot.flux) else phot.flux,
+                'magsys': outsys.name,
+                'zp': corrected_db_zp,
+                'fluxerr': phot.fluxerr,
+            }
+        )
+    return return_value
+
+
+def make_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    instrument = SimpleNamespace(name='ZTF')
+    filters = rng.choice(['ztfg', 'ztfr', 'ztfi'], size=n)
+    flux = rng.normal(100.0, 60.0, size=n)
+    flux[rng.random(n) < 0.01] = np.nan
+    fluxerr = rng.uniform(1.0, 10.0, size=n)
+    is_limit = rng.random(n) < 0.1
+
+    points = []
+    for i in range(n):
+        original_user_data = None
+        if is_limit[i]:
+            original_user_data = {'limiting_mag': 20.5, 'magsys': 'vega'}
+        points.append(
+            SimpleNamespace(
+                obj_id=f'obj{i % 100}',
+                ra=None,
+                dec=None,
+                filter=str(filters[i]),
+                mjd=58000.0 + i * 0.01,
+                instrument_id=1,
+                instrument=instrument,
+                ra_unc=None,
+                dec_unc=None,
+                origin=None,
+                id=i,
+                groups=[],
+                flux=float(flux[i]),
+                fluxerr=float(fluxerr[i]),
+                original_user_data=original_user_data,
+            )
+        )
+    return points
+
+
+if __name__ == "__main__":
+    parser.description = 'Time the columnar photometry serializer'
+    parser.add_argument(
+        '--points', type=int, default=100_000, help='Number of photometry points'
+    )
+    parser.add_argument(
+        '--skip-legacy',
+        action='store_true',
+        help='Do not time (or compare against) the per-point serializer',
+    )
+
+    env, cfg = load_env()
+
+    from skyportal.models import PHOT_ZP
+    from skyportal.handlers.api.photometry import serialize_many
+
+    points = make_points(env.points)
+
+    for outsys in ['ab', 'vega']:
+        for format in ['mag', 'flux']:
+            tic = time.perf_counter()
+            result = serialize_many(points, outsys, format)
+            columnar = time.perf_counter() - tic
+            line = f'{len(points)} points, {outsys}/{format}: columnar {columnar:.3f}s'
+
+            if not env.skip_legacy:
+                tic = time.perf_counter()
+                expected = [
+                    legacy_serialize(p, outsys, format, PHOT_ZP) for p in points
+                ]
+                legacy = time.perf_counter() - tic
+                assert result == expected, 'Columnar output differs from per-point'
+                line += f', per-point {legacy:.3f}s ({legacy / columnar:.1f}x)'
+
+            print(line)
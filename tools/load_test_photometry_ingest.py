@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from baselayer.app.env import load_env, parser
+
+
+def api(method, url, token, **kwargs):
+    response = requests.request(
+        method, url, headers={'Authorization': f'token {token}'}, **kwargs
+    )
+    data = response.json()
+    if data['status'] != 'success':
+        raise RuntimeError(f'{method} {url} failed: {data["message"]}')
+    return data['data']
+
+
+def writer(url, token, obj_id, instrument_id, uploads, points):
+    """Upload photometry for one object, as a broker worker would."""
+    rng = np.random.default_rng()
+    upload_ids = []
+    for _ in range(uploads):
+        data = api(
+            'POST',
+            f'{url}/api/photometry',
+            token,
+            json={
+                'obj_id': obj_id,
+                'instrument_id': instrument_id,
+                'mjd': (50_000 + rng.random(points) * 10_000).tolist(),
+                'flux': rng.normal(100.0, 10.0, size=points).tolist(),
+                'fluxerr': 1.0,
+                'zp': 23.9,
+                'magsys': 'ab',
+                'filter': 'ztfg',
+                'group_ids': 'all',
+            },
+        )
+        upload_ids.append(data['upload_id'])
+    return upload_ids
+
+
+if __name__ == "__main__":
+    parser.description = (
+        'Measure photometry upload throughput as a function of the number of '
+        'concurrent writers, each uploading to its own object, against a '
+        'running SkyPortal instance. The uploaded points are deleted '
+        'afterwards; the objects created for the test are kept.'
+    )
+    parser.add_argument('--token', required=True, help='Token with Upload data ACL')
+    parser.add_argument(
+        '--instrument-id', type=int, required=True, help='Instrument with ztfg'
+    )
+    parser.add_argument(
+        '--writers',
+        type=int,
+        nargs='+',
+        default=[1, 2, 4, 8],
+        help='Numbers of concurrent writers to test',
+    )
+    parser.add_argument(
+        '--uploads', type=int, default=20, help='Uploads per writer and run'
+    )
+    parser.add_argument('--points', type=int, default=50, help='Points per upload')
+
+    env, cfg = load_env()
+    url = f'http://localhost:{cfg["ports.app"]}'
+
+    obj_ids = []
+    for i in range(max(env.writers)):
+        obj_id = f'loadtest_{uuid.uuid4().hex[:8]}'
+        api(
+            'POST',
+            f'{url}/api/sources',
+            env.token,
+            json={'id': obj_id, 'ra': 10.0 + i, 'dec': 10.0},
+        )
+        obj_ids.append(obj_id)
+
+    for n_writers in env.writers:
+        with ThreadPoolExecutor(max_workers=n_writers) as executor:
+            tic = time.perf_counter()
+            futures = [
+                executor.submit(
+                    writer,
+                    url,
+                    env.token,
+                    obj_id,
+                    env.instrument_id,
+                    env.uploads,
+                    env.points,
+                )
+                for obj_id in obj_ids[:n_writers]
+            ]
+            upload_ids = [u for future in futures for u in future.result()]
+            elapsed = time.perf_counter() - tic
+
+        n_uploads = n_writers * env.uploads
+        print(
+            f'{n_writers} writers: {n_uploads / elapsed:.1f} uploads/s, '
+            f'{n_uploads * env.points / elapsed:,.0f} points/s'
+        )
+
+        for upload_id in upload_ids:
+            api('DELETE', f'{url}/api/photometry/bulk_delete/{upload_id}', env.token)
@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+
+from baselayer.app.env import load_env, parser
+
+
+if __name__ == "__main__":
+    parser.description = (
+        'Rebuild the catalog of annotation origins and keys (AnnotationKey table)'
+    )
+
+    env, cfg = load_env()
+
+    from skyportal.models import init_db, DBSession, AnnotationKey
+
+    init_db(**cfg['database'])
+
+    AnnotationKey.rebuild()
+    DBSession().commit()
+
+    print(f'Cataloged {AnnotationKey.query.count()} annotation keys')
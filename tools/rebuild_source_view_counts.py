@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+
+from baselayer.app.env import load_env, parser
+
+
+if __name__ == "__main__":
+    parser.description = (
+        'Rebuild the hourly and daily source view counts (SourceViewCount table)'
+    )
+
+    env, cfg = load_env()
+
+    from skyportal.models import init_db, DBSession, SourceViewCount
+
+    init_db(**cfg['database'])
+
+    SourceViewCount.rebuild()
+    DBSession().commit()
+
+    print(f'Rebuilt {SourceViewCount.query.count()} source view counts')